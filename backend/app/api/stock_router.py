@@ -1,35 +1,63 @@
-from fastapi import APIRouter, Body, Depends
+from typing import Annotated
+from fastapi import APIRouter, Body, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from app.services.stock_daily_service import StockDailyService , StockDailyServiceError
 from app.services.stock_info_service import StockInfoService, StockInfoServiceError
-from app.schemas.stock_daily import StockDailyRequest
+from app.services.stock_indicator_service import StockIndicatorService, StockIndicatorServiceError
+from app.services.stock_period_service import StockPeriodService, StockPeriodServiceError
+from app.schemas.stock_daily import StockDailyRequest, StockDailyBatchRequest, StockDailyStreamRequest, StockDailyDeltaRequest
 from app.schemas.stock_info import StockInfoRequest
+from app.schemas.stock_indicator import StockIndicatorRequest, StockIndicatorLatestRequest
+from app.schemas.stock_period import StockPeriodRequest
 from app.core.database import get_async_db
 from app.schemas.api_response import APIResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from loguru import logger
 from app.utils.response_utils import success_response, error_response
 from app.utils.auth_utils import is_user_authenticated
+from app.core.rate_limiter import RateLimitExceeded, rate_limit
+from app.core.admission import AdmissionRejected, admission, CACHED_READ
+from app.utils.daily_encoding import daily_response, negotiate_daily_format, negotiate_encoding
+from app.utils.http_cache import etag_matches, make_etag, not_modified_by_cached_version, not_modified_response, with_cache_headers
 
 router = APIRouter(prefix="/stock", tags=["股票数据接口"])
 
+# GET 接口的缓存策略：接口需要登录，响应只允许客户端自己缓存（private），不能由反向代理或 CDN 共享，过期后凭 ETag 重新验证
+DAILY_CACHE_CONTROL = "private, max-age=60"
+INFO_CACHE_CONTROL = "private, max-age=3600"
+# 日线响应的格式与压缩由 Accept / Accept-Encoding 协商
+DAILY_VARY = "Accept, Accept-Encoding"
+
 async def get_stock_daily_service(
     db_session: AsyncSession = Depends(get_async_db)
 ) -> StockDailyService:
     return StockDailyService(db_session)
 
+async def get_stock_indicator_service(
+    db_session: AsyncSession = Depends(get_async_db)
+) -> StockIndicatorService:
+    return StockIndicatorService(db_session)
+
+async def get_stock_period_service(
+    db_session: AsyncSession = Depends(get_async_db)
+) -> StockPeriodService:
+    return StockPeriodService(db_session)
+
 async def get_stock_info_service(
     db_session: AsyncSession = Depends(get_async_db)
 ) -> StockInfoService:
     return StockInfoService(db_session)
 
-@router.post("/daily", response_model=APIResponse)
+@router.post("/daily", response_model=APIResponse, dependencies=[Depends(rate_limit("standard")), Depends(admission(CACHED_READ))])
 async def get_stock_daily_data(
+    http_request: Request,
     request: StockDailyRequest = Body(...),  # 请求体为 StockDailyRequest 类型
     service: StockDailyService = Depends(get_stock_daily_service),  # 注入 StockDailyService 实例
     authenticated: bool = Depends(is_user_authenticated)
 ):
     """
-    获取股票日线数据
+    获取股票日线数据，可通过 Accept 请求列式 JSON / Arrow / 二进制格式，通过 Accept-Encoding 请求 gzip / brotli 压缩，
+    指定 max_points 时按 LTTB 或 OHLC 分桶降采样，用于绘图
     - request: StockDailyRequest 包含用户传入的股票代码和日期范围
     - service: StockDailyService 作为依赖注入
     - authenticated: 是否通过身份验证
@@ -40,13 +68,18 @@ async def get_stock_daily_data(
     stock_code = request.stock_code
     start_date = request.start_date
     end_date = request.end_date
+    adjust = request.adjust
     
     # 调用服务获取数据
     try:
-        daily_data = await service.get_daily_data(stock_code, start_date, end_date)
+        if request.max_points is not None:
+            # 绘图请求：降采样到不超过 max_points 根
+            daily_data = await service.get_chart_bars(stock_code, start_date, end_date, adjust, request.max_points, request.downsample)
+        else:
+            daily_data = await service.get_daily_bars(stock_code, start_date, end_date, adjust)
         logger.info(f"成功获取股票 {stock_code} 的日线数据")
-        # 构造 APIResponse 返回
-        response = success_response(data=daily_data,message="成功获取股票日线数据")
+        # 按协商的格式构造响应返回
+        response = daily_response(http_request, daily_data, message="成功获取股票日线数据")
         return response
 
     except StockDailyServiceError as e:
@@ -54,6 +87,9 @@ async def get_stock_daily_data(
         logger.error(f"获取股票日线数据时日线服务出现问题: {e}")
         response = error_response(error=e,message="日线服务出现问题失败")
         return response
+    except (RateLimitExceeded, AdmissionRejected):
+        # 交给全局异常处理器返回 429 / 503
+        raise
     except Exception as e:
         # 捕获其他异常
         logger.error(f"获取股票日线数据时发生未知错误: {e}")
@@ -61,7 +97,226 @@ async def get_stock_daily_data(
         response = error_response(error=e)
         return response
     
-@router.post("/info", response_model=APIResponse)
+@router.get("/daily", response_model=APIResponse, dependencies=[Depends(rate_limit("standard")), Depends(admission(CACHED_READ))])
+async def get_stock_daily_data_cacheable(
+    http_request: Request,
+    request: Annotated[StockDailyRequest, Query()],  # 查询参数与 POST 接口的请求体相同
+    service: StockDailyService = Depends(get_stock_daily_service),  # 注入 StockDailyService 实例
+    authenticated: bool = Depends(is_user_authenticated)
+):
+    """
+    可缓存的日线数据接口，参数与 POST /stock/daily 相同。
+    ETag 由该股票的日线版本、规范化后的查询参数与协商的响应格式计算，
+    If-None-Match 匹配 Redis 中镜像的版本时直接返回 304，不访问数据库也不构造响应体
+    - request: StockDailyRequest 查询参数
+    - service: StockDailyService 作为依赖注入
+    - authenticated: 是否通过身份验证
+    """
+    if not authenticated:
+        return error_response(message="未通过身份验证，请先登录！")
+    if_none_match = http_request.headers.get("if-none-match")
+    representation = (
+        negotiate_daily_format(http_request.headers.get("accept")),
+        negotiate_encoding(http_request.headers.get("accept-encoding")),
+    )
+    etag_parts = (http_request.url.path, request.model_dump(mode="json"), representation)
+    not_modified = await not_modified_by_cached_version(if_none_match, StockDailyService.VERSION_KIND, request.stock_code, etag_parts, DAILY_CACHE_CONTROL, DAILY_VARY)
+    if not_modified is not None:
+        return not_modified
+    try:
+        meta = await service.get_daily_meta(request.stock_code)
+        if meta is None:
+            raise StockDailyServiceError(f"股票 {request.stock_code} 没有日线数据")
+        etag = make_etag(*etag_parts, StockDailyService.daily_version(meta.data_version, meta.last_date))
+        if etag_matches(if_none_match, etag):
+            return not_modified_response(etag, DAILY_CACHE_CONTROL, DAILY_VARY)
+        # 未指定结束日期时以元数据中的最新日期作为结束日期，新日线入库后缓存键随之变化，响应内容与 ETag 保持一致
+        end_date = request.end_date or meta.last_date
+        if request.max_points is not None:
+            daily_data = await service.get_chart_bars(request.stock_code, request.start_date, end_date, request.adjust, request.max_points, request.downsample)
+        else:
+            daily_data = await service.get_daily_bars(request.stock_code, request.start_date, end_date, request.adjust)
+        logger.info(f"成功获取股票 {request.stock_code} 的日线数据")
+        response = daily_response(http_request, daily_data, message="成功获取股票日线数据")
+        return with_cache_headers(response, etag, DAILY_CACHE_CONTROL, DAILY_VARY)
+    except StockDailyServiceError as e:
+        logger.error(f"获取股票日线数据时日线服务出现问题: {e}")
+        return error_response(error=e, message="日线服务出现问题失败")
+    except (RateLimitExceeded, AdmissionRejected):
+        raise
+    except Exception as e:
+        logger.error(f"获取股票日线数据时发生未知错误: {e}")
+        return error_response(error=e)
+
+@router.post("/daily/batch", response_model=APIResponse, dependencies=[Depends(rate_limit("heavy")), Depends(admission(CACHED_READ))])
+async def get_stock_daily_batch_data(
+    http_request: Request,
+    request: StockDailyBatchRequest = Body(...),  # 请求体为 StockDailyBatchRequest 类型
+    service: StockDailyService = Depends(get_stock_daily_service),  # 注入 StockDailyService 实例
+    authenticated: bool = Depends(is_user_authenticated)
+):
+    """
+    批量获取多只股票在同一日期范围内的日线数据，结果按股票代码组织，支持与单只股票接口相同的格式协商
+    - request: StockDailyBatchRequest 包含股票代码列表和共同的日期范围
+    - service: StockDailyService 作为依赖注入
+    - authenticated: 是否通过身份验证
+    """
+    if not authenticated:
+        return error_response(message="未通过身份验证，请先登录！")
+    try:
+        batch_data = await service.get_daily_data_batch(request.stock_codes, request.start_date, request.end_date, request.adjust)
+        logger.info(f"成功批量获取 {len(request.stock_codes)} 只股票的日线数据，失败 {len(batch_data.errors)} 只")
+        return daily_response(http_request, batch_data, message="成功批量获取股票日线数据")
+    except StockDailyServiceError as e:
+        logger.error(f"批量获取股票日线数据时日线服务出现问题: {e}")
+        return error_response(error=e, message="日线服务出现问题失败")
+    except (RateLimitExceeded, AdmissionRejected):
+        raise
+    except Exception as e:
+        logger.error(f"批量获取股票日线数据时发生未知错误: {e}")
+        return error_response(error=e)
+
+@router.post("/daily/delta", response_model=APIResponse, dependencies=[Depends(rate_limit("standard")), Depends(admission(CACHED_READ))])
+async def get_stock_daily_delta(
+    request: StockDailyDeltaRequest = Body(...),  # 请求体为 StockDailyDeltaRequest 类型
+    service: StockDailyService = Depends(get_stock_daily_service),  # 注入 StockDailyService 实例
+    authenticated: bool = Depends(is_user_authenticated)
+):
+    """
+    增量同步股票日线数据：只返回客户端已有最新日期之后的日线，复权因子变化时返回 full_refresh 提示重新全量获取
+    - request: StockDailyDeltaRequest 包含股票代码、客户端已有的最新日期与数据版本
+    - service: StockDailyService 作为依赖注入
+    - authenticated: 是否通过身份验证
+    """
+    if not authenticated:
+        return error_response(message="未通过身份验证，请先登录！")
+    try:
+        delta_data = await service.get_daily_delta(request.stock_code, request.since_date, request.data_version, request.adjust)
+        logger.info(f"成功增量同步股票 {request.stock_code} 的日线数据")
+        return success_response(data=delta_data, message="成功增量同步股票日线数据")
+    except StockDailyServiceError as e:
+        logger.error(f"增量同步股票日线数据时日线服务出现问题: {e}")
+        return error_response(error=e, message="日线服务出现问题失败")
+    except (RateLimitExceeded, AdmissionRejected):
+        raise
+    except Exception as e:
+        logger.error(f"增量同步股票日线数据时发生未知错误: {e}")
+        return error_response(error=e)
+
+@router.post("/daily/stream", dependencies=[Depends(rate_limit("heavy")), Depends(admission(CACHED_READ))])
+async def stream_stock_daily_data(
+    request: StockDailyStreamRequest = Body(...),  # 请求体为 StockDailyStreamRequest 类型
+    service: StockDailyService = Depends(get_stock_daily_service),  # 注入 StockDailyService 实例
+    authenticated: bool = Depends(is_user_authenticated)
+):
+    """
+    流式获取多只股票的日线数据，数据库结果边读取边输出，适用于长区间的完整历史
+    - request: StockDailyStreamRequest 包含股票代码列表、日期范围和输出格式（ndjson/json）
+    - service: StockDailyService 作为依赖注入
+    - authenticated: 是否通过身份验证
+    """
+    if not authenticated:
+        return error_response(message="未通过身份验证，请先登录！")
+    try:
+        # 补齐缺失数据在开始输出前完成，这样错误仍可以通过普通响应返回
+        errors = await service.prepare_daily_stream(request.stock_codes, request.start_date, request.end_date)
+    except StockDailyServiceError as e:
+        logger.error(f"准备流式日线数据时日线服务出现问题: {e}")
+        return error_response(error=e, message="日线服务出现问题失败")
+    except (RateLimitExceeded, AdmissionRejected):
+        raise
+    except Exception as e:
+        logger.error(f"准备流式日线数据时发生未知错误: {e}")
+        return error_response(error=e)
+    media_type = "application/x-ndjson" if request.format == "ndjson" else "application/json"
+    # 输出阶段的数据库读取名额由 stream_daily_data 在读取期间持有
+    return StreamingResponse(
+        StockDailyService.stream_daily_data(request.stock_codes, request.start_date, request.end_date, errors, request.format, request.adjust),
+        media_type=media_type
+    )
+
+@router.post("/period", response_model=APIResponse, dependencies=[Depends(rate_limit("standard")), Depends(admission(CACHED_READ))])
+async def get_stock_period_data(
+    request: StockPeriodRequest = Body(...),  # 请求体为 StockPeriodRequest 类型
+    service: StockPeriodService = Depends(get_stock_period_service),  # 注入 StockPeriodService 实例
+    authenticated: bool = Depends(is_user_authenticated)
+):
+    """
+    获取股票的周线、月线或季线，由日线按交易日历对齐的周期聚合，聚合结果按股票缓存并随新日线增量更新
+    - request: StockPeriodRequest 包含股票代码、周期、日期范围和复权方式
+    - service: StockPeriodService 作为依赖注入
+    - authenticated: 是否通过身份验证
+    """
+    if not authenticated:
+        return error_response(message="未通过身份验证，请先登录！")
+    try:
+        period_data = await service.get_period_data(request.stock_code, request.period, request.start_date, request.end_date, request.adjust)
+        logger.info(f"成功获取股票 {request.stock_code} 的{request.period}K线")
+        return success_response(data=period_data, message="成功获取周期K线")
+    except StockPeriodServiceError as e:
+        logger.error(f"获取周期K线时周期K线服务出现问题: {e}")
+        return error_response(error=e, message="周期K线服务出现问题失败")
+    except (RateLimitExceeded, AdmissionRejected):
+        raise
+    except Exception as e:
+        logger.error(f"获取周期K线时发生未知错误: {e}")
+        return error_response(error=e)
+
+@router.post("/indicators", response_model=APIResponse, dependencies=[Depends(rate_limit("standard")), Depends(admission(CACHED_READ))])
+async def get_stock_indicators(
+    request: StockIndicatorRequest = Body(...),  # 请求体为 StockIndicatorRequest 类型
+    service: StockIndicatorService = Depends(get_stock_indicator_service),  # 注入 StockIndicatorService 实例
+    authenticated: bool = Depends(is_user_authenticated)
+):
+    """
+    获取指定股票在日期范围内的技术指标（MA/EMA/MACD/RSI/BOLL），结果会被缓存
+    - request: StockIndicatorRequest 包含股票代码、指标名称、日期范围和复权方式
+    - service: StockIndicatorService 作为依赖注入
+    - authenticated: 是否通过身份验证
+    """
+    if not authenticated:
+        return error_response(message="未通过身份验证，请先登录！")
+    try:
+        indicator_data = await service.get_indicators(request.stock_code, request.indicators, request.start_date, request.end_date, request.adjust)
+        logger.info(f"成功获取股票 {request.stock_code} 的技术指标")
+        return success_response(data=indicator_data, message="成功获取技术指标")
+    except StockIndicatorServiceError as e:
+        logger.error(f"获取技术指标时指标服务出现问题: {e}")
+        return error_response(error=e, message="技术指标服务出现问题失败")
+    except (RateLimitExceeded, AdmissionRejected):
+        raise
+    except Exception as e:
+        logger.error(f"获取技术指标时发生未知错误: {e}")
+        return error_response(error=e)
+
+@router.post("/indicators/latest", response_model=APIResponse, dependencies=[Depends(rate_limit("heavy")), Depends(admission(CACHED_READ))])
+async def get_latest_stock_indicators(
+    request: StockIndicatorLatestRequest = Body(...),  # 请求体为 StockIndicatorLatestRequest 类型
+    service: StockIndicatorService = Depends(get_stock_indicator_service),  # 注入 StockIndicatorService 实例
+    authenticated: bool = Depends(is_user_authenticated)
+):
+    """
+    批量获取多只股票最后一根K线的技术指标，直接读取增量维护的指标状态
+    - request: StockIndicatorLatestRequest 包含股票代码列表、指标名称和复权方式
+    - service: StockIndicatorService 作为依赖注入
+    - authenticated: 是否通过身份验证
+    """
+    if not authenticated:
+        return error_response(message="未通过身份验证，请先登录！")
+    try:
+        latest_data = await service.get_latest(request.stock_codes, request.indicators, request.adjust)
+        logger.info(f"成功获取 {len(request.stock_codes)} 只股票的最新技术指标，失败 {len(latest_data.errors)} 只")
+        return success_response(data=latest_data, message="成功获取最新技术指标")
+    except StockIndicatorServiceError as e:
+        logger.error(f"获取最新技术指标时指标服务出现问题: {e}")
+        return error_response(error=e, message="技术指标服务出现问题失败")
+    except (RateLimitExceeded, AdmissionRejected):
+        raise
+    except Exception as e:
+        logger.error(f"获取最新技术指标时发生未知错误: {e}")
+        return error_response(error=e)
+
+@router.post("/info", response_model=APIResponse, dependencies=[Depends(rate_limit("light")), Depends(admission(CACHED_READ))])
 async def get_stock_info_data(
     request: StockInfoRequest = Body(...),  # 请求体为 StockInfoRequest 类型
     service: StockInfoService = Depends(get_stock_info_service),  # 注入 StockInfoService 实例
@@ -90,6 +345,8 @@ async def get_stock_info_data(
         # 返回错误响应
         response = error_response(error=e,message="个股基本信息服务出现问题失败")
         return response
+    except (RateLimitExceeded, AdmissionRejected):
+        raise
     except Exception as e:
         # 捕获其他异常
         logger.error(f"获取股票基本信息时发生未知错误: {e}")
@@ -99,3 +356,40 @@ async def get_stock_info_data(
 
 
 
+
+@router.get("/info", response_model=APIResponse, dependencies=[Depends(rate_limit("light")), Depends(admission(CACHED_READ))])
+async def get_stock_info_data_cacheable(
+    http_request: Request,
+    request: Annotated[StockInfoRequest, Query()],  # 查询参数与 POST 接口的请求体相同
+    service: StockInfoService = Depends(get_stock_info_service),  # 注入 StockInfoService 实例
+    authenticated: bool = Depends(is_user_authenticated)
+):
+    """
+    可缓存的个股信息接口，参数与 POST /stock/info 相同。
+    ETag 由个股信息的更新时间计算，If-None-Match 匹配 Redis 中镜像的版本时直接返回 304
+    - request: StockInfoRequest 查询参数
+    - service: StockInfoService 作为依赖注入
+    - authenticated: 是否通过身份验证
+    """
+    if not authenticated:
+        return error_response(message="未通过身份验证，请先登录！")
+    if_none_match = http_request.headers.get("if-none-match")
+    etag_parts = (http_request.url.path, request.model_dump(mode="json"))
+    not_modified = await not_modified_by_cached_version(if_none_match, StockInfoService.VERSION_KIND, request.stock_code, etag_parts, INFO_CACHE_CONTROL)
+    if not_modified is not None:
+        return not_modified
+    try:
+        etag = make_etag(*etag_parts, await service.get_info_version(request.stock_code))
+        if etag_matches(if_none_match, etag):
+            return not_modified_response(etag, INFO_CACHE_CONTROL)
+        stock_info_data = await service.get_info_data(request.stock_code)
+        response = success_response(data=stock_info_data, message="成功获取股票基本信息")
+        return with_cache_headers(response, etag, INFO_CACHE_CONTROL)
+    except StockInfoServiceError as e:
+        logger.error(f"获取股票基本信息时服务出现问题: {e}")
+        return error_response(error=e, message="个股基本信息服务出现问题失败")
+    except (RateLimitExceeded, AdmissionRejected):
+        raise
+    except Exception as e:
+        logger.error(f"获取股票基本信息时发生未知错误: {e}")
+        return error_response(error=e)
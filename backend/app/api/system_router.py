@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Body, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+from app.schemas.api_response import APIResponse
+from app.core.loop_monitor import loop_lag_monitor
+from app.core.admission import admission_stats
+from app.core.database import db_pool_stats
+from app.core.redis import redis_pool_stats
+from app.core.database import get_async_db
+from app.core.leader_election import scheduler_leader
+from app.services.post_close_pipeline import post_close_pipeline
+from app.repositories.job_history_repository import JobHistoryRepository, JobHistoryRepositoryError
+from app.schemas.job_history import JobHistoryRequest, JobHistoryItem
+from app.utils.response_utils import success_response, error_response
+from app.utils.auth_utils import is_user_authenticated
+
+router = APIRouter(prefix="/system", tags=["系统监控接口"])
+
+@router.post("/metrics", response_model=APIResponse)
+async def get_system_metrics(
+    authenticated: bool = Depends(is_user_authenticated)
+):
+    """
+    获取系统运行指标
+    - authenticated: 是否通过身份验证
+    """
+    if not authenticated:
+        return error_response(message="未通过身份验证，请先登录！")
+    try:
+        metrics = {
+            "event_loop_lag": loop_lag_monitor.stats(),
+            "admission": admission_stats(),
+            # 连接池状态按工作进程统计，多进程部署时每个进程各有一份
+            "db_pool": db_pool_stats(),
+            "redis_pool": redis_pool_stats(),
+            # 只有调度器主节点上有收盘后数据处理的阶段耗时统计
+            "scheduler": {
+                "leader": scheduler_leader.stats(),
+                "post_close": post_close_pipeline.stats(),
+            },
+        }
+        return success_response(data=metrics, message="成功获取系统运行指标")
+    except Exception as e:
+        logger.error(f"获取系统运行指标时发生未知错误: {e}")
+        return error_response(error=e)
+
+@router.post("/jobs", response_model=APIResponse)
+async def get_job_history(
+    request: JobHistoryRequest = Body(JobHistoryRequest()),
+    db_session: AsyncSession = Depends(get_async_db),
+    authenticated: bool = Depends(is_user_authenticated)
+):
+    """
+    获取最近的定时任务执行记录，包括各阶段的状态与耗时
+    - request: JobHistoryRequest 包含任务名称与返回的记录数
+    - authenticated: 是否通过身份验证
+    """
+    if not authenticated:
+        return error_response(message="未通过身份验证，请先登录！")
+    try:
+        runs = await JobHistoryRepository(db_session).find_recent_runs(request.job_name, request.limit)
+        data = [JobHistoryItem.model_validate(run) for run in runs]
+        return success_response(data=data, message="成功获取任务执行记录")
+    except JobHistoryRepositoryError as e:
+        logger.error(f"获取任务执行记录时数据库操作失败: {e}")
+        return error_response(error=e, message="获取任务执行记录失败")
+    except Exception as e:
+        logger.error(f"获取任务执行记录时发生未知错误: {e}")
+        return error_response(error=e)
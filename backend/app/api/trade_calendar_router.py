@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Body, Depends
+from typing import Annotated
+from fastapi import APIRouter, Body, Depends, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from loguru import logger
 from app.services.trade_calendar_service import TradeCalendarService, TradeCalendarServiceError
@@ -7,15 +8,24 @@ from app.schemas.api_response import APIResponse
 from app.schemas.trade_calendar import TradeCalendarRequest, ExchangeLastTradingDayRequest
 from app.utils.response_utils import success_response, error_response
 from app.utils.auth_utils import is_user_authenticated
+from app.core.rate_limiter import rate_limit
+from app.core.admission import AdmissionRejected, admission, CACHED_READ
+from app.utils.http_cache import etag_matches, make_etag, not_modified_by_cached_version, not_modified_response, with_cache_headers
+from app.schemas.trade_calendar import ExchangeLastTradingDayResponse
 
 router = APIRouter(prefix="/calendar",tags=["交易日历接口"])
 
+# GET 接口的缓存策略：交易日历每个交易日最多变化一次，过期后凭 ETag 重新验证；
+# 接口需要登录，响应只允许客户端自己缓存（private），不能由共享缓存保存
+CALENDAR_CACHE_CONTROL = "private, max-age=3600"
+LATEST_DAY_CACHE_CONTROL = "private, max-age=300"
+
 async def get_trade_calendar_service(
     db_session: AsyncSession = Depends(get_async_db)
 ) -> TradeCalendarService:
     return TradeCalendarService(db_session)
 
-@router.post("/trading-days", response_model=APIResponse)
+@router.post("/trading-days", response_model=APIResponse, dependencies=[Depends(rate_limit("light")), Depends(admission(CACHED_READ))])
 async def get_trade_calendar_data(
     request: TradeCalendarRequest = Body(...),
     service: TradeCalendarService = Depends(get_trade_calendar_service),
@@ -41,11 +51,13 @@ async def get_trade_calendar_data(
         logger.error(f"获取交易日历数据时服务出现问题: {e}")
         return error_response(error=e, message="交易日历服务出现问题")
 
+    except AdmissionRejected:
+        raise
     except Exception as e:
         logger.error(f"获取交易日历数据时发生未知错误: {e}")
         return error_response(error=e)
 
-@router.post("/latest-trading-day", response_model=APIResponse)
+@router.post("/latest-trading-day", response_model=APIResponse, dependencies=[Depends(rate_limit("light")), Depends(admission(CACHED_READ))])
 async def get_latest_trading_day(
     request: ExchangeLastTradingDayRequest = Body(...),
     service: TradeCalendarService = Depends(get_trade_calendar_service),
@@ -67,6 +79,91 @@ async def get_latest_trading_day(
     except TradeCalendarServiceError as e:
         logger.error(f"获取最新交易日时服务出现问题: {e}")
         return error_response(error=e, message="交易日历服务出现问题")
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        logger.error(f"获取最新交易日时发生未知错误: {e}")
+        return error_response(error=e)
+
+@router.get("/trading-days", response_model=APIResponse, dependencies=[Depends(rate_limit("light")), Depends(admission(CACHED_READ))])
+async def get_trade_calendar_data_cacheable(
+    http_request: Request,
+    request: Annotated[TradeCalendarRequest, Query()],  # 查询参数与 POST 接口的请求体相同
+    service: TradeCalendarService = Depends(get_trade_calendar_service),
+    authenticated: bool = Depends(is_user_authenticated)
+):
+    """
+    可缓存的交易日历接口，参数与 POST /calendar/trading-days 相同。
+    ETag 由交易日历版本（库中最新的交易日）计算，If-None-Match 匹配 Redis 中镜像的版本时直接返回 304
+    """
+    if not authenticated:
+        return error_response(message="未通过身份验证，请先登录！")
+    if_none_match = http_request.headers.get("if-none-match")
+    etag_parts = (http_request.url.path, request.model_dump(mode="json"))
+    not_modified = await not_modified_by_cached_version(if_none_match, TradeCalendarService.VERSION_KIND, request.exchange_code, etag_parts, CALENDAR_CACHE_CONTROL)
+    if not_modified is not None:
+        return not_modified
+    try:
+        latest_date = await service.get_calendar_version(request.exchange_code)
+        if latest_date is None:
+            # 数据库中还没有日历数据：先按原逻辑获取并保存，再读取版本
+            await service.get_raw_trade_calendar(request.exchange_code)
+            latest_date = await service.get_calendar_version(request.exchange_code)
+        etag = make_etag(*etag_parts, latest_date.isoformat())
+        if etag_matches(if_none_match, etag):
+            return not_modified_response(etag, CALENDAR_CACHE_CONTROL)
+        # 未指定结束日期时以最新交易日作为结束日期，日历追加新交易日后缓存键随之变化
+        calendar_data = await service.get_trade_calendar_data(
+            request.exchange_code,
+            request.start_date,
+            request.end_date or latest_date
+        )
+        logger.info(f"成功获取交易所 {request.exchange_code} 的交易日历数据")
+        response = success_response(data=calendar_data, message="成功获取交易日历数据")
+        return with_cache_headers(response, etag, CALENDAR_CACHE_CONTROL)
+    except TradeCalendarServiceError as e:
+        logger.error(f"获取交易日历数据时服务出现问题: {e}")
+        return error_response(error=e, message="交易日历服务出现问题")
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        logger.error(f"获取交易日历数据时发生未知错误: {e}")
+        return error_response(error=e)
+
+@router.get("/latest-trading-day", response_model=APIResponse, dependencies=[Depends(rate_limit("light")), Depends(admission(CACHED_READ))])
+async def get_latest_trading_day_cacheable(
+    http_request: Request,
+    request: Annotated[ExchangeLastTradingDayRequest, Query()],  # 查询参数与 POST 接口的请求体相同
+    service: TradeCalendarService = Depends(get_trade_calendar_service),
+    authenticated: bool = Depends(is_user_authenticated)
+):
+    """
+    可缓存的最新交易日接口，参数与 POST /calendar/latest-trading-day 相同。
+    最新交易日就是交易日历的版本，响应直接由版本构造
+    """
+    if not authenticated:
+        return error_response(message="未通过身份验证，请先登录！")
+    if_none_match = http_request.headers.get("if-none-match")
+    etag_parts = (http_request.url.path, request.model_dump(mode="json"))
+    not_modified = await not_modified_by_cached_version(if_none_match, TradeCalendarService.VERSION_KIND, request.exchange_code, etag_parts, LATEST_DAY_CACHE_CONTROL)
+    if not_modified is not None:
+        return not_modified
+    try:
+        latest_date = await service.get_calendar_version(request.exchange_code)
+        if latest_date is None:
+            raise TradeCalendarServiceError(f"未找到{request.exchange_code}的最新交易日数据")
+        etag = make_etag(*etag_parts, latest_date.isoformat())
+        if etag_matches(if_none_match, etag):
+            return not_modified_response(etag, LATEST_DAY_CACHE_CONTROL)
+        latest_day = ExchangeLastTradingDayResponse(exchange_code=request.exchange_code, last_trading_day=latest_date)
+        logger.info(f"成功获取交易所 {request.exchange_code} 的最新交易日")
+        response = success_response(data=latest_day, message="成功获取最新交易日")
+        return with_cache_headers(response, etag, LATEST_DAY_CACHE_CONTROL)
+    except TradeCalendarServiceError as e:
+        logger.error(f"获取最新交易日时服务出现问题: {e}")
+        return error_response(error=e, message="交易日历服务出现问题")
+    except AdmissionRejected:
+        raise
     except Exception as e:
         logger.error(f"获取最新交易日时发生未知错误: {e}")
         return error_response(error=e)
@@ -9,6 +9,8 @@ from app.schemas.user import (
     PasswordChangeRequest)
 from app.utils.response_utils import success_response, error_response
 from app.utils.auth_utils import get_current_username
+from app.core.token_utils import oauth2_scheme
+from app.core.rate_limiter import rate_limit
 
 class AuthError(Exception):
     pass
@@ -20,7 +22,7 @@ async def get_user_service(
 ) -> UserService:
     return UserService(db_session)
 
-@router.post("/register", response_model=APIResponse)
+@router.post("/register", response_model=APIResponse, dependencies=[Depends(rate_limit("standard"))])
 async def register_user(
     request: UserRegisterRequest = Body(...),
     service: UserService = Depends(get_user_service)
@@ -42,7 +44,7 @@ async def register_user(
         return error_response(e)
 
 
-@router.post("/login", response_model=APIResponse)
+@router.post("/login", response_model=APIResponse, dependencies=[Depends(rate_limit("standard"))])
 async def login_user(
     request: UserLoginRequest = Body(...),
     service: UserService = Depends(get_user_service)
@@ -63,6 +65,26 @@ async def login_user(
         logger.error(f"用户登录过程中发生未知错误: {e}")
         return error_response(e)
 
+@router.post("/logout", response_model=APIResponse)
+async def logout_user(
+    token: str = Depends(oauth2_scheme),
+    service: UserService = Depends(get_user_service)
+):
+    """
+    用户登出，吊销当前访问令牌，其他工作进程最迟在吊销列表刷新间隔后拒绝该令牌
+    - token: 请求头中的访问令牌
+    - service: UserService 作为依赖注入
+    """
+    try:
+        result = await service.logout_user(token)
+        return success_response(data={"success": result}, message="登出成功")
+    except UserServiceError as e:
+        logger.error(f"用户登出失败: {e}")
+        return error_response(error=e, message="登出失败")
+    except Exception as e:
+        logger.error(f"用户登出过程中发生未知错误: {e}")
+        return error_response(e)
+
 @router.post("/profile/view", response_model=APIResponse)
 async def get_profile(
     username: str = Depends(get_current_username),
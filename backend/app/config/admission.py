@@ -0,0 +1,27 @@
+from pydantic_settings import BaseSettings
+from dotenv import load_dotenv
+
+# 加载 .env 文件
+load_dotenv()
+
+class AdmissionSettings(BaseSettings):
+    # 是否启用准入控制
+    ADMISSION_ENABLED: bool = True
+    # 接口入口（所有数据接口）：并发上限、等待队列长度、最长等待时间（秒）
+    CACHED_READ_CONCURRENCY: int = 64
+    CACHED_READ_QUEUE: int = 256
+    CACHED_READ_DEADLINE: float = 0.5
+    # 数据库访问，只在服务层的仓储调用期间占用，并发上限应与数据库连接池大小相当
+    DB_READ_CONCURRENCY: int = 10
+    DB_READ_QUEUE: int = 40
+    DB_READ_DEADLINE: float = 2.0
+    # 外部接口抓取，只在抓取期间占用，与数据库访问互不重叠
+    UPSTREAM_CONCURRENCY: int = 4
+    UPSTREAM_QUEUE: int = 8
+    UPSTREAM_DEADLINE: float = 5.0
+
+    class Config:
+        env_file = ".env.admission"
+
+# 实例化配置对象
+admission_settings = AdmissionSettings()
@@ -10,15 +10,36 @@ class DatabaseSettings(BaseSettings):
     DB_USER: str
     DB_PASSWORD: str
     DB_NAME: str
-
-    @property
-    def db_url(self) -> str:
-        return f"mysql+pymysql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}?charset=utf8mb4"
+    # 每个工作进程常驻的连接数，多个工作进程的总连接数需小于 MySQL 的 max_connections
+    DB_POOL_SIZE: int = 10
+    # 常驻连接用尽后允许临时新建的连接数
+    DB_MAX_OVERFLOW: int = 5
+    # 连接池用尽时等待空闲连接的最长时间（秒）
+    DB_POOL_TIMEOUT: float = 10.0
+    # 连接使用超过该时长（秒）后重建，需小于 MySQL 的 wait_timeout
+    DB_POOL_RECYCLE: int = 1800
+    # 借出连接前先 ping，丢弃已被服务端断开的连接
+    DB_POOL_PRE_PING: bool = True
+    # 启动时是否建表；默认由部署流程先执行 python -m app.migrate，工作进程启动时不再访问数据库检查表结构
+    DB_CREATE_TABLES_ON_STARTUP: bool = False
+    # 只读副本地址，为空时不启用读写分离；账号与库名与主库相同
+    DB_REPLICA_HOST: str | None = None
+    DB_REPLICA_PORT: int = 3306
+    # 副本复制延迟超过该值（秒）或复制中断时，读取回退到主库
+    DB_REPLICA_MAX_LAG: float = 5.0
+    # 检查副本复制延迟的间隔（秒）
+    DB_REPLICA_LAG_CHECK_INTERVAL: float = 2.0
 
     @property
     def async_db_url(self) -> str:
         return f"mysql+aiomysql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}?charset=utf8mb4"
 
+    @property
+    def async_replica_db_url(self) -> str | None:
+        if not self.DB_REPLICA_HOST:
+            return None
+        return f"mysql+aiomysql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_REPLICA_HOST}:{self.DB_REPLICA_PORT}/{self.DB_NAME}?charset=utf8mb4"
+
     class Config:
         env_file = ".env.db"
 
@@ -0,0 +1,18 @@
+from pydantic_settings import BaseSettings
+from dotenv import load_dotenv
+
+# 加载 .env 文件
+load_dotenv()
+
+class ExecutorSettings(BaseSettings):
+    # 每个 uvicorn 工作进程各自的 CPU 密集任务进程池大小，为 0 时在事件循环线程内直接执行（便于调试）。
+    # N 个工作进程共创建 N × CPU_POOL_SIZE 个子进程，应使其不超过 CPU 核数
+    CPU_POOL_SIZE: int = 2
+    # 事件循环延迟采样间隔（秒）
+    LOOP_LAG_SAMPLE_INTERVAL: float = 0.1
+
+    class Config:
+        env_file = ".env.executor"
+
+# 实例化配置对象
+executor_settings = ExecutorSettings()
@@ -8,6 +8,10 @@ class JWTSettings(BaseSettings):
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str
     JWT_EXPIRATION: int
+    # 进程内已验证 Token 声明的 LRU 缓存容量
+    JWT_CLAIMS_CACHE_SIZE: int = 10000
+    # 本地吊销列表快照的刷新间隔（秒），登出与封禁最迟在该间隔后对其他工作进程生效
+    TOKEN_REVOCATION_REFRESH_INTERVAL: float = 5.0
 
     class Config:
         env_file = ".env.jwt"
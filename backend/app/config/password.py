@@ -0,0 +1,19 @@
+from pydantic_settings import BaseSettings
+from dotenv import load_dotenv
+
+# 加载 .env 文件
+load_dotenv()
+
+class PasswordSettings(BaseSettings):
+    # bcrypt 工作因子（log2 轮数），修改后已有用户在下次登录成功时按新的工作因子重新哈希
+    BCRYPT_ROUNDS: int = 12
+    # 密码哈希线程池大小，为 0 时在事件循环线程内直接执行（便于调试）
+    PASSWORD_HASH_POOL_SIZE: int = 2
+    # 同时提交到线程池的哈希任务上限（含正在执行的任务），超过后直接拒绝，避免登录洪峰无限堆积
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    class Config:
+        env_file = ".env.password"
+
+# 实例化配置对象
+password_settings = PasswordSettings()
@@ -0,0 +1,26 @@
+from typing import Dict
+from pydantic_settings import BaseSettings
+from dotenv import load_dotenv
+
+# 加载 .env 文件
+load_dotenv()
+
+class RateLimitSettings(BaseSettings):
+    # 是否启用限流
+    RATE_LIMIT_ENABLED: bool = True
+    # 滑动窗口长度（秒）
+    RATE_LIMIT_WINDOW: int = 60
+    # 每个角色在各开销等级下每个窗口允许的请求数，未配置的角色或等级不限流。
+    # anonymous 为未登录请求（按客户端 IP 计数）；upstream 为会触发外部接口抓取的请求，单独计数且更严格
+    RATE_LIMITS: Dict[str, Dict[str, int]] = {
+        "anonymous": {"light": 60, "standard": 30, "heavy": 5, "upstream": 3},
+        "user": {"light": 600, "standard": 240, "heavy": 30, "upstream": 20},
+        "moderator": {"light": 1200, "standard": 480, "heavy": 60, "upstream": 40},
+        "admin": {"light": 3000, "standard": 1200, "heavy": 120, "upstream": 100},
+    }
+
+    class Config:
+        env_file = ".env.rate_limit"
+
+# 实例化配置对象
+rate_limit_settings = RateLimitSettings()
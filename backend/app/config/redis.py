@@ -9,6 +9,14 @@ class RedisSettings(BaseSettings):
     REDIS_PORT: int
     REDIS_DB: int
     REDIS_PASSWORD: str | None = None
+    # 每个工作进程的最大连接数，连接用尽时等待 REDIS_POOL_TIMEOUT 秒
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: float = 5.0
+    # 命令读写超时与建立连接超时（秒）
+    REDIS_SOCKET_TIMEOUT: float = 5.0
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 2.0
+    # 空闲超过该时长（秒）的连接在使用前先检查是否存活
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
 
     @property
     def redis_url(self) -> str:
@@ -0,0 +1,33 @@
+from pydantic_settings import BaseSettings
+from dotenv import load_dotenv
+
+# 加载 .env 文件
+load_dotenv()
+
+class SchedulerSettings(BaseSettings):
+    # 是否通过 Redis 租约选主，只有持有租约的工作进程执行定时任务；单进程部署可关闭，此时本进程总是执行
+    SCHEDULER_LEADER_ELECTION: bool = True
+    SCHEDULER_LEASE_KEY: str = "scheduler:leader"
+    # 租约有效期与续约间隔（秒），续约间隔应明显小于有效期
+    SCHEDULER_LEASE_TTL: float = 30.0
+    SCHEDULER_LEASE_RENEW_INTERVAL: float = 10.0
+    # 定时任务与交易日判断使用的时区
+    SCHEDULER_TIMEZONE: str = "Asia/Shanghai"
+    # 收盘后数据处理的执行时间（交易所时区，周一至周五）
+    POST_CLOSE_HOUR: int = 15
+    POST_CLOSE_MINUTE: int = 30
+    # 收盘时间（交易所时区），此前当天的日线尚未定型，不视为已有的交易日数据
+    MARKET_CLOSE_HOUR: int = 15
+    MARKET_CLOSE_MINUTE: int = 0
+    # 判断当天是否为交易日所使用的交易所
+    POST_CLOSE_CALENDAR_EXCHANGE: str = "SH"
+    # 增量同步日线时并发抓取的股票数
+    POST_CLOSE_SYNC_CONCURRENCY: int = 2
+    # 预热缓存的最大股票数
+    POST_CLOSE_WARMUP_LIMIT: int = 200
+
+    class Config:
+        env_file = ".env.scheduler"
+
+# 实例化配置对象
+scheduler_settings = SchedulerSettings()
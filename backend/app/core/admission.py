@@ -0,0 +1,225 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from loguru import logger
+from app.config.admission import admission_settings
+from app.utils.response_utils import error_response
+
+# 准入类别：接口入口（缓存读取）、数据库访问、外部接口抓取，各自独立限制并发，互不占用。
+# 接口路由只在入口获取 CACHED_READ 名额；缓存未命中时，数据库访问与外部抓取由服务层在实际调用期间另外获取名额，
+# 同一请求不会在等待外部接口时占着数据库名额
+CACHED_READ = "cached_read"
+DB_READ = "db_read"
+UPSTREAM = "upstream"
+
+class AdmissionRejected(Exception):
+    """请求未能在等待期限内获得执行名额"""
+    def __init__(self, kind: str, reason: str, retry_after: int = 1):
+        self.kind = kind
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"{kind} 类请求繁忙（{reason}），请稍后重试")
+
+class AdmissionController:
+    """
+    单个类别的准入控制器：最多 concurrency 个请求同时执行，最多 max_queue 个请求排队等待，
+    排队超过 deadline 秒仍未开始的请求直接拒绝。过载时多出的请求快速失败，
+    已接纳请求的排队时间有上限，延迟不会随积压无限增长
+    """
+    def __init__(self, kind: str, concurrency: int, max_queue: int, deadline: float):
+        self.kind = kind
+        self._concurrency = concurrency
+        self._max_queue = max_queue
+        self._deadline = deadline
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._active = 0
+        self._waiting = 0
+        self._admitted = 0
+        self._rejected_queue_full = 0
+        self._rejected_deadline = 0
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        logger.warning(f"{self.kind} 类请求被拒绝（{reason}），执行中 {self._active}，排队 {self._waiting}")
+        return AdmissionRejected(self.kind, reason)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """获取执行名额，队列已满或等待超时时抛出 AdmissionRejected"""
+        if not admission_settings.ADMISSION_ENABLED:
+            yield
+            return
+        if self._semaphore.locked():
+            if self._waiting >= self._max_queue:
+                self._rejected_queue_full += 1
+                raise self._reject("队列已满")
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self._deadline)
+            except asyncio.TimeoutError:
+                self._rejected_deadline += 1
+                raise self._reject("等待超时") from None
+            finally:
+                self._waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self._active += 1
+        self._admitted += 1
+        try:
+            yield
+        finally:
+            self._active -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self._concurrency,
+            "max_queue": self._max_queue,
+            "deadline_s": self._deadline,
+            "active": self._active,
+            "waiting": self._waiting,
+            "admitted": self._admitted,
+            "rejected_queue_full": self._rejected_queue_full,
+            "rejected_deadline": self._rejected_deadline,
+        }
+
+admission_controllers: Dict[str, AdmissionController] = {
+    CACHED_READ: AdmissionController(
+        CACHED_READ, admission_settings.CACHED_READ_CONCURRENCY, admission_settings.CACHED_READ_QUEUE, admission_settings.CACHED_READ_DEADLINE
+    ),
+    DB_READ: AdmissionController(
+        DB_READ, admission_settings.DB_READ_CONCURRENCY, admission_settings.DB_READ_QUEUE, admission_settings.DB_READ_DEADLINE
+    ),
+    UPSTREAM: AdmissionController(
+        UPSTREAM, admission_settings.UPSTREAM_CONCURRENCY, admission_settings.UPSTREAM_QUEUE, admission_settings.UPSTREAM_DEADLINE
+    ),
+}
+
+def admission(kind: str) -> Callable:
+    """
+    生成准入控制的路由依赖，用法：@router.post(..., dependencies=[Depends(admission(CACHED_READ))])
+    名额在接口函数返回后释放，StreamingResponse 的响应体不在名额之内
+    """
+    if kind not in admission_controllers:
+        raise ValueError(f"未知的准入类别: {kind}")
+
+    async def dependency() -> AsyncIterator[None]:
+        async with admission_controllers[kind].slot():
+            yield
+
+    return dependency
+
+@asynccontextmanager
+async def upstream_slot() -> AsyncIterator[None]:
+    """外部接口抓取的执行名额，在服务层包裹实际的抓取调用"""
+    async with admission_controllers[UPSTREAM].slot():
+        yield
+
+@asynccontextmanager
+async def db_read_slot() -> AsyncIterator[None]:
+    """
+    数据库访问的执行名额，在服务层只包裹仓储调用（查询及未命中后的写入），不包裹外部抓取；
+    名额不可重入，持有期间不能再调用会获取名额的方法。流式响应体在生成器内部读取期间持有
+    """
+    async with admission_controllers[DB_READ].slot():
+        yield
+
+def admission_stats() -> dict:
+    """各类别的准入统计"""
+    return {kind: controller.stats() for kind, controller in admission_controllers.items()}
+
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected) -> JSONResponse:
+    """把 AdmissionRejected 转换为带 Retry-After 的 503 响应"""
+    body = error_response(error=exc, message="服务繁忙", status_code=503, detail={"kind": exc.kind, "reason": exc.reason})
+    return JSONResponse(status_code=503, content=body.model_dump(), headers={"Retry-After": str(exc.retry_after)})
+
+if __name__ == "__main__":
+    # 负载测试：python -m app.core.admission
+    # 在进程内通过 ASGI 以开环方式（按固定节奏发起，不等待上一个请求返回）压测三类接口：
+    # 三类接口都只在入口获取缓存读取名额：缓存读取直接返回，数据库读取在查询期间占用数据库名额与容量为 DB_POOL 的模拟连接池，
+    # 外部抓取只占用外部接口名额。
+    # 数据库读取与外部抓取的请求速率为各自容量的 OVERLOAD 倍，对比关闭与开启准入控制时各类接口成功请求的延迟与 503 数量
+    import time
+    from fastapi import Depends, FastAPI
+    from httpx import ASGITransport, AsyncClient
+
+    DURATION, OVERLOAD = 5.0, 5
+    DB_POOL, DB_QUERY_TIME = 3, 0.1
+    UPSTREAM_POOL, UPSTREAM_FETCH_TIME = 2, 0.5
+    CACHED_RATE = 40
+    DB_RATE = OVERLOAD * DB_POOL / DB_QUERY_TIME
+    UPSTREAM_RATE = OVERLOAD * UPSTREAM_POOL / UPSTREAM_FETCH_TIME
+
+    app = FastAPI()
+    app.add_exception_handler(AdmissionRejected, admission_rejected_handler)
+    db_pool = asyncio.Semaphore(DB_POOL)
+    upstream_pool = asyncio.Semaphore(UPSTREAM_POOL)
+
+    @app.get("/cached", dependencies=[Depends(admission(CACHED_READ))])
+    async def cached_read():
+        return {"ok": True}
+
+    @app.get("/db", dependencies=[Depends(admission(CACHED_READ))])
+    async def db_read():
+        async with db_read_slot(), db_pool:
+            await asyncio.sleep(DB_QUERY_TIME)
+        return {"ok": True}
+
+    @app.get("/upstream", dependencies=[Depends(admission(CACHED_READ))])
+    async def upstream_read():
+        async with upstream_slot():
+            async with upstream_pool:
+                await asyncio.sleep(UPSTREAM_FETCH_TIME)
+        return {"ok": True}
+
+    async def drive(client: AsyncClient, path: str, rate: float, results: list) -> None:
+        """按固定节奏发起请求，记录 (状态码, 延迟)"""
+        async def one() -> None:
+            started = time.perf_counter()
+            response = await client.get(path)
+            results.append((response.status_code, time.perf_counter() - started))
+
+        tasks, interval, started = [], 1 / rate, time.perf_counter()
+        for index in range(int(DURATION * rate)):
+            await asyncio.sleep(max(0.0, started + index * interval - time.perf_counter()))
+            tasks.append(asyncio.create_task(one()))
+        await asyncio.gather(*tasks)
+
+    def summary(results: list) -> str:
+        def p99(latencies: list) -> float:
+            return latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] * 1e3 if latencies else 0.0
+
+        latencies = sorted(latency for status, latency in results if status == 200)
+        rejected = sorted(latency for status, latency in results if status == 503)
+        if not latencies:
+            return f"成功 0，503 {len(rejected)}（p99 {p99(rejected):.0f} ms）"
+        return (f"成功 {len(latencies)}，p50 {latencies[len(latencies) // 2] * 1e3:.0f} ms，p99 {p99(latencies):.0f} ms，"
+                f"max {latencies[-1] * 1e3:.0f} ms；503 {len(rejected)}（p99 {p99(rejected):.0f} ms）")
+
+    async def run(enabled: bool) -> None:
+        admission_settings.ADMISSION_ENABLED = enabled
+        # 按模拟的容量配置各类别：数据库读取的并发与连接池相同，排队时间不超过约两轮查询
+        admission_controllers[CACHED_READ] = AdmissionController(CACHED_READ, 64, 256, 0.5)
+        admission_controllers[DB_READ] = AdmissionController(DB_READ, DB_POOL, 4 * DB_POOL, 2 * DB_QUERY_TIME)
+        admission_controllers[UPSTREAM] = AdmissionController(UPSTREAM, UPSTREAM_POOL, UPSTREAM_POOL, UPSTREAM_FETCH_TIME)
+        results = {path: [] for path in ("/cached", "/db", "/upstream")}
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            await asyncio.gather(
+                drive(client, "/cached", CACHED_RATE, results["/cached"]),
+                drive(client, "/db", DB_RATE, results["/db"]),
+                drive(client, "/upstream", UPSTREAM_RATE, results["/upstream"]),
+            )
+        logger.info(f"准入控制{'开启' if enabled else '关闭'}：")
+        for path, path_results in results.items():
+            logger.info(f"  {path}: {summary(path_results)}")
+
+    async def main() -> None:
+        logger.remove()
+        logger.add(lambda message: print(message, end=""), level="INFO", filter=lambda record: record["function"] in ("main", "run"))
+        logger.info(f"压测 {DURATION:.0f} 秒，数据库读取 {DB_RATE:.0f} 次/秒、外部抓取 {UPSTREAM_RATE:.0f} 次/秒（均为容量的 {OVERLOAD} 倍），"
+                    f"缓存读取 {CACHED_RATE} 次/秒")
+        for enabled in (False, True):
+            await run(enabled)
+
+    asyncio.run(main())
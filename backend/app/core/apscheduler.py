@@ -1,11 +1,18 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.triggers.cron import CronTrigger
 from app.services.trade_calendar_service import TradeCalendarService
+from app.services.stock_info_service import StockInfoService
+from app.services.stock_info_refresher import stock_info_refresher
+from app.services.post_close_pipeline import post_close_pipeline
 from app.core.database import get_async_db
+from app.core.leader_election import scheduler_leader
+from app.config.scheduler import scheduler_settings
 from loguru import logger
-from datetime import datetime
+from datetime import datetime, timedelta
 
-apscheduler = AsyncIOScheduler()
+# 每个工作进程都创建调度器，但只在持有调度器租约时运行任务，其余时间保持暂停
+apscheduler = AsyncIOScheduler(timezone=scheduler_settings.SCHEDULER_TIMEZONE)
 
 async def update_trade_calendar_task():
     """定时更新交易日历的任务"""
@@ -17,21 +24,65 @@ async def update_trade_calendar_task():
     except Exception as e:
         logger.error(f"交易日历定时任务执行失败: {e}")
 
+async def refresh_expiring_stock_info_task():
+    """夜间批量刷新即将过期的个股信息的任务"""
+    try:
+        await stock_info_refresher.refresh_expiring(StockInfoService.MAX_AGE, ahead=timedelta(hours=20))
+        logger.info("个股信息夜间批量刷新完成")
+    except Exception as e:
+        logger.error(f"个股信息夜间批量刷新任务执行失败: {e}")
+
+async def post_close_pipeline_task():
+    """收盘后刷新交易日历、增量同步日线、失效并预热缓存的任务"""
+    try:
+        await post_close_pipeline.run()
+    except Exception as e:
+        logger.error(f"收盘后数据处理任务执行失败: {e}")
+
+def _on_elected():
+    """成为主节点后恢复调度器，并立即检查一次交易日历"""
+    apscheduler.modify_job("update_trade_calendar", next_run_time=datetime.now(apscheduler.timezone))
+    apscheduler.resume()
+    logger.info("本进程开始执行定时任务")
+
+def _on_demoted():
+    apscheduler.pause()
+    logger.info("本进程停止执行定时任务")
+
 def start_scheduler():
-    """初始化并启动调度器"""
-    # 添加定时任务，并设置立即执行
+    """初始化并以暂停状态启动调度器，取得调度器租约后才开始执行任务"""
     apscheduler.add_job(
         update_trade_calendar_task,
-        trigger=IntervalTrigger(hours=12),
+        trigger=IntervalTrigger(hours=12, timezone=apscheduler.timezone),
         id="update_trade_calendar",
         replace_existing=True,
-        next_run_time=datetime.now()  # 设置立即执行
     )
-    apscheduler.start()
+    # 交易日收盘后依次刷新日历、同步日线、失效并预热缓存，非交易日在刷新日历后跳过
+    apscheduler.add_job(
+        post_close_pipeline_task,
+        trigger=CronTrigger(day_of_week="mon-fri", hour=scheduler_settings.POST_CLOSE_HOUR, minute=scheduler_settings.POST_CLOSE_MINUTE, timezone=apscheduler.timezone),
+        id="post_close_pipeline",
+        replace_existing=True,
+        max_instances=1,
+        misfire_grace_time=3600,
+    )
+    # 每天凌晨 2 点刷新即将过期的个股信息
+    apscheduler.add_job(
+        refresh_expiring_stock_info_task,
+        trigger=CronTrigger(hour=2, minute=0, timezone=apscheduler.timezone),
+        id="refresh_expiring_stock_info",
+        replace_existing=True,
+    )
+    apscheduler.start(paused=True)
+    scheduler_leader.start(on_elected=_on_elected, on_demoted=_on_demoted)
     logger.info("调度器启动完成")
 
 
-def stop_scheduler():
-    """关闭调度器"""
+async def stop_scheduler():
+    """关闭调度器并释放调度器租约"""
+    if not apscheduler.running:
+        return
+    # 先暂停任务并释放租约，其他工作进程无需等待租约过期即可接替
+    await scheduler_leader.stop()
     apscheduler.shutdown()
     logger.info("调度器已关闭")
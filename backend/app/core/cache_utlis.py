@@ -1,14 +1,19 @@
 import functools
+import inspect
 import pickle
 import hashlib
 import json
-from typing import Callable, Any, Awaitable
-from app.core.redis import get_cache, set_cache
+from typing import Callable, Any, Awaitable, Iterable, Optional
+from app.core.redis import get_cache, set_cache, delete_cache, scan_cache_keys, delete_cache_keys
 from loguru import logger
 
-def _make_cache_key(func: Callable, args: tuple, kwargs: dict) -> str:
+def _cache_key_prefix(func: Callable) -> str:
+    return f"cache:{func.__module__}.{func.__name__}"
+
+def _make_cache_key(func: Callable, args: tuple, kwargs: dict, scope: Optional[Any] = None) -> str:
     """
     为函数生成唯一缓存键，支持实例方法和静态方法
+    :param scope: 缓存范围（如股票代码），不为空时作为键的一部分：cache:{模块}.{函数}:{范围}:{参数摘要}
     """
     # 忽略第一个参数（self 或 cls）
     if args and hasattr(args[0], '__class__'):
@@ -22,17 +27,36 @@ def _make_cache_key(func: Callable, args: tuple, kwargs: dict) -> str:
         raw = str((args_to_serialize, kwargs)).encode()
 
     hash_digest = hashlib.sha256(raw).hexdigest()
-    return f"cache:{func.__module__}.{func.__name__}:{hash_digest}"
+    if scope is None:
+        return f"{_cache_key_prefix(func)}:{hash_digest}"
+    return f"{_cache_key_prefix(func)}:{scope}:{hash_digest}"
+
+def _scope_resolver(func: Callable, scope: Optional[str]) -> Callable[[tuple, dict], Optional[Any]]:
+    """按参数名从调用参数中取出缓存范围，位置参数与关键字参数两种传法得到相同的范围"""
+    if scope is None:
+        return lambda args, kwargs: None
+    signature = inspect.signature(func)
+    if scope not in signature.parameters:
+        raise ValueError(f"{func.__qualname__} 没有参数 {scope}，不能作为缓存范围")
+
+    def resolve(args: tuple, kwargs: dict) -> Optional[Any]:
+        bound = signature.bind_partial(*args, **kwargs)
+        return bound.arguments.get(scope, signature.parameters[scope].default)
 
-def redis_cache(ttl: int = 3600):
+    return resolve
+
+def redis_cache(ttl: int = 3600, scope: Optional[str] = None):
     """
     装饰器：缓存异步函数返回值
     :param ttl: 缓存有效期（秒）
+    :param scope: 作为缓存范围的参数名（如 stock_code），同一范围内不同参数的缓存可以用 invalidate_cache_scopes 一次删除
     """
     def decorator(func: Callable[..., Awaitable[Any]]):
+        resolve_scope = _scope_resolver(func, scope)
+
         @functools.wraps(func)
         async def wrapper(*args, **kwargs):
-            cache_key = _make_cache_key(func, args, kwargs)
+            cache_key = _make_cache_key(func, args, kwargs, resolve_scope(args, kwargs))
             cached = await get_cache(cache_key)
             if cached:
                 logger.info(f"缓存命中: {cache_key}")
@@ -48,5 +72,71 @@ def redis_cache(ttl: int = 3600):
             except Exception as e:
                 logger.error(f"函数执行出错，缓存不会更新: {e}")
                 raise  # 抛出异常，确保不缓存错误结果
+        wrapper.cache_scope = resolve_scope
         return wrapper
     return decorator
+
+async def invalidate_cache(func: Callable, *args, **kwargs) -> bool:
+    """
+    删除 redis_cache 装饰的方法在指定参数下的缓存
+    :param func: 被 redis_cache 装饰的方法（如 StockInfoService.get_info_data）
+    :param args: 调用时的位置参数（不含 self/cls）
+    :param kwargs: 调用时的关键字参数
+    :return: 是否删除了缓存
+    """
+    # 与 _make_cache_key 保持一致：第一个参数位置占位 self/cls
+    args = (None, *args)
+    cache_key = _make_cache_key(func, args, kwargs, func.cache_scope(args, kwargs))
+    deleted = await delete_cache(cache_key)
+    if deleted:
+        logger.info(f"缓存已失效: {cache_key}")
+    return deleted
+
+async def invalidate_cache_scopes(func: Callable, scopes: Iterable[Any]) -> int:
+    """
+    删除 redis_cache(scope=...) 装饰的方法在指定范围内的全部缓存，不论其他参数取什么值。
+    整个方法的缓存键只遍历一次，适合一次失效大量范围（如收盘后同步过的全部股票）
+    :param func: 被 redis_cache 装饰且指定了 scope 的方法（如 StockDailyService.get_daily_bars）
+    :param scopes: 要失效的范围（如股票代码）
+    :return: 删除的缓存数量
+    """
+    scopes = {str(scope) for scope in scopes}
+    if not scopes:
+        return 0
+    prefix = f"{_cache_key_prefix(func)}:"
+    keys = [
+        key for key in await scan_cache_keys(f"{prefix}*")
+        if key.decode()[len(prefix):].rpartition(":")[0] in scopes
+    ]
+    deleted = await delete_cache_keys(keys)
+    if deleted:
+        logger.info(f"缓存已失效: {prefix}* 中 {len(scopes)} 个范围的 {deleted} 个键")
+    return deleted
+
+def _resource_version_key(kind: str, key: str) -> str:
+    return f"version:{kind}:{key}"
+
+async def get_resource_version(kind: str, key: str) -> Optional[str]:
+    """
+    读取 Redis 中镜像的资源版本标识（如某只股票日线的数据版本、某个交易所日历的版本），
+    条件请求据此计算 ETag，不需要访问数据库
+    :param kind: 资源类型，如 stock_daily、stock_info、trade_calendar
+    :param key: 资源标识，如股票代码、交易所代码
+    :return: 版本标识，没有镜像时返回 None
+    """
+    try:
+        version = await get_cache(_resource_version_key(kind, key))
+    except Exception as e:
+        logger.warning(f"读取资源版本失败，按无版本处理: {e}")
+        return None
+    return version.decode() if version else None
+
+async def set_resource_version(kind: str, key: str, version: str, ttl: int = 3600) -> None:
+    """
+    把资源版本标识镜像到 Redis，写入数据或从数据库读取版本后调用；
+    过期时间限制了镜像与数据库不一致的最长时间，过期后由下一次请求从数据库重新读取
+    """
+    try:
+        await set_cache(_resource_version_key(kind, key), version.encode(), ttl)
+    except Exception as e:
+        logger.warning(f"写入资源版本失败: {e}")
@@ -0,0 +1,44 @@
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+from loguru import logger
+from app.config.executor import executor_settings
+
+_cpu_executor: Optional[ProcessPoolExecutor] = None
+
+def get_cpu_executor() -> Optional[ProcessPoolExecutor]:
+    """
+    获取 CPU 密集任务进程池，首次调用时创建；CPU_POOL_SIZE 为 0 时返回 None
+    """
+    global _cpu_executor
+    if executor_settings.CPU_POOL_SIZE <= 0:
+        return None
+    if _cpu_executor is None:
+        # 使用 spawn 启动子进程，避免在多线程的事件循环进程中 fork
+        _cpu_executor = ProcessPoolExecutor(
+            max_workers=executor_settings.CPU_POOL_SIZE,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        logger.info(f"CPU 进程池创建成功，进程数: {executor_settings.CPU_POOL_SIZE}")
+    return _cpu_executor
+
+async def run_cpu_bound(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    在 CPU 进程池中执行函数。func 与参数需可被 pickle，
+    大块数据应以 NumPy 数组传递，进程间只拷贝连续缓冲区
+    """
+    executor = get_cpu_executor()
+    if executor is None:
+        return func(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+def shutdown_cpu_executor() -> None:
+    """关闭 CPU 进程池"""
+    global _cpu_executor
+    if _cpu_executor is not None:
+        _cpu_executor.shutdown(wait=False, cancel_futures=True)
+        _cpu_executor = None
+        logger.info("CPU 进程池已关闭")
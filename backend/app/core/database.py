@@ -1,75 +1,278 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+import asyncio
+import os
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.sql import Executable
+from sqlalchemy.sql.dml import UpdateBase
 from app.config.database import database_settings
-from typing import Generator, AsyncGenerator
-from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from typing import Any, Callable, AsyncGenerator, Optional, TypeVar
+from sqlalchemy.orm import DeclarativeBase, Session
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession, async_sessionmaker
 from fastapi import HTTPException
 from loguru import logger
-from sqlalchemy.exc import SQLAlchemyError
-DB_URL = database_settings.db_url
 ASYNC_DB_URL = database_settings.async_db_url
-engine = create_engine(DB_URL, echo=False)
-async_engine = create_async_engine(ASYNC_DB_URL, echo=False, future=True)
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
-AsyncSessionLocal=async_sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
+ASYNC_REPLICA_DB_URL = database_settings.async_replica_db_url
+
+def _new_pool_stats() -> dict:
+    return {"checkouts": 0, "acquisitions": 0, "wait_total_s": 0.0, "wait_max_s": 0.0, "timeouts": 0}
+
+# 主库与副本连接池的累计统计：借出次数、借出耗时、等待超时次数，用于确认缓存命中的请求没有占用数据库连接，
+# 以及按工作进程数调整连接池大小
+pool_stats = {"primary": _new_pool_stats(), "replica": _new_pool_stats()}
+# 标记了副本读取的查询的实际去向：副本、因复制延迟回退主库、因本会话已写入而留在主库
+routing_stats = {"replica": 0, "lag_fallback": 0, "read_your_writes": 0}
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """
+    统计借出连接耗时的连接池：耗时包括等待空闲连接与新建连接，
+    等待超过 DB_POOL_TIMEOUT 仍未借到连接的次数单独计数
+    """
+    stats_key = "primary"
+
+    def _do_get(self):
+        stats = pool_stats[self.stats_key]
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            stats["timeouts"] += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            stats["acquisitions"] += 1
+            stats["wait_total_s"] += waited
+            stats["wait_max_s"] = max(stats["wait_max_s"], waited)
+
+class InstrumentedReplicaPool(InstrumentedAsyncPool):
+    stats_key = "replica"
+
+def _create_engine(url: str, poolclass: type[InstrumentedAsyncPool]) -> AsyncEngine:
+    engine = create_async_engine(
+        url,
+        echo=False,
+        poolclass=poolclass,
+        pool_size=database_settings.DB_POOL_SIZE,
+        max_overflow=database_settings.DB_MAX_OVERFLOW,
+        pool_timeout=database_settings.DB_POOL_TIMEOUT,
+        pool_recycle=database_settings.DB_POOL_RECYCLE,
+        pool_pre_ping=database_settings.DB_POOL_PRE_PING,
+    )
+    stats = pool_stats[poolclass.stats_key]
+
+    @event.listens_for(engine.sync_engine, "checkout")
+    def _count_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+        stats["checkouts"] += 1
+
+    return engine
+
+# 创建引擎不会建立连接，连接在第一次执行语句时才建立，由 lifespan 在关闭时释放
+async_engine = _create_engine(ASYNC_DB_URL, InstrumentedAsyncPool)
+# 只读副本，未配置 DB_REPLICA_HOST 时为 None，全部读写走主库
+replica_engine: Optional[AsyncEngine] = _create_engine(ASYNC_REPLICA_DB_URL, InstrumentedReplicaPool) if ASYNC_REPLICA_DB_URL else None
+
+def _read_replication_lag(connection) -> Optional[float]:
+    """读取副本的复制延迟（秒），不是副本或复制线程未运行时返回 None"""
+    try:
+        row = connection.exec_driver_sql("SHOW REPLICA STATUS").mappings().first()
+    except SQLAlchemyError:
+        # MySQL 8.0.22 之前只支持旧语法
+        row = connection.exec_driver_sql("SHOW SLAVE STATUS").mappings().first()
+    if row is None:
+        return None
+    lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+    return float(lag) if lag is not None else None
+
+class ReplicaLagMonitor:
+    """
+    副本复制延迟监控：后台任务每隔 interval 秒查询一次副本的复制延迟，
+    延迟不超过 max_lag 时副本可用。查询失败、复制中断或尚未完成第一次检查时副本不可用，读取回退到主库
+    """
+    def __init__(self, max_lag: float = database_settings.DB_REPLICA_MAX_LAG, interval: float = database_settings.DB_REPLICA_LAG_CHECK_INTERVAL):
+        self._max_lag = max_lag
+        self._interval = interval
+        self._lag: Optional[float] = None
+        self._available = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def available(self) -> bool:
+        return self._available
+
+    async def check(self) -> None:
+        """查询一次复制延迟并更新副本是否可用"""
+        try:
+            async with replica_engine.connect() as conn:
+                lag = await conn.run_sync(_read_replication_lag)
+        except Exception as e:
+            # 副本持续不可用时每次检查都会失败，只在状态切换时记录警告
+            logger.debug(f"查询副本复制延迟失败: {e}")
+            lag = None
+        available = lag is not None and lag <= self._max_lag
+        if available != self._available:
+            if available:
+                logger.info(f"副本复制延迟 {lag:.0f}s，读取切换到副本")
+            else:
+                logger.warning(f"副本复制延迟 {lag}s 超过 {self._max_lag:.0f}s 或复制中断，读取回退到主库")
+        self._lag, self._available = lag, available
+
+    def start(self) -> None:
+        if replica_engine is None:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info("副本复制延迟监控已启动")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._available = False
+
+    async def _run(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(self._interval)
+
+    def stats(self) -> dict:
+        return {"available": self._available, "lag_s": self._lag, "max_lag_s": self._max_lag}
+
+replica_monitor = ReplicaLagMonitor()
+
+Statement = TypeVar("Statement", bound=Executable)
+
+def read_from_replica(statement: Statement) -> Statement:
+    """
+    把只读查询标记为可以在副本上执行，仓储的读取方法使用。
+    副本不可用、复制延迟过大，或者所在会话已经写入过数据（保证读到自己的写入）时仍在主库执行
+    """
+    return statement.execution_options(use_replica=True)
+
+# 会话写入过数据后，后续读取都留在主库
+READ_YOUR_WRITES = "read_your_writes"
+
+class RoutingSession(Session):
+    """按语句选择主库或副本的会话：写入与未标记的查询走主库，read_from_replica 标记的查询在副本可用时走副本"""
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info[READ_YOUR_WRITES] = True
+        elif isinstance(clause, Executable) and clause.get_execution_options().get("use_replica") and replica_engine is not None:
+            if self.info.get(READ_YOUR_WRITES):
+                routing_stats["read_your_writes"] += 1
+            elif replica_monitor.available:
+                routing_stats["replica"] += 1
+                return replica_engine.sync_engine
+            else:
+                routing_stats["lag_fallback"] += 1
+        return super().get_bind(mapper, clause=clause, **kw)
+
+AsyncSessionLocal=async_sessionmaker(bind=async_engine, class_=AsyncSession, sync_session_class=RoutingSession, expire_on_commit=False)
+
+def _pool_stats(engine: AsyncEngine, stats: dict) -> dict:
+    pool = engine.pool
+    acquisitions = stats["acquisitions"]
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": database_settings.DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        # 负数表示常驻连接尚未全部建立
+        "overflow": pool.overflow(),
+        "checkouts": stats["checkouts"],
+        "timeouts": stats["timeouts"],
+        "wait_avg_ms": round(stats["wait_total_s"] / acquisitions * 1e3, 3) if acquisitions else 0.0,
+        "wait_max_ms": round(stats["wait_max_s"] * 1e3, 3),
+    }
+
+def db_pool_stats() -> dict:
+    """当前工作进程的数据库连接池状态，配置了副本时包括副本连接池、复制延迟与读取路由统计"""
+    result = {"pid": os.getpid(), "primary": _pool_stats(async_engine, pool_stats["primary"])}
+    if replica_engine is not None:
+        result["replica"] = {
+            **_pool_stats(replica_engine, pool_stats["replica"]),
+            **replica_monitor.stats(),
+            "routing": dict(routing_stats),
+        }
+    return result
 
 class Base(DeclarativeBase):
     pass
 
-def get_db() -> Generator[Session, None, None]:
-    db = SessionLocal()
+class LazyAsyncSession:
+    """
+    AsyncSession 的延迟代理：第一次访问会话的属性（execute、merge、commit 等）时才创建真正的会话，
+    缓存命中的请求不会创建会话，也不会从连接池借出连接
+    """
+    def __init__(self, session_factory: Callable[[], AsyncSession] = AsyncSessionLocal):
+        self._session_factory = session_factory
+        self._session: Optional[AsyncSession] = None
+
+    @property
+    def materialized(self) -> bool:
+        """是否已创建真正的会话"""
+        return self._session is not None
+
+    def __getattr__(self, name: str) -> Any:
+        if self._session is None:
+            self._session = self._session_factory()
+        return getattr(self._session, name)
+
+    async def close(self) -> None:
+        """关闭已创建的会话，未创建时什么也不做"""
+        if self._session is not None:
+            await self._session.close()
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    提供延迟创建的异步会话：仓储第一次执行语句时才创建会话、借出连接，
+    依赖注入构造服务时不占用数据库资源
+    """
+    session = LazyAsyncSession()
     try:
-        yield db
+        yield session
     except SQLAlchemyError as e:
-        logger.error(f"同步数据库连接失败: {str(e)}")
+        logger.error(f"异步数据库连接失败: {str(e)}")
         raise HTTPException(status_code=500, detail="数据库连接失败，请稍后再试")
-    except Exception as e:
-        logger.error(f"同步数据库出现未知错误: {str(e)}")
-        raise HTTPException(status_code=500, detail="未知数据库错误")
     finally:
-        db.close()
-    
-async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
-    async with AsyncSessionLocal() as session:
-        try:
-            yield session
-        except SQLAlchemyError as e:
-            logger.error(f"异步数据库连接失败: {str(e)}")
-            raise HTTPException(status_code=500, detail="数据库连接失败，请稍后再试")
-        except Exception as e:
-            logger.error(f"异步数据库出现未知错误: {str(e)}")
-            raise HTTPException(status_code=500, detail="未知数据库错误")
-        finally:
-            await session.close()
+        # 其他异常（如路由交给全局处理器的限流、准入异常）原样抛出，不改写为 500
+        await session.close()
+
+async def create_tables() -> None:
+    """按已导入的 ORM 模型创建缺失的表，已存在的表不做修改"""
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+async def dispose_engine() -> None:
+    """关闭主库与副本连接池中的全部连接"""
+    await async_engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
+    logger.info("数据库连接池已关闭")
 
 if __name__ == "__main__":
     import asyncio
     # 测试数据库连接
-    def test_connection():
-        try:
-            with engine.connect() as connection:
-                logger.info("同步数据库连接成功")
-        except Exception as e:
-            logger.info(f"同步数据库连接失败: {e}")
-
     async def test_async_connection():
         try:
             async with async_engine.connect() as conn:
                 await conn.run_sync(lambda conn: logger.info("异步数据库连接成功"))
-                logger.info("异步数据库连接成功")
+            logger.info(f"连接池状态: {db_pool_stats()}")
         except Exception as e:
             logger.info(f"异步数据库连接失败: {e}")
-        finally:
-            await async_engine.dispose()
 
-    def drop_all_tables():
+    async def drop_all_tables():
         try:
-            Base.metadata.drop_all(bind=engine)
+            async with async_engine.begin() as conn:
+                await conn.run_sync(Base.metadata.drop_all)
             logger.info("所有表格已删除")
         except Exception as e:
             logger.info(f"删除表格时出错: {e}")
-    
-    test_connection()
-    asyncio.run(test_async_connection())
-    drop_all_tables()
+
+    async def main():
+        await test_async_connection()
+        await drop_all_tables()
+        await dispose_engine()
+
+    asyncio.run(main())
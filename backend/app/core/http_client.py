@@ -0,0 +1,52 @@
+import asyncio
+import aiohttp
+from typing import Optional
+from loguru import logger
+
+# 连接池总连接数上限
+HTTP_POOL_LIMIT = 100
+# 单个主机的连接数上限
+HTTP_POOL_LIMIT_PER_HOST = 20
+# 空闲连接保活时间（秒）
+HTTP_KEEPALIVE_TIMEOUT = 60
+# 单次请求总超时时间（秒）
+HTTP_REQUEST_TIMEOUT = 15
+
+_http_session: Optional[aiohttp.ClientSession] = None
+_http_session_lock: Optional[asyncio.Lock] = None
+
+async def get_http_session() -> aiohttp.ClientSession:
+    """
+    获取进程内共享的 aiohttp 会话（带 keep-alive 连接池），首次调用时创建
+    :return: aiohttp.ClientSession 实例
+    """
+    global _http_session, _http_session_lock
+    if _http_session is not None and not _http_session.closed:
+        return _http_session
+    if _http_session_lock is None:
+        _http_session_lock = asyncio.Lock()
+    async with _http_session_lock:
+        if _http_session is None or _http_session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=HTTP_POOL_LIMIT,
+                limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=300,
+            )
+            _http_session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=HTTP_REQUEST_TIMEOUT),
+                headers={"User-Agent": "Mozilla/5.0"},
+            )
+            logger.info("共享 HTTP 连接池创建成功")
+    return _http_session
+
+async def close_http_session() -> None:
+    """
+    关闭共享的 aiohttp 会话，释放连接池
+    """
+    global _http_session
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+        logger.info("共享 HTTP 连接池已关闭")
+    _http_session = None
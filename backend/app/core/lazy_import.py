@@ -0,0 +1,34 @@
+import asyncio
+import importlib
+import time
+from types import ModuleType
+from typing import Dict, Iterable
+from loguru import logger
+
+# 导入耗时较长、只在抓取或计算时使用的依赖，启动后在后台线程中预先导入
+HEAVY_MODULES = ("pandas", "akshare")
+
+# 已在线程中导入完成的模块
+_loaded: Dict[str, ModuleType] = {}
+
+async def import_module_async(name: str) -> ModuleType:
+    """
+    在线程中导入模块并返回，首次导入 pandas、akshare 这类耗时数百毫秒的模块时不阻塞事件循环。
+    导入完成后直接返回已导入的模块；模块正在其他线程中导入时，等待该次导入完成
+    """
+    module = _loaded.get(name)
+    if module is None:
+        module = await asyncio.to_thread(importlib.import_module, name)
+        _loaded[name] = module
+    return module
+
+async def preload_modules(names: Iterable[str] = HEAVY_MODULES) -> None:
+    """依次在后台线程中导入模块，未安装的模块只记录警告"""
+    for name in names:
+        started = time.perf_counter()
+        try:
+            await import_module_async(name)
+        except ImportError as e:
+            logger.warning(f"预加载模块 {name} 失败: {e}")
+            continue
+        logger.info(f"预加载模块 {name} 完成，耗时 {(time.perf_counter() - started) * 1e3:.0f} ms")
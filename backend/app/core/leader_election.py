@@ -0,0 +1,138 @@
+import asyncio
+import os
+import socket
+import time
+import uuid
+from typing import Callable, Optional
+from loguru import logger
+from app.config.scheduler import scheduler_settings
+from app.core.redis import redis_client
+
+# 续约与释放都先确认租约仍属于本进程，避免在租约过期、被其他进程取得后误续或误删
+RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+class LeaderElector:
+    """
+    基于 Redis 租约的选主：各工作进程定期尝试 SET NX PX 取得租约，持有者按间隔续约。
+
+    - 租约的有效期从发起请求前开始计算，本地认为仍是主节点的时间不会超过 Redis 中租约的实际有效期
+    - 续约失败（租约已被他人取得）或在有效期内一直无法续约（Redis 不可用）时放弃主节点身份
+    - 成为主节点与失去主节点身份时分别调用 on_elected 与 on_demoted
+    - 关闭选主（单进程部署）时本进程总是主节点
+    """
+    def __init__(
+        self,
+        key: str = scheduler_settings.SCHEDULER_LEASE_KEY,
+        ttl: float = scheduler_settings.SCHEDULER_LEASE_TTL,
+        renew_interval: float = scheduler_settings.SCHEDULER_LEASE_RENEW_INTERVAL,
+        enabled: bool = scheduler_settings.SCHEDULER_LEADER_ELECTION,
+    ):
+        self._key = key
+        self._ttl_ms = int(ttl * 1000)
+        self._renew_interval = renew_interval
+        self._enabled = enabled
+        self._token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._renew_script = redis_client.register_script(RENEW_SCRIPT)
+        self._release_script = redis_client.register_script(RELEASE_SCRIPT)
+        self._lease_deadline = 0.0
+        self._leader = False
+        self._elections = 0
+        self._task: Optional[asyncio.Task] = None
+        self._on_elected: Optional[Callable[[], None]] = None
+        self._on_demoted: Optional[Callable[[], None]] = None
+
+    @property
+    def is_leader(self) -> bool:
+        """本进程当前是否持有未过期的租约"""
+        return self._leader and time.monotonic() < self._lease_deadline
+
+    def start(self, on_elected: Callable[[], None], on_demoted: Callable[[], None]) -> None:
+        self._on_elected = on_elected
+        self._on_demoted = on_demoted
+        if not self._enabled:
+            self._lease_deadline = float("inf")
+            self._set_leader(True)
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"调度器选主已启动，租约 {self._key}，标识 {self._token}")
+
+    async def stop(self) -> None:
+        """停止续约并释放持有的租约，其他工作进程无需等待租约过期即可接替"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._leader and self._enabled:
+            try:
+                await self._release_script(keys=[self._key], args=[self._token])
+                logger.info("已释放调度器租约")
+            except Exception as e:
+                logger.warning(f"释放调度器租约失败，等待其过期: {e}")
+        self._set_leader(False)
+
+    async def _run(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(self._renew_interval)
+
+    async def check(self) -> bool:
+        """取得或续约租约一次，返回本进程是否为主节点"""
+        started = time.monotonic()
+        try:
+            if self._leader:
+                held = bool(await self._renew_script(keys=[self._key], args=[self._token, self._ttl_ms]))
+            else:
+                held = bool(await redis_client.set(self._key, self._token, nx=True, px=self._ttl_ms))
+        except Exception as e:
+            # Redis 不可用：租约到期前保持身份，到期后放弃
+            logger.debug(f"调度器租约检查失败: {e}")
+            if self._leader and not self.is_leader:
+                logger.warning("调度器租约到期前未能续约，放弃主节点身份")
+                self._set_leader(False)
+            return self.is_leader
+        if held:
+            self._lease_deadline = started + self._ttl_ms / 1000
+        elif self._leader:
+            logger.warning("调度器租约已被其他工作进程取得，放弃主节点身份")
+        self._set_leader(held)
+        return held
+
+    def _set_leader(self, leader: bool) -> None:
+        if leader == self._leader:
+            return
+        self._leader = leader
+        if leader:
+            self._elections += 1
+            logger.info(f"工作进程 {self._token} 成为调度器主节点")
+            callback = self._on_elected
+        else:
+            self._lease_deadline = 0.0
+            callback = self._on_demoted
+        if callback is not None:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"调度器主节点切换回调执行失败: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self._enabled,
+            "token": self._token,
+            "leader": self.is_leader,
+            "elections": self._elections,
+            "lease_remaining_s": round(max(0.0, self._lease_deadline - time.monotonic()), 3) if self.is_leader and self._enabled else None,
+        }
+
+scheduler_leader = LeaderElector()
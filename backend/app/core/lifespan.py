@@ -0,0 +1,73 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Optional, Union
+from fastapi import FastAPI
+from loguru import logger
+from app.config.database import database_settings
+from app.core.database import create_tables, dispose_engine, replica_monitor
+from app.core.redis import redis_client, close_redis
+from app.core.apscheduler import start_scheduler, stop_scheduler
+from app.core.http_client import close_http_session
+from app.core.cpu_executor import shutdown_cpu_executor
+from app.core.password_executor import shutdown_password_executor
+from app.core.loop_monitor import loop_lag_monitor
+from app.core.lazy_import import preload_modules
+from app.services.stock_info_refresher import stock_info_refresher
+from app.services.last_login_recorder import last_login_recorder
+
+# 关闭步骤按顺序执行：先停止产生新任务的后台组件，再写入剩余数据，最后释放 Redis 与数据库连接池
+SHUTDOWN_STEPS: list[tuple[str, Callable[[], Union[None, Awaitable[None]]]]] = [
+    ("事件循环延迟监控", loop_lag_monitor.stop),
+    ("调度器", stop_scheduler),
+    ("个股信息刷新", stock_info_refresher.stop),
+    ("最后登录时间写入", last_login_recorder.stop),
+    ("HTTP 会话", close_http_session),
+    ("CPU 进程池", shutdown_cpu_executor),
+    ("密码哈希线程池", shutdown_password_executor),
+    ("副本复制延迟监控", replica_monitor.stop),
+    ("Redis 连接池", close_redis),
+    ("数据库连接池", dispose_engine),
+]
+
+# 后台预加载任务，保存引用避免被回收
+_preload_task: Optional[asyncio.Task] = None
+
+async def _startup() -> None:
+    global _preload_task
+    if database_settings.DB_CREATE_TABLES_ON_STARTUP:
+        await create_tables()
+        logger.info("数据库表结构创建成功")
+    try:
+        await redis_client.ping()
+    except Exception as e:
+        # 缓存、限流与吊销列表在 Redis 不可用时均可降级运行，不阻止启动
+        logger.warning(f"Redis 连接检查失败: {e}")
+    loop_lag_monitor.start()
+    # 第一次检查完成前读取走主库
+    replica_monitor.start()
+    start_scheduler()
+    # 不等待预加载完成即开始处理请求
+    _preload_task = asyncio.create_task(preload_modules())
+
+async def _shutdown() -> None:
+    for name, step in SHUTDOWN_STEPS:
+        try:
+            result = step()
+            if result is not None:
+                await result
+        except Exception as e:
+            # 某一步失败不影响后续资源的释放
+            logger.error(f"关闭{name}失败: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    应用生命周期：启动时检查 Redis 连接、启动后台任务并在后台预加载抓取依赖，关闭时按顺序停止后台任务并释放连接池。
+    表结构由 python -m app.migrate 单独创建，DB_CREATE_TABLES_ON_STARTUP 开启时才在启动时建表。
+    数据库引擎与 Redis 客户端在导入时创建但不建立连接，连接在第一次使用时建立
+    """
+    await _startup()
+    try:
+        yield
+    finally:
+        await _shutdown()
@@ -0,0 +1,55 @@
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+from loguru import logger
+from app.config.executor import executor_settings
+
+class EventLoopLagMonitor:
+    """
+    事件循环延迟监控：周期性 sleep 固定间隔，实际唤醒时间与预期的差值即为事件循环被阻塞的时长
+    """
+    def __init__(self, interval: float = executor_settings.LOOP_LAG_SAMPLE_INTERVAL, max_samples: int = 3000):
+        self._interval = interval
+        self._samples: deque[float] = deque(maxlen=max_samples)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info("事件循环延迟监控已启动")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def reset(self) -> None:
+        self._samples.clear()
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self._interval)
+            self._samples.append(max(0.0, time.perf_counter() - started - self._interval))
+
+    def stats(self) -> dict:
+        """
+        返回最近采样窗口内的事件循环延迟统计（毫秒）
+        """
+        if not self._samples:
+            return {"samples": 0, "last_ms": 0.0, "mean_ms": 0.0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        ordered = sorted(self._samples)
+        def percentile(p: float) -> float:
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+        return {
+            "samples": len(ordered),
+            "last_ms": round(self._samples[-1] * 1000, 3),
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+            "p50_ms": round(percentile(0.5), 3),
+            "p99_ms": round(percentile(0.99), 3),
+            "max_ms": round(ordered[-1] * 1000, 3),
+        }
+
+loop_lag_monitor = EventLoopLagMonitor()
@@ -0,0 +1,170 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from loguru import logger
+from app.config.password import password_settings
+
+class PasswordHashBusyError(Exception):
+    """密码哈希任务过多"""
+    pass
+
+_password_executor: Optional[ThreadPoolExecutor] = None
+# 已提交、尚未完成的哈希任务数，只在事件循环线程内读写
+_pending = 0
+
+def get_password_executor() -> Optional[ThreadPoolExecutor]:
+    """
+    获取密码哈希线程池，首次调用时创建；PASSWORD_HASH_POOL_SIZE 为 0 时返回 None。
+    bcrypt 在计算哈希时释放 GIL，因此使用线程池即可并行，且不需要跨进程传递参数
+    """
+    global _password_executor
+    if password_settings.PASSWORD_HASH_POOL_SIZE <= 0:
+        return None
+    if _password_executor is None:
+        _password_executor = ThreadPoolExecutor(
+            max_workers=password_settings.PASSWORD_HASH_POOL_SIZE,
+            thread_name_prefix="password-hash",
+        )
+        logger.info(f"密码哈希线程池创建成功，线程数: {password_settings.PASSWORD_HASH_POOL_SIZE}")
+    return _password_executor
+
+async def run_password_hash(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    在密码哈希线程池中执行函数。同时提交的任务数超过 PASSWORD_HASH_MAX_PENDING 时抛出 PasswordHashBusyError，
+    登录洪峰只会让登录请求本身排队或被拒绝，不会阻塞事件循环上的其他请求
+    """
+    global _pending
+    executor = get_password_executor()
+    if executor is None:
+        return func(*args, **kwargs)
+    if _pending >= password_settings.PASSWORD_HASH_MAX_PENDING:
+        logger.warning(f"密码哈希任务过多，当前 {_pending} 个，拒绝新任务")
+        raise PasswordHashBusyError("密码校验请求过多，请稍后重试")
+    _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+    finally:
+        _pending -= 1
+
+def shutdown_password_executor() -> None:
+    """关闭密码哈希线程池"""
+    global _password_executor
+    if _password_executor is not None:
+        _password_executor.shutdown(wait=False, cancel_futures=True)
+        _password_executor = None
+        logger.info("密码哈希线程池已关闭")
+
+if __name__ == "__main__":
+    # 负载测试：python -m app.core.password_executor
+    # 在进程内通过 ASGI 调用真实的 /user/login 与 /stock/daily 路由（仓储与日线服务替换为内存实现），
+    # 以固定间隔请求 /stock/daily 的同时发起一波并发登录，对比 bcrypt 在事件循环内执行与放入线程池时日线接口的延迟
+    import statistics
+    import time
+    from datetime import datetime
+    import numpy as np
+    from fastapi import FastAPI
+    from httpx import ASGITransport, AsyncClient
+    from app.api import stock_router, user_router
+    from app.models.user_orm import UserOrm, UserRoleEnum, UserStatusEnum
+    from app.schemas.daily_bars import DailyBars
+    from app.services.user_service import UserService
+    from app.utils.auth_utils import is_user_authenticated
+    from app.utils.password_utils import get_password_hash
+
+    LOGIN_BURST, PROBE_INTERVAL = 16, 0.05
+    TEST_USERNAME, TEST_PASSWORD = "loadtest", "securepassword123"
+    hashed_password = get_password_hash(TEST_PASSWORD)
+
+    class MemoryUserRepository:
+        """只实现登录用到的方法的内存仓储"""
+        async def find_active_by_username(self, username: str) -> Optional[UserOrm]:
+            return UserOrm(id=1, username=username, email="loadtest@example.com", nickname=username,
+                           hashed_password=hashed_password, status=UserStatusEnum.enabled, role=UserRoleEnum.user, created_at=datetime.now())
+
+        async def update_password(self, username: str, hashed_password: str) -> bool:
+            return True
+
+    class MemoryDailyService:
+        """返回固定日线的内存日线服务"""
+        BAR_COUNT = 250
+        closes = np.round(10 + np.cumsum(np.random.default_rng(0).normal(0, 0.1, BAR_COUNT)), 2)
+        bars = DailyBars.from_columns("000001", {
+            "date": np.arange(BAR_COUNT).astype("datetime64[D]"), "open": closes, "high": closes, "low": closes, "close": closes,
+            "change": np.zeros(BAR_COUNT), "pct_chg": np.zeros(BAR_COUNT), "vol": np.ones(BAR_COUNT, dtype=np.int64),
+            "amount": closes, "qfq_factor": np.ones(BAR_COUNT), "hfq_factor": np.ones(BAR_COUNT),
+        })
+
+        async def get_daily_bars(self, *args, **kwargs) -> DailyBars:
+            return self.bars
+
+    def memory_user_service() -> UserService:
+        service = UserService(None)
+        service._repository = MemoryUserRepository()
+        return service
+
+    async def always_authenticated() -> bool:
+        return True
+
+    app = FastAPI()
+    app.include_router(stock_router.router)
+    app.include_router(user_router.router)
+    app.dependency_overrides[user_router.get_user_service] = memory_user_service
+    app.dependency_overrides[stock_router.get_stock_daily_service] = MemoryDailyService
+    app.dependency_overrides[is_user_authenticated] = always_authenticated
+
+    async def probe_daily(client: AsyncClient, stop: asyncio.Event, latencies: list) -> None:
+        """
+        按固定节奏请求 /stock/daily，延迟从计划发起的时刻算起：
+        事件循环被阻塞时请求无法按时发出，这段等待也计入延迟
+        """
+        scheduled = time.perf_counter()
+        while not stop.is_set():
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            response = await client.post("/stock/daily", json={"stock_code": "000001"})
+            latencies.append(time.perf_counter() - scheduled)
+            assert response.status_code == 200 and response.json()["status"] == 0
+            scheduled = max(scheduled + PROBE_INTERVAL, time.perf_counter())
+
+    async def run(pool_size: int) -> None:
+        password_settings.PASSWORD_HASH_POOL_SIZE = pool_size
+        shutdown_password_executor()
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            idle, busy, stop = [], [], asyncio.Event()
+            # 空闲时的基线延迟
+            probe = asyncio.create_task(probe_daily(client, stop, idle))
+            await asyncio.sleep(0.5)
+            stop.set()
+            await probe
+
+            stop.clear()
+            probe = asyncio.create_task(probe_daily(client, stop, busy))
+            started = time.perf_counter()
+            logins = await asyncio.gather(*(
+                client.post("/user/login", json={"username": TEST_USERNAME, "password": TEST_PASSWORD})
+                for _ in range(LOGIN_BURST)
+            ))
+            burst_cost = time.perf_counter() - started
+            stop.set()
+            await probe
+            assert all(response.json()["status"] == 0 for response in logins), "登录失败"
+
+        def summary(latencies: list) -> str:
+            ordered = sorted(latencies)
+            p99 = ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))]
+            return (f"{len(ordered)} 次，p50 {statistics.median(ordered) * 1e3:.1f} ms，"
+                    f"p99 {p99 * 1e3:.1f} ms，max {ordered[-1] * 1e3:.1f} ms")
+
+        mode = "事件循环内执行" if pool_size <= 0 else f"线程池（{pool_size} 线程）"
+        logger.info(f"bcrypt {mode}：{LOGIN_BURST} 个并发登录耗时 {burst_cost:.2f} s")
+        logger.info(f"  /stock/daily 空闲时 {summary(idle)}")
+        logger.info(f"  /stock/daily 登录期间 {summary(busy)}")
+
+    async def main() -> None:
+        logger.info(f"bcrypt 工作因子: {password_settings.BCRYPT_ROUNDS}")
+        for pool_size in (0, password_settings.PASSWORD_HASH_POOL_SIZE or 2):
+            await run(pool_size)
+        shutdown_password_executor()
+
+    asyncio.run(main())
@@ -0,0 +1,169 @@
+import math
+from contextvars import ContextVar
+from typing import Callable, Optional, Tuple
+from fastapi import Depends, Request
+from fastapi.responses import JSONResponse
+from loguru import logger
+from app.config.rate_limit import rate_limit_settings
+from app.core.redis import redis_client
+from app.core.token_utils import optional_oauth2_scheme
+from app.models.user_orm import UserRoleEnum
+from app.utils.auth_utils import verify_access_token
+from app.utils.response_utils import error_response
+
+# 接口开销等级：light 只读缓存或小数据量，standard 单只股票的行情计算，heavy 批量或流式接口
+COST_CLASSES = ("light", "standard", "heavy")
+# 会触发外部接口抓取的请求单独计数
+UPSTREAM_COST_CLASS = "upstream"
+# 未登录请求使用的角色
+ANONYMOUS_ROLE = "anonymous"
+
+# 滑动窗口计数：每个身份与开销等级一个哈希，字段为窗口序号，值为该窗口内的计数。
+# 估计值 = 上一窗口计数 × 上一窗口在滑动窗口内的剩余比例 + 当前窗口计数。
+# 使用 Redis 服务器时间，各工作进程的时钟偏差不影响计数；判断与计数在同一脚本内完成，保证原子性。
+# 返回 {是否允许, 剩余额度, 需等待的毫秒数}
+SLIDING_WINDOW_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+if cost > limit then
+    return {0, 0, window}
+end
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local index = math.floor(now / window)
+local elapsed = now - index * window
+local current = tonumber(redis.call('HGET', KEYS[1], tostring(index)) or '0')
+local previous = tonumber(redis.call('HGET', KEYS[1], tostring(index - 1)) or '0')
+local estimate = previous * (window - elapsed) / window + current
+if estimate + cost <= limit then
+    redis.call('HINCRBY', KEYS[1], tostring(index), cost)
+    redis.call('HDEL', KEYS[1], tostring(index - 2))
+    redis.call('PEXPIRE', KEYS[1], window * 2)
+    return {1, math.floor(limit - estimate - cost), 0}
+end
+local wait
+if current + cost <= limit then
+    -- 当前窗口还有余量，等上一窗口的权重衰减到足够小
+    wait = (window - elapsed) - window * (limit - current - cost) / previous
+else
+    -- 进入下一个窗口后，当前窗口的计数再按权重衰减
+    wait = (window - elapsed) + window * (1 - (limit - cost) / current)
+end
+return {0, 0, math.ceil(wait)}
+"""
+
+class RateLimitExceeded(Exception):
+    """请求超出限流额度"""
+    def __init__(self, cost_class: str, retry_after: int):
+        self.cost_class = cost_class
+        self.retry_after = retry_after
+        super().__init__(f"{cost_class} 请求过于频繁，请 {retry_after} 秒后重试")
+
+class RateLimitCostTooLarge(RateLimitExceeded):
+    """单次请求消耗的额度超过每个窗口的额度，等待多久都无法通过，需要减小请求规模"""
+    def __init__(self, cost_class: str, cost: int, limit: int):
+        super().__init__(cost_class, retry_after=0)
+        self.cost = cost
+        self.limit = limit
+        self.args = (f"{cost_class} 单次请求需要 {cost} 个额度，超过每个窗口的额度 {limit}，请减小请求规模",)
+
+# 当前请求的限流身份 (身份标识, 角色)，由限流依赖设置，供服务层在抓取外部数据前扣减 upstream 额度
+_current_identity: ContextVar[Optional[Tuple[str, str]]] = ContextVar("rate_limit_identity", default=None)
+
+class RateLimiter:
+    """
+    基于 Redis 滑动窗口计数的限流器
+
+    - 登录用户按用户名计数、按角色取额度，未登录请求按客户端 IP 计数
+    - 每个接口声明开销等级，各等级独立计数；会触发外部抓取的请求另外扣减更严格的 upstream 额度
+    - Redis 不可用时放行并记录警告
+    """
+    KEY_PREFIX = "rate_limit"
+
+    def __init__(self, window: int = rate_limit_settings.RATE_LIMIT_WINDOW):
+        self._window_ms = window * 1000
+        self._script = redis_client.register_script(SLIDING_WINDOW_SCRIPT)
+
+    @staticmethod
+    def limit_for(role: str, cost_class: str) -> Optional[int]:
+        """角色在开销等级下每个窗口的额度，未配置时返回 None（不限流）"""
+        return rate_limit_settings.RATE_LIMITS.get(role, {}).get(cost_class)
+
+    async def hit(self, identity: str, role: str, cost_class: str, cost: int = 1) -> None:
+        """
+        扣减额度，超出时抛出 RateLimitExceeded；cost 超过每个窗口的额度时重试也无法通过，
+        不计数直接抛出 RateLimitCostTooLarge
+        :param identity: 计数身份，如 user:alice、ip:127.0.0.1
+        :param cost: 本次请求消耗的额度
+        """
+        limit = self.limit_for(role, cost_class)
+        if not rate_limit_settings.RATE_LIMIT_ENABLED or limit is None:
+            return
+        if cost > limit:
+            logger.warning(f"{identity}（{role}）的 {cost_class} 请求需要 {cost} 个额度，超过每个窗口的额度 {limit}")
+            raise RateLimitCostTooLarge(cost_class, cost, limit)
+        try:
+            allowed, _, wait_ms = await self._script(
+                keys=[f"{self.KEY_PREFIX}:{cost_class}:{identity}"],
+                args=[limit, self._window_ms, cost],
+            )
+        except Exception as e:
+            logger.warning(f"限流计数失败，放行请求: {e}")
+            return
+        if not allowed:
+            retry_after = max(1, math.ceil(int(wait_ms) / 1000))
+            logger.warning(f"{identity}（{role}）的 {cost_class} 请求超出限流额度 {limit}/{self._window_ms // 1000}s，{retry_after} 秒后重试")
+            raise RateLimitExceeded(cost_class, retry_after)
+
+rate_limiter = RateLimiter()
+
+async def _resolve_identity(request: Request, token: Optional[str]) -> Tuple[str, str]:
+    """由访问令牌解析限流身份，令牌缺失或无效时按客户端 IP 计为匿名请求"""
+    if token:
+        try:
+            claims = await verify_access_token(token)
+            return f"user:{claims.get('sub')}", claims.get("role") or UserRoleEnum.user.value
+        except ValueError:
+            pass
+    client_host = request.client.host if request.client else "unknown"
+    return f"ip:{client_host}", ANONYMOUS_ROLE
+
+def rate_limit(cost_class: str) -> Callable:
+    """
+    生成按开销等级限流的路由依赖，用法：@router.post(..., dependencies=[Depends(rate_limit("standard"))])
+    同时记录当前请求的限流身份，供 acquire_upstream_budget 使用
+    """
+    if cost_class not in COST_CLASSES:
+        raise ValueError(f"未知的接口开销等级: {cost_class}")
+
+    async def dependency(request: Request, token: Optional[str] = Depends(optional_oauth2_scheme)) -> None:
+        identity, role = await _resolve_identity(request, token)
+        _current_identity.set((identity, role))
+        await rate_limiter.hit(identity, role, cost_class)
+
+    return dependency
+
+async def acquire_upstream_budget(cost: int = 1) -> None:
+    """
+    在抓取外部数据前扣减当前请求身份的 upstream 额度，超出时抛出 RateLimitExceeded，
+    需要抓取的股票数超过该角色每个窗口的额度时抛出 RateLimitCostTooLarge。
+    定时任务等不经过限流依赖的调用没有请求身份，不受限制
+    :param cost: 将要抓取的股票数量
+    """
+    current = _current_identity.get()
+    if current is None:
+        return
+    identity, role = current
+    await rate_limiter.hit(identity, role, UPSTREAM_COST_CLASS, cost)
+
+async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded) -> JSONResponse:
+    """
+    把 RateLimitExceeded 转换为带 Retry-After 的 429 响应；
+    RateLimitCostTooLarge 重试也无法通过，转换为不带 Retry-After 的 400 响应
+    """
+    if isinstance(exc, RateLimitCostTooLarge):
+        body = error_response(error=exc, message="请求规模过大", status_code=400, detail={"cost": exc.cost, "limit": exc.limit})
+        return JSONResponse(status_code=400, content=body.model_dump())
+    body = error_response(error=exc, message="请求过于频繁", status_code=429, detail={"retry_after": exc.retry_after})
+    return JSONResponse(status_code=429, content=body.model_dump(), headers={"Retry-After": str(exc.retry_after)})
@@ -1,15 +1,39 @@
+import os
 import redis.asyncio as aioredis
+from loguru import logger
 from app.config.redis import redis_settings
 
 # 统一 Redis 连接 URL
 REDIS_URL = redis_settings.redis_url
 
-# 创建 Redis 客户端，适配二进制数据
-redis_client = aioredis.Redis.from_url(
+# 连接用尽时等待空闲连接而不是立即报错；创建连接池不会建立连接，由 lifespan 在关闭时释放
+redis_pool = aioredis.BlockingConnectionPool.from_url(
     REDIS_URL,
-    decode_responses=False
+    max_connections=redis_settings.REDIS_MAX_CONNECTIONS,
+    timeout=redis_settings.REDIS_POOL_TIMEOUT,
+    socket_timeout=redis_settings.REDIS_SOCKET_TIMEOUT,
+    socket_connect_timeout=redis_settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+    health_check_interval=redis_settings.REDIS_HEALTH_CHECK_INTERVAL,
+    decode_responses=False,
 )
 
+# 创建 Redis 客户端，适配二进制数据
+redis_client = aioredis.Redis(connection_pool=redis_pool)
+
+def redis_pool_stats() -> dict:
+    """当前工作进程的 Redis 连接池状态"""
+    return {
+        "pid": os.getpid(),
+        "max_connections": redis_pool.max_connections,
+        "in_use": len(redis_pool._in_use_connections),
+        "idle": len(redis_pool._available_connections),
+    }
+
+async def close_redis() -> None:
+    """关闭 Redis 客户端与连接池中的全部连接"""
+    await redis_client.aclose(close_connection_pool=True)
+    logger.info("Redis 连接池已关闭")
+
 async def set_cache(key: str, value: bytes, ttl: int = 3600) -> bool:
     """
     设置缓存（适合存储序列化后的对象）
@@ -37,6 +61,25 @@ async def delete_cache(key: str) -> bool:
     result = await redis_client.delete(key)
     return result == 1
 
+async def scan_cache_keys(pattern: str) -> list[bytes]:
+    """
+    按通配模式遍历缓存键，使用 SCAN 分批遍历，不会像 KEYS 一样长时间阻塞 Redis
+    :param pattern: 通配模式，如 cache:app.services.stock_daily_service.get_daily_bars:*
+    :return: 匹配的缓存键
+    """
+    return [key async for key in redis_client.scan_iter(match=pattern, count=1000)]
+
+async def delete_cache_keys(keys: list, batch_size: int = 1000) -> int:
+    """
+    分批删除多个缓存键
+    :param keys: 缓存键
+    :return: 实际删除的键数量
+    """
+    deleted = 0
+    for start in range(0, len(keys), batch_size):
+        deleted += await redis_client.unlink(*keys[start:start + batch_size])
+    return deleted
+
 async def clear_all_cache() -> bool:
     """
     清除 Redis 中所有键（慎用！）
@@ -0,0 +1,97 @@
+import asyncio
+import math
+import time
+from typing import Dict, Set
+from loguru import logger
+from app.config.jwt import jwt_settings
+from app.core.redis import redis_client
+
+class TokenRevocationError(Exception):
+    """Token 吊销异常"""
+    pass
+
+class TokenRevocationList:
+    """
+    基于 Redis 的 Token 吊销列表
+
+    - 登出时把 Token 的 jti 写入有序集合，分数为 Token 的 exp，过期的 jti 在写入时顺带清理，集合只保留仍有效的 Token
+    - 封禁或注销用户时把用户名写入另一个有序集合，分数为吊销时刻，该用户在此之前签发（iat 不晚于该时刻）的 Token 全部失效
+    - 每个工作进程在本地保存两个集合的快照，最多每 refresh_interval 秒用一次管道批量刷新，
+      并发请求共用同一次刷新，鉴权时不会每个请求都访问 Redis，更不会访问数据库
+    - Redis 不可用时沿用上一份快照并记录警告，不阻断鉴权
+    """
+    JTI_KEY = "token_revocation:jti"
+    USER_KEY = "token_revocation:user"
+    # 用户吊销记录的保留时长（秒），需长于任何 Token 的有效期
+    USER_RETENTION = 7 * 24 * 3600
+
+    def __init__(self, refresh_interval: float = jwt_settings.TOKEN_REVOCATION_REFRESH_INTERVAL):
+        self._refresh_interval = refresh_interval
+        self._revoked_jti: Set[str] = set()
+        self._user_cutoff: Dict[str, float] = {}
+        self._refreshed_at = -math.inf
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self) -> bool:
+        return time.monotonic() - self._refreshed_at < self._refresh_interval
+
+    async def refresh(self, force: bool = False) -> None:
+        """从 Redis 批量拉取仍有效的吊销记录，替换本地快照"""
+        if not force and self._is_fresh():
+            return
+        async with self._lock:
+            if not force and self._is_fresh():
+                return
+            now = time.time()
+            try:
+                async with redis_client.pipeline(transaction=False) as pipe:
+                    pipe.zrangebyscore(self.JTI_KEY, now, "+inf")
+                    pipe.zrangebyscore(self.USER_KEY, now - self.USER_RETENTION, "+inf", withscores=True)
+                    revoked_jti, user_cutoff = await pipe.execute()
+                self._revoked_jti = {jti.decode() for jti in revoked_jti}
+                self._user_cutoff = {username.decode(): cutoff for username, cutoff in user_cutoff}
+            except Exception as e:
+                logger.warning(f"刷新 Token 吊销列表失败，沿用本地快照: {e}")
+            # 失败时同样推迟下一次刷新，避免 Redis 故障期间每个请求都去重试
+            self._refreshed_at = time.monotonic()
+
+    async def is_revoked(self, claims: dict) -> bool:
+        """检查已验证的 Token 声明是否已被吊销"""
+        await self.refresh()
+        if claims.get("jti") in self._revoked_jti:
+            return True
+        cutoff = self._user_cutoff.get(claims.get("sub"))
+        return cutoff is not None and claims.get("iat", 0) <= cutoff
+
+    async def revoke(self, jti: str, expires_at: float) -> None:
+        """
+        吊销单个 Token（登出），立即对本进程生效，其他工作进程在下次刷新快照后生效
+        :param jti: Token 的 jti 声明
+        :param expires_at: Token 的 exp 声明（Unix 时间戳），过期后记录自动清理
+        """
+        try:
+            async with redis_client.pipeline(transaction=True) as pipe:
+                pipe.zadd(self.JTI_KEY, {jti: expires_at})
+                pipe.zremrangebyscore(self.JTI_KEY, "-inf", time.time())
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"吊销 Token {jti} 失败: {e}")
+            raise TokenRevocationError(f"吊销 Token 失败: {e}") from e
+        self._revoked_jti.add(jti)
+        logger.info(f"Token {jti} 已吊销")
+
+    async def revoke_user(self, username: str) -> None:
+        """吊销指定用户此前签发的全部 Token（封禁、注销），生效范围同 revoke"""
+        cutoff = time.time()
+        try:
+            async with redis_client.pipeline(transaction=True) as pipe:
+                pipe.zadd(self.USER_KEY, {username: cutoff})
+                pipe.zremrangebyscore(self.USER_KEY, "-inf", cutoff - self.USER_RETENTION)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"吊销用户 {username} 的 Token 失败: {e}")
+            raise TokenRevocationError(f"吊销用户 Token 失败: {e}") from e
+        self._user_cutoff[username] = cutoff
+        logger.info(f"用户 {username} 此前签发的 Token 已全部吊销")
+
+token_revocation_list = TokenRevocationList()
@@ -1,6 +1,9 @@
+import hashlib
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from jose import jwt, JWTError
-from typing import Optional
+from typing import Optional, Tuple
 from app.config.jwt import jwt_settings
 import uuid
 from fastapi.security import OAuth2PasswordBearer
@@ -33,5 +36,60 @@ def decode_access_token(token: str) -> dict:
         return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError as e:
         raise ValueError(f"Token验证失败: {e}")
+
+class VerifiedClaimsCache:
+    """
+    已验证 Token 声明的进程内 LRU 缓存，以 Token 的 SHA-256 摘要为键，条目在 Token 的 exp 时刻失效。
+    同一个 Token 只在首次出现时验证签名，之后的请求直接取缓存的声明
+    """
+    def __init__(self, max_size: int):
+        self._max_size = max_size
+        self._entries: OrderedDict[bytes, Tuple[float, dict]] = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, claims = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return claims
+
+    def put(self, token: str, claims: dict) -> None:
+        # 没有 exp 的 Token 不缓存，每次都重新验证
+        if self._max_size <= 0 or "exp" not in claims:
+            return
+        key = self._key(token)
+        self._entries[key] = (float(claims["exp"]), claims)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def discard(self, token: str) -> None:
+        self._entries.pop(self._key(token), None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+claims_cache = VerifiedClaimsCache(jwt_settings.JWT_CLAIMS_CACHE_SIZE)
+
+def decode_access_token_cached(token: str) -> dict:
+    """
+    与 decode_access_token 相同，但已验证过的 Token 直接返回缓存的声明（副本），不再重复验证签名
+    """
+    claims = claims_cache.get(token)
+    if claims is None:
+        claims = decode_access_token(token)
+        claims_cache.put(token, claims)
+    return dict(claims)
     
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=TOKEN_URL)
+# 令牌可选的场景（如限流）使用，缺少令牌时返回 None 而不是 401
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl=TOKEN_URL, auto_error=False)
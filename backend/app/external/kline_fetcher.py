@@ -0,0 +1,218 @@
+from __future__ import annotations
+import asyncio
+import numpy as np
+from typing import Literal, Optional, TYPE_CHECKING
+from loguru import logger
+from app.core.http_client import get_http_session
+from app.external.exceptions import StockExternalDataError
+from app.core.lazy_import import import_module_async
+
+# pandas 在第一次解析 K 线时才导入，不拖慢进程启动
+if TYPE_CHECKING:
+    import pandas as pd
+
+# 东方财富日K线接口（与 akshare.stock_zh_a_hist 使用的接口一致）
+EASTMONEY_KLINE_URL = "https://push2his.eastmoney.com/api/qt/stock/kline/get"
+# 复权方式对应的 fqt 参数：不复权、前复权、后复权
+ADJUST_FLAGS = {"": "0", "qfq": "1", "hfq": "2"}
+# K线字段 f51~f61 依次对应的列名
+KLINE_COLUMNS = [
+    "date", "open", "close", "high", "low", "vol",
+    "amount", "amplitude", "pct_chg", "change", "turnover_rate"
+]
+# 除日期与成交量外的浮点列
+FLOAT_COLUMNS = [column for column in KLINE_COLUMNS if column not in ("date", "vol")]
+
+class EastmoneyKlineFetcher:
+    """
+    东方财富日K线原生异步获取器，复用进程内共享的 keep-alive 连接池，
+    直接请求原始 K 线 JSON 并解析为带类型的列
+    """
+    def __init__(self, base_url: str = EASTMONEY_KLINE_URL):
+        self._base_url = base_url
+
+    @staticmethod
+    def _get_secid(code: str) -> str:
+        """
+        获取东方财富的证券标识，上交所为 1，深交所与北交所为 0
+
+        :param code: 股票代码，如 "600000"
+        :return: 证券标识，如 "1.600000"
+        """
+        market_code = 1 if code.startswith("6") else 0
+        return f"{market_code}.{code}"
+
+    async def fetch_kline_json(self, code: str, start_date: str, end_date: str, adjust: Literal["", "qfq", "hfq"] = "") -> dict:
+        """
+        请求原始日K线 JSON
+
+        :param code: 股票代码，如 "600000"
+        :param start_date: 开始日期，格式 "20220101"
+        :param end_date: 结束日期，格式 "20230401"
+        :param adjust: 复权方式，"" 为不复权，"qfq" 为前复权，"hfq" 为后复权
+        :return: 接口返回的原始 JSON
+        """
+        params = {
+            "fields1": "f1,f2,f3,f4,f5,f6",
+            "fields2": "f51,f52,f53,f54,f55,f56,f57,f58,f59,f60,f61",
+            "ut": "7eea3edcaed734bea9cbfc24409ed989",
+            "klt": "101",
+            "fqt": ADJUST_FLAGS[adjust],
+            "secid": self._get_secid(code),
+            "beg": start_date,
+            "end": end_date,
+        }
+        session = await get_http_session()
+        async with session.get(self._base_url, params=params) as response:
+            response.raise_for_status()
+            # 东方财富返回的 Content-Type 并不总是 application/json
+            return await response.json(content_type=None)
+
+    @staticmethod
+    def parse_klines(klines: list[str]) -> pd.DataFrame:
+        """
+        将 "日期,开盘,收盘,最高,最低,成交量,成交额,振幅,涨跌幅,涨跌额,换手率" 格式的 K 线字符串
+        按列一次性解析为带类型的 DataFrame，索引为日期
+
+        :param klines: K 线字符串列表
+        :return: 以 date 为索引的 DataFrame
+        """
+        import pandas as pd
+        if not klines:
+            return pd.DataFrame()
+        matrix = np.array([line.split(",") for line in klines])
+        columns = {"date": matrix[:, 0].astype("datetime64[ns]")}
+        # 成交量也保持为浮点数，含 NaN 的行由入库前的校验剔除
+        for column in ["vol", *FLOAT_COLUMNS]:
+            index = KLINE_COLUMNS.index(column)
+            # 停牌等情况下接口会返回 "-"，统一置为 NaN
+            values = np.where(matrix[:, index] == "-", "nan", matrix[:, index])
+            columns[column] = values.astype(np.float64)
+        kline = pd.DataFrame(columns, columns=KLINE_COLUMNS)
+        kline.set_index("date", inplace=True)
+        return kline
+
+    async def get_kline(self, code: str, start_date: str, end_date: str, adjust: Literal["", "qfq", "hfq"] = "") -> pd.DataFrame:
+        """
+        获取指定股票的日K线数据
+
+        :param code: 股票代码，如 "600000"
+        :param start_date: 开始日期，格式 "20220101"
+        :param end_date: 结束日期，格式 "20230401"
+        :param adjust: 复权方式，"" 为不复权，"qfq" 为前复权，"hfq" 为后复权
+        :return: 以 date 为索引的 DataFrame，无数据时返回空 DataFrame
+        """
+        try:
+            data_json = await self.fetch_kline_json(code, start_date, end_date, adjust)
+        except Exception as e:
+            logger.error(f"请求股票 {code} 的K线数据失败: {e}")
+            raise StockExternalDataError(f"请求股票 {code} 的K线数据失败: {e}", e)
+        # 第一次解析前在线程中导入 pandas，不阻塞事件循环
+        await import_module_async("pandas")
+        data = data_json.get("data") if isinstance(data_json, dict) else None
+        if not data or not data.get("klines"):
+            logger.warning(f"股票 {code} 在 {start_date} 到 {end_date} 之间没有K线数据")
+            return self.parse_klines([])
+        return self.parse_klines(data["klines"])
+
+_kline_fetcher: Optional[EastmoneyKlineFetcher] = None
+
+def get_kline_fetcher() -> EastmoneyKlineFetcher:
+    """
+    获取进程内共享的 K 线获取器
+    """
+    global _kline_fetcher
+    if _kline_fetcher is None:
+        _kline_fetcher = EastmoneyKlineFetcher()
+    return _kline_fetcher
+
+if __name__ == "__main__":
+    # 用法：
+    #   python -m app.external.kline_fetcher record <目录>   从线上录制K线原始 JSON
+    #   python -m app.external.kline_fetcher replay <目录>   在本地桩服务器回放录制的 JSON，并对比 akshare 的单次调用延迟
+    import json
+    import sys
+    import time
+    from pathlib import Path
+    from urllib.parse import urlsplit
+    from aiohttp import web
+    from app.core.http_client import close_http_session
+
+    CODES = ["600000", "000001", "300059"]
+    START_DATE, END_DATE = "19901219", "20500101"
+    ROUNDS = 20
+
+    async def record(record_dir: Path):
+        """录制线上接口的原始返回"""
+        record_dir.mkdir(parents=True, exist_ok=True)
+        fetcher = EastmoneyKlineFetcher()
+        for code in CODES:
+            for adjust in ADJUST_FLAGS:
+                payload = await fetcher.fetch_kline_json(code, START_DATE, END_DATE, adjust)
+                (record_dir / f"{code}_{adjust or 'none'}.json").write_text(json.dumps(payload), encoding="utf-8")
+                logger.info(f"已录制 {code} {adjust or 'none'}")
+        await close_http_session()
+
+    async def start_stub_server(record_dir: Path) -> web.AppRunner:
+        """启动回放录制数据的本地桩服务器"""
+        fqt_to_adjust = {value: key or "none" for key, value in ADJUST_FLAGS.items()}
+        async def handle(request: web.Request) -> web.Response:
+            code = request.query["secid"].split(".")[1]
+            adjust = fqt_to_adjust[request.query["fqt"]]
+            return web.Response(text=(record_dir / f"{code}_{adjust}.json").read_text(encoding="utf-8"), content_type="application/json")
+        stub_app = web.Application()
+        stub_app.router.add_get("/api/qt/stock/kline/get", handle)
+        runner = web.AppRunner(stub_app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 18080).start()
+        return runner
+
+    def patch_akshare_to_stub(stub_url: str):
+        """将 akshare 内部的 requests.get 指向本地桩服务器"""
+        import akshare as ak
+        import requests
+        module = sys.modules[ak.stock_zh_a_hist.__module__]
+        original_get = requests.get
+        class _StubRequests:
+            @staticmethod
+            def get(url, *args, **kwargs):
+                if url.startswith(EASTMONEY_KLINE_URL):
+                    url = stub_url + urlsplit(url).path
+                return original_get(url, *args, **kwargs)
+        module.requests = _StubRequests
+        return ak
+
+    async def replay(record_dir: Path):
+        """在桩服务器上校验解析结果，并对比单次调用延迟"""
+        runner = await start_stub_server(record_dir)
+        stub_url = "http://127.0.0.1:18080"
+        fetcher = EastmoneyKlineFetcher(base_url=f"{stub_url}/api/qt/stock/kline/get")
+        ak = patch_akshare_to_stub(stub_url)
+        try:
+            for code in CODES:
+                for adjust in ADJUST_FLAGS:
+                    native = await fetcher.get_kline(code, START_DATE, END_DATE, adjust)
+                    legacy = await asyncio.to_thread(ak.stock_zh_a_hist, symbol=code, start_date=START_DATE, end_date=END_DATE, adjust=adjust)
+                    assert len(native) == len(legacy), f"{code} {adjust} 行数不一致"
+                    assert np.allclose(native["close"].to_numpy(), legacy["收盘"].to_numpy(dtype=np.float64)), f"{code} {adjust} 收盘价不一致"
+                    assert (native["vol"].to_numpy() == legacy["成交量"].to_numpy(dtype=np.int64)).all(), f"{code} {adjust} 成交量不一致"
+            logger.info("原生获取器与 akshare 的解析结果一致")
+
+            native_cost = time.perf_counter()
+            for _ in range(ROUNDS):
+                for code in CODES:
+                    await fetcher.get_kline(code, START_DATE, END_DATE)
+            native_cost = (time.perf_counter() - native_cost) / (ROUNDS * len(CODES))
+
+            legacy_cost = time.perf_counter()
+            for _ in range(ROUNDS):
+                for code in CODES:
+                    ak.stock_zh_a_hist(symbol=code, start_date=START_DATE, end_date=END_DATE)
+            legacy_cost = (time.perf_counter() - legacy_cost) / (ROUNDS * len(CODES))
+            logger.info(f"单次调用平均延迟：原生获取器 {native_cost * 1000:.2f} ms，akshare {legacy_cost * 1000:.2f} ms")
+        finally:
+            await close_http_session()
+            await runner.cleanup()
+
+    mode, directory = sys.argv[1], Path(sys.argv[2])
+    asyncio.run(record(directory) if mode == "record" else replay(directory))
@@ -1,28 +1,36 @@
-import akshare as ak
-from app.schemas.stock_daily import StockDailyItem
-import pandas as pd
-from typing import Literal
+from __future__ import annotations
+from app.schemas.stock_daily import StockDailyIngestSummary
+from app.schemas.daily_bars import DailyBars
+import numpy as np
+from typing import Literal, TYPE_CHECKING
 import asyncio
 from tenacity import retry, stop_after_attempt, wait_fixed
 from typing import Optional
 from app.utils.stock_utlis import check_stock_format
 from app.utils.date_utlis import check_date_format,get_today
 from app.external.exceptions import StockExternalDataError,StockExternalDataProcessingError
+from app.external.kline_fetcher import get_kline_fetcher
+from app.core.cpu_executor import run_cpu_bound
 from loguru import logger
-FIELD_MAPPING = {
-            "日期": "date",
-            "股票代码": "stock_code",
-            "开盘": "open",
-            "收盘": "close",
-            "最高": "high",
-            "最低": "low",
-            "成交量": "vol",
-            "成交额": "amount",
-            "振幅": "amplitude",
-            "涨跌幅": "pct_chg",
-            "涨跌额": "change",
-            "换手率": "turnover_rate"
-        }
+
+# pandas 只在抓取与转换外部数据时使用，首次使用时才导入，不拖慢进程启动
+if TYPE_CHECKING:
+    import pandas as pd
+
+# 数值字段的保留小数位数与绝对值上限，与 stock_daily 表的 Numeric 精度一致
+DAILY_NUMERIC_LIMITS = {
+    "open": (4, 1e6),
+    "high": (4, 1e6),
+    "low": (4, 1e6),
+    "close": (4, 1e6),
+    "change": (4, 1e6),
+    "pct_chg": (2, 1e3),
+    "amount": (2, 1e18),
+    "qfq_factor": (6, 1e4),
+    "hfq_factor": (6, 1e4),
+}
+# 汇总中最多保留的被拒绝日期数量
+MAX_REJECTED_DATES = 20
 class StockDailyClient:
     """
     股票日线数据客户端
@@ -43,23 +51,18 @@ class StockDailyClient:
         :return: 包含复权收盘价的 DataFrame，索引为日期
         """
         try:
-            adjust_daily =ak.stock_zh_a_hist(
-                symbol=code,
-                start_date=start_date,
-                end_date=end_date,
-                adjust=adjust
-            )
+            adjust_daily = await get_kline_fetcher().get_kline(code, start_date, end_date, adjust)
             logger.debug(f"获取股票 {code} 的复权数据，时间范围：{start_date} 到 {end_date}")
             logger.debug(f"复权数据: {adjust_daily}")
             if adjust_daily.empty:
                 logger.error(f"股票 {code} 的复权数据为空")
+                import pandas as pd
                 return pd.DataFrame()
             logger.debug(f"获取股票 {code} 的原始已复权日线数据成功")
             logger.debug(f"原始已复权日线数据: {adjust_daily}")
 
             # 字段映射
-            adjust_close = adjust_daily[['日期', '收盘']].rename(columns={'日期': 'date', '收盘':f'{adjust}_close'})
-            adjust_close.set_index("date", inplace=True)
+            adjust_close = adjust_daily[['close']].rename(columns={'close': f'{adjust}_close'})
             logger.debug(f"加工股票 {code} 的复权数据成功")
             logger.debug(f"加工后的已复权数据: {adjust_close}")
             return adjust_close
@@ -71,29 +74,24 @@ class StockDailyClient:
     @retry(stop=stop_after_attempt(3), wait=wait_fixed(2))
     async def _get_raw_daily(code: str, start_date: str, end_date: str) -> pd.DataFrame:
         """
-        获取股票历史行情数据（来自 AkShare，单位保留为：手、元、%）。
+        获取股票历史行情数据（来自东方财富日K线接口，单位保留为：手、元、%）。
         
         :param code: 股票代码，如 "600000"
         :param start_date: 开始日期，格式 "20220101"
         :param end_date: 结束日期，格式 "20230401"
-        :return: List of StockDailyItem
+        :return: 以 date 为索引的 DataFrame
         """
         logger.info(f"获取股票 {code} 的历史数据，时间范围：{start_date} 到 {end_date}")
         try:
             # 获取数据
-            raw_daily = ak.stock_zh_a_hist(
-                symbol=code,
-                start_date=start_date,
-                end_date=end_date,
-            )
+            raw_daily = await get_kline_fetcher().get_kline(code, start_date, end_date)
             # 如果数据为空，返回空列表
             if raw_daily.empty:
+                import pandas as pd
                 return pd.DataFrame()
             logger.debug(f"获取股票 {code} 的原始未复权日线数据成功")
             logger.debug(f"原始未复权日线数据: {raw_daily}")
-            # 字段映射
-            raw_daily.rename(columns=FIELD_MAPPING, inplace=True) 
-            raw_daily.set_index("date", inplace=True)
+            raw_daily["stock_code"] = code
             raw_daily['pct_chg'] = raw_daily['pct_chg'].apply(lambda x: 0.0 if abs(x) > 100 else x)
             logger.debug(f"加工股票 {code} 的未复权数据成功")
             logger.debug(f"加工后的未复权数据: {raw_daily}")
@@ -106,9 +104,11 @@ class StockDailyClient:
             raise StockExternalDataError(f"获取股票 {code} 原始数据时遇到未知错误:{e}", e)
     
     @staticmethod
-    async def _get_stock_daily(code: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
+    async def _fetch_stock_daily(code: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
         """
-        获取股票的历史行情数据（来自 AkShare，单位保留为：手、元、%）。
+        并发获取股票的未复权日线、前复权收盘价与后复权收盘价
+
+        :return: (未复权日线, 前复权收盘价, 后复权收盘价)
         """
         try:
             if not check_stock_format(code):
@@ -150,6 +150,14 @@ class StockDailyClient:
             raise se
         except Exception as e:
             raise StockExternalDataError(f"发生未知错误: {e}",e)
+        return raw_daily, qfq_close, hfq_close
+
+    @staticmethod
+    def _build_stock_daily(raw_daily: pd.DataFrame, qfq_close: pd.DataFrame, hfq_close: pd.DataFrame, code: str) -> pd.DataFrame:
+        """
+        合并数据、计算复权因子并转换日期格式（纯 CPU 计算）
+        """
+        import pandas as pd
         try:
             stock_daily = StockDailyClient._merge_and_validate_stock_daily(raw_daily, qfq_close, hfq_close, code)
             # 计算前复权因子
@@ -159,17 +167,18 @@ class StockDailyClient:
             # 重置索引以便转换日期格式
             stock_daily = stock_daily.reset_index()
             stock_daily["date"] = pd.to_datetime(stock_daily["date"]).dt.date 
+        except StockExternalDataError as se:
+            raise se
         except Exception as e:
             logger.error(f"数据处理时发生错误: {e}")
             raise StockExternalDataProcessingError(f"数据处理时发生错误: {e}",e)
-        except StockExternalDataProcessingError as se:
-            raise se
         return stock_daily
-    
+
     @staticmethod
     def _merge_and_validate_stock_daily(raw_daily: pd.DataFrame, qfq_close: pd.DataFrame, hfq_close: pd.DataFrame, code: str) -> pd.DataFrame:
         """
-        合并前复权、后复权数据，并校验 'close' 列是否有缺失或异常值。
+        通过日期对齐合并前复权、后复权数据。
+        收盘价缺失或为 0 的行照常保留，由 _validate_daily_columns 逐行拒绝，不影响同一股票的其他交易日
         
         Args:
             raw_daily (pd.DataFrame): 原始未复权数据
@@ -186,57 +195,237 @@ class StockDailyClient:
         
         logger.debug(f"合并股票 {code} 的前复权、后复权与未复权数据成功")
         logger.debug(f"合并后的数据: {stock_daily}")
+        return stock_daily
 
-        # 检查 'close' 列是否存在缺失值或者为0的情况
-        bad_close_rows = raw_daily[raw_daily['close'].isnull() | (raw_daily['close'] == 0)]
-        logger.debug(f"检查未复权数据的收盘价是否出现缺失/异常值的问题")
+    @staticmethod
+    def _validate_daily_columns(stock_daily: pd.DataFrame, code: str) -> tuple[dict[str, np.ndarray], StockDailyIngestSummary]:
+        """
+        按列向量化校验日线数据，返回通过校验并按精度舍入后的列数组
 
-        if not bad_close_rows.empty:
-            logger.error(f"股票 {code} 的 'close' 列存在缺失值或为0的情况，数量: {bad_close_rows.shape[0]}")
-            raise StockExternalDataError(f"股票 {code} 的 'close' 列存在缺失值或为0，数量: {bad_close_rows.shape[0]}")
-        else:
-            logger.debug(f"股票 {code} 的 'close' 列没有缺失值或为0的情况，合并成功")
+        :param stock_daily: _build_stock_daily 返回的 DataFrame
+        :param code: 股票代码
+        :return: (通过校验的列数组, 校验汇总)
+        """
+        total = len(stock_daily)
+        dates = np.asarray(stock_daily["date"], dtype="datetime64[D]")
+        columns = {
+            column: stock_daily[column].to_numpy(dtype=np.float64, na_value=np.nan)
+            for column in list(DAILY_NUMERIC_LIMITS) + ["vol"]
+        }
+        # 拒绝规则，True 表示该行无法入库：缺失值、超出数据库精度范围、未复权价格不为正。
+        # 复权因子不做符号检查：上市较早的股票前复权价格可能为负，前复权因子随之为负
+        checks = {
+            "missing_value": np.isnat(dates) | np.logical_or.reduce([np.isnan(values) for values in columns.values()]),
+            "non_positive_price": np.logical_or.reduce([columns[column] <= 0 for column in ("open", "high", "low", "close")]),
+            "out_of_range": np.logical_or.reduce([
+                np.abs(columns[column]) >= limit for column, (_, limit) in DAILY_NUMERIC_LIMITS.items()
+            ]),
+        }
+        # 只记录不拒绝的异常：被拒绝的交易日会成为永久缺口，每次完整性检查都会因此重新抓取全部历史
+        anomalies = {
+            "inconsistent_ohlc": (
+                (columns["high"] < columns["low"])
+                | (columns["open"] > columns["high"]) | (columns["open"] < columns["low"])
+                | (columns["close"] > columns["high"]) | (columns["close"] < columns["low"])
+            ),
+            "negative_volume": (columns["vol"] < 0) | (columns["amount"] < 0),
+        }
+        # NaN 参与比较结果为 False，因此缺失值只会计入 missing_value
+        rejected_mask = np.logical_or.reduce(list(checks.values()))
+        accepted_mask = ~rejected_mask
 
-        return stock_daily
+        summary = StockDailyIngestSummary(
+            stock_code=code,
+            total=total,
+            accepted=int(accepted_mask.sum()),
+            rejected=int(rejected_mask.sum()),
+            reasons={reason: int(mask.sum()) for reason, mask in checks.items() if mask.any()},
+            anomalies={reason: int((mask & accepted_mask).sum()) for reason, mask in anomalies.items() if (mask & accepted_mask).any()},
+            rejected_dates=dates[rejected_mask & ~np.isnat(dates)][:MAX_REJECTED_DATES].tolist(),
+        )
+        if summary.rejected:
+            logger.warning(f"股票 {code} 共有 {summary.rejected}/{total} 条日线数据未通过校验: {summary.reasons}")
+        if summary.anomalies:
+            logger.warning(f"股票 {code} 的部分日线数据存在异常，已照常入库: {summary.anomalies}")
+
+        # 只保留通过校验的行，并按列舍入到数据库精度
+        accepted = {
+            "date": dates[accepted_mask],
+            "vol": columns["vol"][accepted_mask].astype(np.int64),
+        }
+        for column, (decimals, _) in DAILY_NUMERIC_LIMITS.items():
+            accepted[column] = np.round(columns[column][accepted_mask], decimals)
+        return accepted, summary
+
+    @staticmethod
+    def _daily_to_rows(stock_daily: pd.DataFrame, code: str) -> tuple[list[dict], StockDailyIngestSummary]:
+        """
+        按列向量化校验日线数据，并将通过校验的行直接转换为批量入库的参数列表
+
+        :param stock_daily: _build_stock_daily 返回的 DataFrame
+        :param code: 股票代码
+        :return: (入库参数列表, 校验汇总)
+        """
+        columns, summary = StockDailyClient._validate_daily_columns(stock_daily, code)
+        return DailyBars.from_columns(code, columns).to_rows(), summary
+
+    @staticmethod
+    def _frame_to_columns(frame: pd.DataFrame) -> dict[str, np.ndarray]:
+        """将以日期为索引的 DataFrame 拆为 NumPy 列数组，便于以连续缓冲区的形式传给进程池"""
+        columns = {"date": frame.index.to_numpy()}
+        for column in frame.columns:
+            if column != "stock_code":
+                columns[column] = frame[column].to_numpy()
+        return columns
 
     @staticmethod
-    def _daily_to_pydantic(stock_daily: pd.DataFrame) -> list[StockDailyItem]:
+    def _columns_to_frame(columns: dict[str, np.ndarray]) -> pd.DataFrame:
+        """由 NumPy 列数组还原以日期为索引的 DataFrame"""
+        import pandas as pd
+        return pd.DataFrame(columns).set_index("date")
+
+    @staticmethod
+    def _transform_stock_daily(
+        raw_columns: dict[str, np.ndarray],
+        qfq_columns: dict[str, np.ndarray],
+        hfq_columns: dict[str, np.ndarray],
+        code: str
+    ) -> tuple[dict[str, np.ndarray], StockDailyIngestSummary]:
         """
-        将 DataFrame 转换为 Pydantic 模型列表
+        获取后的数据变换流水线（合并、复权因子、日期转换与向量化校验），在 CPU 进程池中执行。
+        入参与返回值均为 NumPy 列数组，进程间只传递连续缓冲区。
         """
-        records = stock_daily.to_dict(orient="records")
-        result = []
-        for item in records:
-            try:
-                result.append(StockDailyItem(**item))
-            except Exception as e:
-                logger.error(f"跳过错误数据: {e} → {item}")
-                continue
-                
-        return result
+        stock_daily = StockDailyClient._build_stock_daily(
+            StockDailyClient._columns_to_frame(raw_columns),
+            StockDailyClient._columns_to_frame(qfq_columns),
+            StockDailyClient._columns_to_frame(hfq_columns),
+            code,
+        )
+        return StockDailyClient._validate_daily_columns(stock_daily, code)
 
     @staticmethod
-    async def get_daily_items(code: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> list[StockDailyItem]:
+    async def get_daily_bars(code: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> tuple[DailyBars, StockDailyIngestSummary]:
         """
-        获取股票的历史行情数据（来自 AkShare，单位保留为：手、元、%）。
+        获取股票的历史行情数据，返回通过校验的列式日线数据
+
+        :return: (DailyBars, 校验汇总)
         """
-        stock_daily = await StockDailyClient._get_stock_daily(code, start_date, end_date)
-        if stock_daily.empty:
-            return []
-        return StockDailyClient._daily_to_pydantic(stock_daily)
+        raw_daily, qfq_close, hfq_close = await StockDailyClient._fetch_stock_daily(code, start_date, end_date)
+        try:
+            # 将 CPU 密集的变换放到进程池中执行，避免阻塞事件循环
+            columns, summary = await run_cpu_bound(
+                StockDailyClient._transform_stock_daily,
+                StockDailyClient._frame_to_columns(raw_daily),
+                StockDailyClient._frame_to_columns(qfq_close),
+                StockDailyClient._frame_to_columns(hfq_close),
+                code,
+            )
+            return DailyBars.from_columns(code, columns), summary
+        except (StockExternalDataError, StockExternalDataProcessingError):
+            raise
+        except Exception as e:
+            logger.error(f"校验并转换股票 {code} 的日线数据时发生错误: {e}")
+            raise StockExternalDataProcessingError(f"校验并转换股票 {code} 的日线数据时发生错误: {e}", e)
 
 if __name__ == "__main__":
+    import sys
+    import time
+    import pandas as pd
+    from datetime import date, timedelta
+    from app.schemas.stock_daily import StockDailyItem
+
     async def main():
         try:
             client= StockDailyClient()
             code = "300059"
             start_date = "20240101"
             end_date = "20240401"
-            data = await client.get_daily_items(code, start_date, end_date)
-            # data = await client.get_daily_items(code)
-            for item in data:
-                logger.info(item)
+            daily_bars, summary = await client.get_daily_bars(code, start_date, end_date)
+            logger.info(summary)
+            for row in daily_bars.to_rows():
+                logger.info(row)
         except Exception as e:
             logger.error(f"运行测试时发生错误: {e}")
-    # 运行测试
-    asyncio.run(main())
+        finally:
+            from app.core.http_client import close_http_session
+            await close_http_session()
+
+    def make_history(code: str, years: int = 30) -> pd.DataFrame:
+        """构造与 _build_stock_daily 输出结构一致的 30 年模拟日线数据"""
+        rng = np.random.default_rng(0)
+        dates = [d for d in (date(1995, 1, 3) + timedelta(days=i) for i in range(years * 365)) if d.weekday() < 5]
+        count = len(dates)
+        close = np.round(10 * np.exp(np.cumsum(rng.normal(0, 0.02, count))), 2)
+        open_ = np.round(close * (1 + rng.normal(0, 0.005, count)), 2)
+        high = np.round(np.maximum(open_, close) * 1.01, 2)
+        low = np.round(np.minimum(open_, close) * 0.99, 2)
+        change = np.round(np.diff(close, prepend=close[0]), 2)
+        return pd.DataFrame({
+            "date": dates, "open": open_, "close": close, "high": high, "low": low,
+            "vol": rng.integers(1_000, 1_000_000, count), "amount": np.round(close * 1e5, 2),
+            "amplitude": 2.0, "pct_chg": np.round(change / close * 100, 2), "change": change,
+            "turnover_rate": 1.0, "stock_code": code,
+            "qfq_factor": np.round(rng.uniform(0.5, 1, count), 6), "hfq_factor": np.round(rng.uniform(1, 20, count), 6),
+        })
+
+    def bench():
+        """对比逐行 Pydantic/ORM 转换与向量化转换在 30 年历史数据上的耗时"""
+        stock_daily = make_history("300059")
+        started = time.perf_counter()
+        orm_items = [StockDailyItem(**item).to_orm() for item in stock_daily.to_dict(orient="records")]
+        legacy_cost = time.perf_counter() - started
+        started = time.perf_counter()
+        rows, summary = StockDailyClient._daily_to_rows(stock_daily, "300059")
+        vectorized_cost = time.perf_counter() - started
+        logger.info(f"共 {len(stock_daily)} 条日线数据，逐行 Pydantic+ORM: {len(orm_items)} 条 {legacy_cost * 1000:.1f} ms，"
+                    f"向量化: {len(rows)} 条 {vectorized_cost * 1000:.1f} ms，汇总: {summary}")
+
+    async def backfill_bench(stock_count: int = 500, concurrency: int = 8):
+        """
+        模拟 500 只股票的回填（网络等待 + 变换流水线），分别在事件循环线程内与 CPU 进程池中执行变换，
+        对比期间的事件循环延迟
+        """
+        from app.config.executor import executor_settings
+        from app.core.cpu_executor import shutdown_cpu_executor
+        from app.core.loop_monitor import loop_lag_monitor
+        history = make_history("300059").set_index("date")
+        history.index = pd.to_datetime(history.index)
+        raw_daily = history.drop(columns=["qfq_factor", "hfq_factor"])
+        qfq_close = (history["close"] * history["qfq_factor"]).to_frame("qfq_close")
+        hfq_close = (history["close"] * history["hfq_factor"]).to_frame("hfq_close")
+
+        async def backfill_one(semaphore: asyncio.Semaphore, code: str):
+            async with semaphore:
+                await asyncio.sleep(0.05)  # 模拟网络等待
+                columns, _ = await run_cpu_bound(
+                    StockDailyClient._transform_stock_daily,
+                    StockDailyClient._frame_to_columns(raw_daily),
+                    StockDailyClient._frame_to_columns(qfq_close),
+                    StockDailyClient._frame_to_columns(hfq_close),
+                    code,
+                )
+                DailyBars.from_columns(code, columns).to_rows()
+
+        loop_lag_monitor.start()
+        for pool_size in (0, executor_settings.CPU_POOL_SIZE or 2):
+            executor_settings.CPU_POOL_SIZE = pool_size
+            await run_cpu_bound(int)  # 预热进程池
+            loop_lag_monitor.reset()
+            semaphore = asyncio.Semaphore(concurrency)
+            started = time.perf_counter()
+            await asyncio.gather(*(backfill_one(semaphore, f"{i:06d}") for i in range(stock_count)))
+            cost = time.perf_counter() - started
+            mode = "事件循环线程内执行" if pool_size == 0 else f"CPU 进程池（{pool_size} 进程）"
+            logger.info(f"{mode}：回填 {stock_count} 只股票耗时 {cost:.2f} s，事件循环延迟 {loop_lag_monitor.stats()}")
+            shutdown_cpu_executor()
+        await loop_lag_monitor.stop()
+
+    # 运行测试：python -m app.external.stock_daily [bench|backfill]
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        bench()
+    elif len(sys.argv) > 1 and sys.argv[1] == "backfill":
+        logger.remove()
+        logger.add(sys.stderr, level="INFO")
+        asyncio.run(backfill_bench())
+    else:
+        asyncio.run(main())
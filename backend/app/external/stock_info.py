@@ -1,30 +1,34 @@
-import akshare as ak
+from __future__ import annotations
 from app.schemas.stock_info import StockInfoItem
-import pandas as pd
 import asyncio
 from tenacity import retry, stop_after_attempt, wait_fixed
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 from app.utils.stock_utlis import get_stock_exchange_code,get_exchange_name_by_code
 from app.external.exceptions import StockExternalDataError,StockExternalDataProcessingError
 from datetime import datetime
-from app.external.xq_token import XueqiuTokenProvider
+from app.external.xq_token import XueqiuTokenManager, get_xq_token_manager
+from app.core.lazy_import import import_module_async
 from loguru import logger
 
+# akshare 及其依赖（含 pandas）导入耗时较长，第一次抓取时才导入，不拖慢进程启动
+if TYPE_CHECKING:
+    import pandas as pd
+
 class StockInfoClient:
-    def __init__(self, token_provider: Optional[XueqiuTokenProvider] = None):
+    def __init__(self, token_manager: Optional[XueqiuTokenManager] = None):
         """
-        初始化 StockInfoClient，需要提供一个 token 提供者
+        初始化 StockInfoClient
 
-        :param token_provider: XueqiuTokenProvider 实例，如果为 None 则会创建一个新的实例
+        :param token_manager: XueqiuTokenManager 实例，如果为 None 则使用进程内共享的实例
         """
-        self._token_provider = token_provider or XueqiuTokenProvider()
+        self._token_manager = token_manager or get_xq_token_manager()
     
     async def _get_xq_token(self) -> str:
         """
         获取雪球的 token
         :return: 雪球的 token
         """
-        xq_token = self._token_provider.get_token()
+        xq_token = await self._token_manager.get_token()
         if not xq_token:
             raise StockExternalDataError("获取雪球token失败")
         return xq_token
@@ -38,10 +42,20 @@ class StockInfoClient:
         :param xq_token: 雪球 API 的 Token
         :return: 返回包含个股信息的 DataFrame 或 None
         """
+        xq_token = None
         try:
             xq_token = await self._get_xq_token()
-            raw_daily =ak.stock_individual_basic_info_xq(symbol=xq_symbol,token=xq_token)
+            ak = await import_module_async("akshare")
+            # akshare 内部为同步请求，放到线程中执行，避免阻塞事件循环
+            raw_daily = await asyncio.to_thread(ak.stock_individual_basic_info_xq, symbol=xq_symbol, token=xq_token)
             return raw_daily
+        except KeyError as e:
+            # token 失效时雪球返回 error_code 而非 data 字段，立即使 token 失效，重试时将重新获取
+            logger.error(f"获取个股信息时雪球鉴权失败: {e}")
+            await self._token_manager.invalidate(xq_token)
+            raise StockExternalDataError(f"获取个股信息时雪球鉴权失败: {e}",e)
+        except StockExternalDataError:
+            raise
         except Exception as e:
             logger.error(f"获取个股信息失败: {e}")
             raise StockExternalDataError(f"获取个股信息失败: {e}",e)
@@ -64,6 +78,7 @@ class StockInfoClient:
             # 拼接雪球股票代码
             xq_symbol = f"{exchange_code}{code}"
             stock_info= await self._get_raw_info(xq_symbol)
+            import pandas as pd
             exchange_name = get_exchange_name_by_code(exchange_code)
             stock_info = pd.concat([
                 pd.DataFrame([
@@ -87,6 +102,7 @@ class StockInfoClient:
         
     @staticmethod
     def _info_to_pydantic(stock_info: pd.DataFrame) -> StockInfoItem:
+        import pandas as pd
         try:
             info_dict = pd.Series(stock_info["value"].values, index=stock_info["item"]).to_dict()
 
@@ -142,4 +158,7 @@ if __name__ == "__main__":
             logger.info(f"Pydantic模型:\n{stock_info_item}\n")
         except Exception as e:
             logger.error(f"\n测试过程中发生错误: {e}")
+        finally:
+            from app.core.http_client import close_http_session
+            await close_http_session()
     asyncio.run(main())
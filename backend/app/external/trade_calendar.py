@@ -1,9 +1,8 @@
-import akshare as ak
-import pandas as pd
 import asyncio
 from tenacity import retry, stop_after_attempt, wait_fixed
 from app.utils.date_utlis import check_date_format,get_today
 from app.external.exceptions import StockExternalDataError,StockExternalDataProcessingError
+from app.core.lazy_import import import_module_async
 from loguru import logger
 from datetime import date
 from typing import Literal, Set, Optional,List
@@ -51,6 +50,9 @@ class TradeCalendarClient:
                 logger.error(f"结束日期格式不正确: {end_date}")
                 raise ValueError(f"结束日期格式不正确: {end_date}")
 
+            # akshare 及其依赖（含 pandas）导入耗时较长，第一次抓取时才在线程中导入，不拖慢进程启动
+            ak = await import_module_async("akshare")
+            pd = await import_module_async("pandas")
             # 获取股票日线数据
             stock_daily = ak.stock_zh_a_hist(
                 symbol=stock_code,
@@ -1,30 +1,152 @@
-import requests
-from datetime import datetime, timedelta
+import asyncio
+import time
+import uuid
 from typing import Optional
 from loguru import logger
+from app.core.http_client import get_http_session
+from app.core.redis import redis_client
 
-class XueqiuTokenProvider:
-    def __init__(self, user_agent: Optional[str] = None, ttl_minutes: int = 30):
+# Redis 中保存雪球 token 的键，供所有 worker 共享
+XQ_TOKEN_KEY = "xq:token"
+# 跨 worker 刷新 token 的分布式锁
+XQ_TOKEN_LOCK_KEY = "xq:token:lock"
+XQ_HQ_URL = "https://xueqiu.com/hq"
+# 值仍为指定内容时才删除：GET 与 DEL 在同一脚本内执行，其他 worker 在两者之间写入的新值不会被误删
+COMPARE_AND_DELETE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+class XueqiuTokenManager:
+    """
+    进程级共享的雪球 token 管理器
+
+    - token 保存在 Redis 中，所有 worker 共享同一个 token
+    - 在过期前提前刷新，同一进程内的并发刷新只会发起一次请求，跨进程通过 Redis 锁保证只有一个 worker 刷新
+    - 个股信息接口出现鉴权错误时立即失效
+    """
+    def __init__(self, user_agent: Optional[str] = None, ttl_minutes: int = 30, refresh_ahead_minutes: int = 5):
         self.user_agent = user_agent or "Mozilla"
-        self.ttl = timedelta(minutes=ttl_minutes)  # token 有效期
+        self.ttl = ttl_minutes * 60  # token 有效期（秒）
+        self.refresh_ahead = refresh_ahead_minutes * 60  # 提前刷新的时间窗口（秒）
         self._token: Optional[str] = None
-        self._token_expiry: Optional[datetime] = None
+        self._token_expiry: float = 0.0  # 本地缓存的过期时间（monotonic 秒）
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._compare_and_delete = redis_client.register_script(COMPARE_AND_DELETE_SCRIPT)
 
-    def get_token(self) -> Optional[str]:
-        # 如果 token 有效，直接返回
-        if self._token and self._token_expiry and datetime.now() < self._token_expiry:
+    async def get_token(self) -> Optional[str]:
+        """
+        获取雪球 token，失败时返回 None
+        """
+        now = time.monotonic()
+        if self._token and now < self._token_expiry - self.refresh_ahead:
             return self._token
-        # 否则请求新的 token
         try:
-            response = requests.get("https://xueqiu.com/hq", headers={"User-Agent": self.user_agent})
-            token = response.cookies.get("xq_a_token")
-            if not token:
-                logger.error("未能从 cookies 获取 xq_a_token")
-                raise ValueError("未能从 cookies 获取 xq_a_token")
-
-            self._token = token
-            self._token_expiry = datetime.now() + self.ttl
-            return token
+            token, remaining = await self._load_from_redis()
+            if token and remaining > self.refresh_ahead:
+                self._cache_locally(token, remaining)
+                return token
+            if token:
+                # 即将过期：继续使用当前 token，同时在后台提前刷新
+                self._cache_locally(token, remaining)
+                self._start_refresh()
+                return token
+            # 等待方被取消（客户端断开、超时）时不取消共享的刷新任务，其他等待方仍能拿到结果
+            return await asyncio.shield(self._start_refresh())
         except Exception as e:
             logger.error(f"获取雪球 token 失败: {e}")
             return None
+
+    async def invalidate(self, token: Optional[str] = None) -> None:
+        """
+        使 token 立即失效
+        :param token: 已失效的 token；若 Redis 中的 token 已被其他 worker 刷新，则不会误删新 token
+        """
+        token = token or self._token
+        self._token = None
+        self._token_expiry = 0.0
+        if not token:
+            return
+        try:
+            await self._compare_and_delete(keys=[XQ_TOKEN_KEY], args=[token])
+            logger.warning("雪球 token 已失效，下次请求将重新获取")
+        except Exception as e:
+            logger.error(f"使雪球 token 失效时发生错误: {e}")
+
+    def _cache_locally(self, token: str, remaining: float) -> None:
+        self._token = token
+        self._token_expiry = time.monotonic() + remaining
+
+    async def _load_from_redis(self) -> tuple[Optional[str], float]:
+        """
+        读取 Redis 中的 token 与剩余有效期（秒）
+        """
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.get(XQ_TOKEN_KEY)
+            pipe.pttl(XQ_TOKEN_KEY)
+            token, pttl = await pipe.execute()
+        if token is None or pttl is None or pttl <= 0:
+            return None, 0.0
+        return token.decode(), pttl / 1000
+
+    def _start_refresh(self) -> asyncio.Task:
+        """
+        启动刷新任务，同一进程内同时只存在一个刷新任务（single-flight）
+        """
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+        return self._refresh_task
+
+    async def _refresh(self) -> Optional[str]:
+        """
+        刷新 token：抢到 Redis 锁的 worker 负责请求雪球，其他 worker 等待并读取其结果
+        """
+        try:
+            lock_value = uuid.uuid4().hex
+            acquired = await redis_client.set(XQ_TOKEN_LOCK_KEY, lock_value, nx=True, ex=15)
+            if not acquired:
+                for _ in range(30):
+                    await asyncio.sleep(0.5)
+                    token, remaining = await self._load_from_redis()
+                    if token and remaining > self.refresh_ahead:
+                        self._cache_locally(token, remaining)
+                        return token
+                logger.warning("等待其他 worker 刷新雪球 token 超时，由当前 worker 自行刷新")
+            try:
+                token = await self._fetch_token()
+                await redis_client.setex(XQ_TOKEN_KEY, self.ttl, token.encode())
+                self._cache_locally(token, self.ttl)
+                logger.info("雪球 token 刷新成功")
+                return token
+            finally:
+                if acquired:
+                    # 锁可能已过期并被其他 worker 取得，只释放自己持有的锁
+                    await self._compare_and_delete(keys=[XQ_TOKEN_LOCK_KEY], args=[lock_value])
+        except Exception as e:
+            logger.error(f"刷新雪球 token 失败: {e}")
+            return None
+
+    async def _fetch_token(self) -> str:
+        """
+        异步请求雪球行情页，从 cookies 中获取 xq_a_token
+        """
+        session = await get_http_session()
+        async with session.get(XQ_HQ_URL, headers={"User-Agent": self.user_agent}) as response:
+            morsel = response.cookies.get("xq_a_token")
+        if not morsel or not morsel.value:
+            logger.error("未能从 cookies 获取 xq_a_token")
+            raise ValueError("未能从 cookies 获取 xq_a_token")
+        return morsel.value
+
+_token_manager: Optional[XueqiuTokenManager] = None
+
+def get_xq_token_manager() -> XueqiuTokenManager:
+    """
+    获取进程内唯一的雪球 token 管理器
+    """
+    global _token_manager
+    if _token_manager is None:
+        _token_manager = XueqiuTokenManager()
+    return _token_manager
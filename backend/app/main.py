@@ -1,14 +1,12 @@
 from fastapi import FastAPI, APIRouter
-from app.models.stock_daily_orm import Base
-from app.core.database import engine
-from app.api import stock_router,trade_calendar_router, user_router
-from loguru import logger
-from app.core.apscheduler import apscheduler
+from app.api import stock_router,trade_calendar_router, user_router, system_router
+from app.core.lifespan import lifespan
+from app.core.rate_limiter import RateLimitExceeded, rate_limit_exceeded_handler
+from app.core.admission import AdmissionRejected, admission_rejected_handler
 api_prefix = "/api/v1"
 
-app = FastAPI(title="A股大王", docs_url=f"{api_prefix}/docs", redoc_url=f"{api_prefix}/redoc")
-Base.metadata.create_all(bind=engine) 
-logger.info("数据库表结构创建成功")
+# 建表、后台任务与连接池的启动和关闭由 lifespan 管理
+app = FastAPI(title="A股大王", docs_url=f"{api_prefix}/docs", redoc_url=f"{api_prefix}/redoc", lifespan=lifespan)
 
 api_v1_router = APIRouter()
 
@@ -16,8 +14,11 @@ api_v1_router = APIRouter()
 api_v1_router.include_router(stock_router.router)
 api_v1_router.include_router(trade_calendar_router.router)
 api_v1_router.include_router(user_router.router)
+api_v1_router.include_router(system_router.router)
 
 # 统一设置前缀为 /api/v1
 app.include_router(api_v1_router, prefix=api_prefix)
-apscheduler.start()
-
+# 超出限流额度时返回 429 与 Retry-After
+app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
+# 未能在等待期限内获得执行名额时返回 503
+app.add_exception_handler(AdmissionRejected, admission_rejected_handler)
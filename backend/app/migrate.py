@@ -0,0 +1,25 @@
+import asyncio
+from loguru import logger
+from app.core.database import Base, create_tables, dispose_engine
+# 导入全部 ORM 模型，使其注册到 Base.metadata
+from app.models import (
+    job_history_orm,
+    stock_daily_meta_orm,
+    stock_daily_orm,
+    stock_indicator_state_orm,
+    stock_info_orm,
+    trade_calendar_orm,
+    user_orm,
+)
+
+async def migrate() -> None:
+    """创建缺失的表，已存在的表不做修改"""
+    try:
+        await create_tables()
+        logger.info(f"表结构检查完成: {', '.join(sorted(Base.metadata.tables))}")
+    finally:
+        await dispose_engine()
+
+if __name__ == "__main__":
+    # 部署时在启动工作进程前执行一次：python -m app.migrate
+    asyncio.run(migrate())
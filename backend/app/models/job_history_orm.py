@@ -0,0 +1,34 @@
+from sqlalchemy import Column, String, Integer, Date, DateTime, JSON, Text, Index
+from app.core.database import Base
+
+class JobHistoryOrm(Base):
+    __tablename__ = 'job_history'
+    id = Column(Integer, primary_key=True, autoincrement=True, comment='执行记录 ID')
+    job_name = Column(String(64), nullable=False, comment='任务名称，如 post_close')
+    trade_date = Column(Date, nullable=True, comment='任务处理的交易日')
+    status = Column(String(16), nullable=False, comment='执行状态：running、success、failed、skipped、aborted')
+    worker = Column(String(128), nullable=False, comment='执行任务的工作进程标识')
+    started_at = Column(DateTime, nullable=False, comment='开始时间')
+    finished_at = Column(DateTime, nullable=True, comment='结束时间')
+    duration_ms = Column(Integer, nullable=True, comment='总耗时（毫秒）')
+    stages = Column(JSON, nullable=True, comment='各阶段的状态、耗时与统计')
+    error = Column(Text, nullable=True, comment='失败原因')
+
+    __table_args__ = (
+        Index('ix_job_history_job_trade_date', 'job_name', 'trade_date'),
+    )
+
+    def __repr__(self):
+        return f"<JobHistory(job_name={self.job_name}, trade_date={self.trade_date}, status={self.status})>"
+
+if __name__ == "__main__":
+    import asyncio
+    from app.core.database import create_tables, dispose_engine
+    from loguru import logger
+
+    async def main():
+        await create_tables()
+        await dispose_engine()
+
+    asyncio.run(main())
+    logger.info("任务执行记录表结构创建成功")
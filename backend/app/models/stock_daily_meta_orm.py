@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, Date, Integer, TIMESTAMP
+from app.core.database import Base
+from sqlalchemy.sql import func
+
+class StockDailyMetaOrm(Base):
+    __tablename__ = 'stock_daily_meta'
+    stock_code = Column(String(20), primary_key=True, comment='股票代码')
+    first_date = Column(Date, nullable=False, comment='已入库日线的最早日期')
+    last_date = Column(Date, nullable=False, comment='已入库日线的最新日期')
+    bar_count = Column(Integer, nullable=False, comment='已入库日线的数量')
+    data_version = Column(Integer, nullable=False, default=1, comment='数据版本，已有日期的复权因子发生变化（如除权除息）时加一')
+    factor_digest = Column(String(64), nullable=False, comment='全部日线复权因子的摘要')
+    updated_at = Column(TIMESTAMP, nullable=False, server_default=func.now(), onupdate=func.now(), comment='更新时间')
+
+    def __repr__(self):
+        return f"<StockDailyMeta(stock_code={self.stock_code}, last_date={self.last_date}, data_version={self.data_version})>"
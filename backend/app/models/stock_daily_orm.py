@@ -25,9 +25,15 @@ class StockDailyOrm(Base):
         return f"<StockDailyItem(stock_code={self.stock_code}, date={self.date})>"
 
 if __name__=="__main__":
-    from app.core.database import engine
+    import asyncio
+    from app.core.database import create_tables, dispose_engine
     from loguru import logger
-    Base.metadata.create_all(engine)  # 创建表结构
+
+    async def main():
+        await create_tables()  # 创建表结构
+        await dispose_engine()
+
+    asyncio.run(main())
     logger.info("表结构创建成功")
 
     
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, Date, Float, JSON, TIMESTAMP
+from app.core.database import Base
+from sqlalchemy.sql import func
+
+class StockIndicatorStateOrm(Base):
+    __tablename__ = 'stock_indicator_state'
+    stock_code = Column(String(20), primary_key=True, comment='股票代码')
+    indicator = Column(String(32), primary_key=True, comment='指标名称，如 ma20、macd_12_26_9')
+    last_date = Column(Date, nullable=False, comment='滚动状态对应的最后一根K线日期')
+    qfq_scale = Column(Float, nullable=False, comment='最后一根K线的前复权因子与后复权因子之比，用于将后复权指标值换算为前复权')
+    state = Column(JSON, nullable=False, comment='基于后复权收盘价的滚动状态')
+    last_values = Column(JSON, nullable=False, comment='最后一根K线的指标值（后复权）')
+    updated_at = Column(TIMESTAMP, nullable=False, server_default=func.now(), onupdate=func.now(), comment='更新时间')
+
+    def __repr__(self):
+        return f"<StockIndicatorState(stock_code={self.stock_code}, indicator={self.indicator}, last_date={self.last_date})>"
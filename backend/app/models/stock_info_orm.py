@@ -51,7 +51,13 @@ class StockInfoOrm(Base):
         return f"<StockInfoItem(stock_code={self.stock_code}, exchange_code={self.exchange_code}, org_name_cn={self.org_name_cn})>"
     
 if __name__=="__main__":
-    from app.core.database import engine
+    import asyncio
+    from app.core.database import create_tables, dispose_engine
     from loguru import logger
-    Base.metadata.create_all(engine)  # 创建表结构
+
+    async def main():
+        await create_tables()  # 创建表结构
+        await dispose_engine()
+
+    asyncio.run(main())
     logger.info("表结构创建成功")
\ No newline at end of file
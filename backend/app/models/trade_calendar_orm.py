@@ -13,6 +13,13 @@ class TradeCalendarOrm(Base):
         return f"<TradeCalendar(exchange_code={self.exchange_code}, trade_date={self.trade_date})>"
 
 if __name__ == "__main__":
-    from app.core.database import engine
+    import asyncio
+    from app.core.database import create_tables, dispose_engine
     from loguru import logger
+
+    async def main():
+        await create_tables()
+        await dispose_engine()
+
+    asyncio.run(main())
     logger.info("交易日历表结构创建成功")
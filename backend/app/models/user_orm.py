@@ -41,9 +41,16 @@ class UserOrm(Base):
         return self.deleted_at is not None
     
 if __name__ == "__main__":
-    from app.core.database import engine
+    import asyncio
+    from app.core.database import async_engine, dispose_engine
     from loguru import logger
-    Base.metadata.drop_all(engine)
-    Base.metadata.create_all(engine)
+
+    async def main():
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        await dispose_engine()
+
+    asyncio.run(main())
     logger.info("用户表创建成功")
 
@@ -0,0 +1,88 @@
+from app.models.job_history_orm import JobHistoryOrm
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from datetime import date
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import select, update, desc
+from loguru import logger
+
+class JobHistoryRepositoryError(Exception):
+    """用于处理任务执行记录存取过程中出现的异常"""
+    pass
+
+class JobHistoryRepository:
+    """
+    定时任务执行记录数据仓库
+    """
+    def __init__(self, db: AsyncSession):
+        self._db = db
+
+    async def create_run(self, orm_item: JobHistoryOrm) -> int:
+        """写入一条执行记录并返回记录 ID"""
+        try:
+            self._db.add(orm_item)
+            await self._db.commit()
+            return orm_item.id
+        except SQLAlchemyError as e:
+            await self._db.rollback()
+            logger.error(f"保存任务执行记录时发生错误: {e}")
+            raise JobHistoryRepositoryError("保存任务执行记录时数据库操作失败", e)
+        except Exception as e:
+            await self._db.rollback()
+            logger.error(f"保存任务执行记录时发生未知错误: {e}")
+            raise JobHistoryRepositoryError("保存任务执行记录时发生未知错误", e)
+
+    async def finish_run(self, run_id: int, values: dict) -> None:
+        """
+        更新执行记录的结果
+        :param values: status、finished_at、duration_ms、stages、error 等列的新值
+        """
+        try:
+            await self._db.execute(update(JobHistoryOrm).where(JobHistoryOrm.id == run_id).values(**values))
+            await self._db.commit()
+        except SQLAlchemyError as e:
+            await self._db.rollback()
+            logger.error(f"更新任务执行记录时发生错误: {e}")
+            raise JobHistoryRepositoryError("更新任务执行记录时数据库操作失败", e)
+        except Exception as e:
+            await self._db.rollback()
+            logger.error(f"更新任务执行记录时发生未知错误: {e}")
+            raise JobHistoryRepositoryError("更新任务执行记录时发生未知错误", e)
+
+    async def find_successful_run(self, job_name: str, trade_date: date) -> Optional[JobHistoryOrm]:
+        """查询任务在某个交易日的成功执行记录，用于主节点切换后避免重复执行"""
+        try:
+            stmt = select(JobHistoryOrm).where(
+                JobHistoryOrm.job_name == job_name,
+                JobHistoryOrm.trade_date == trade_date,
+                JobHistoryOrm.status == "success",
+            ).limit(1)
+            # 刚写入的记录可能尚未复制到副本，查询走主库
+            result = await self._db.execute(stmt)
+            return result.scalars().first()
+        except SQLAlchemyError as e:
+            await self._db.rollback()
+            logger.error(f"查询任务执行记录时发生错误: {e}")
+            raise JobHistoryRepositoryError("查询任务执行记录时数据库操作失败", e)
+        except Exception as e:
+            await self._db.rollback()
+            logger.error(f"查询任务执行记录时发生未知错误: {e}")
+            raise JobHistoryRepositoryError("查询任务执行记录时发生未知错误", e)
+
+    async def find_recent_runs(self, job_name: Optional[str] = None, limit: int = 20) -> list[JobHistoryOrm]:
+        """按开始时间倒序查询最近的执行记录，job_name 为空时返回全部任务的记录"""
+        try:
+            stmt = select(JobHistoryOrm)
+            if job_name:
+                stmt = stmt.where(JobHistoryOrm.job_name == job_name)
+            stmt = stmt.order_by(desc(JobHistoryOrm.started_at)).limit(limit)
+            result = await self._db.execute(stmt)
+            return result.scalars().all()
+        except SQLAlchemyError as e:
+            await self._db.rollback()
+            logger.error(f"查询最近的任务执行记录时发生错误: {e}")
+            raise JobHistoryRepositoryError("查询最近的任务执行记录时数据库操作失败", e)
+        except Exception as e:
+            await self._db.rollback()
+            logger.error(f"查询最近的任务执行记录时发生未知错误: {e}")
+            raise JobHistoryRepositoryError("查询最近的任务执行记录时发生未知错误", e)
@@ -1,11 +1,24 @@
 from app.models.stock_daily_orm import StockDailyOrm
+from app.models.stock_daily_meta_orm import StockDailyMetaOrm
+from app.schemas.daily_bars import DailyBars, DAILY_BAR_FIELDS
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional
+from app.core.database import read_from_replica
+import numpy as np
+from itertools import groupby
+from operator import itemgetter
+from typing import Optional, AsyncIterator
 from datetime import date
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import select
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.sql import func
 from loguru import logger
 
+# 批量写入时每批的行数
+UPSERT_CHUNK_SIZE = 1000
+# 流式读取时服务端游标每次拉取的行数
+STREAM_YIELD_PER = 1000
+
 class StockDailyRepositoryError(Exception):
     """用于处理股票日线数据存取过程中出现的异常"""
     pass
@@ -31,6 +44,106 @@ class StockDailyRepository:
             logger.error(f"保存股票日线数据时发生未知错误: {e}")
             raise StockDailyRepositoryError("保存股票日线数据时发生未知错误", e)
 
+    @staticmethod
+    def _upsert_statement(columns: list[str]):
+        """构造 INSERT ... ON DUPLICATE KEY UPDATE 语句，主键以外的列在冲突时更新"""
+        stmt = insert(StockDailyOrm)
+        update_columns = {
+            column: stmt.inserted[column]
+            for column in columns
+            if column not in ("stock_code", "date")
+        }
+        update_columns["updated_at"] = func.now()
+        return stmt.on_duplicate_key_update(update_columns)
+
+    @staticmethod
+    def _meta_upsert_statement():
+        """构造日线元数据的 INSERT ... ON DUPLICATE KEY UPDATE 语句"""
+        stmt = insert(StockDailyMetaOrm)
+        return stmt.on_duplicate_key_update(
+            first_date=stmt.inserted.first_date,
+            last_date=stmt.inserted.last_date,
+            bar_count=stmt.inserted.bar_count,
+            data_version=stmt.inserted.data_version,
+            factor_digest=stmt.inserted.factor_digest,
+            updated_at=func.now(),
+        )
+
+    async def bulk_upsert_daily_bars(self, bars: DailyBars, meta: Optional[dict] = None) -> None:
+        """
+        分批写入 DailyBars，每批只在写入前把对应的切片转换为入库参数
+
+        :param bars: 由 StockDailyClient.get_daily_bars 生成的日线数据
+        :param meta: 该股票的日线元数据，与日线数据在同一事务中写入
+        """
+        if not len(bars):
+            return
+        try:
+            stmt = self._upsert_statement(["stock_code", *DAILY_BAR_FIELDS])
+            for start in range(0, len(bars), UPSERT_CHUNK_SIZE):
+                await self._db.execute(stmt, bars[start:start + UPSERT_CHUNK_SIZE].to_rows())
+            if meta is not None:
+                await self._db.execute(self._meta_upsert_statement(), [meta])
+            await self._db.commit()
+        except SQLAlchemyError as e:
+            await self._db.rollback()
+            logger.error(f"批量写入股票日线数据时发生错误: {e}")
+            raise StockDailyRepositoryError("批量写入股票日线数据时数据库操作失败", e)
+        except Exception as e:
+            await self._db.rollback()
+            logger.error(f"批量写入股票日线数据时发生未知错误: {e}")
+            raise StockDailyRepositoryError("批量写入股票日线数据时发生未知错误", e)
+
+    async def find_daily_meta(self, stock_code: str) -> Optional[StockDailyMetaOrm]:
+        """按主键查询单只股票的日线元数据（覆盖范围与数据版本）"""
+        try:
+            return await self._db.get(StockDailyMetaOrm, stock_code, populate_existing=True)
+        except SQLAlchemyError as e:
+            await self._db.rollback()
+            logger.error(f"查询股票日线元数据时发生错误: {e}")
+            raise StockDailyRepositoryError("查询股票日线元数据时数据库操作失败", e)
+        except Exception as e:
+            await self._db.rollback()
+            logger.error(f"查询股票日线元数据时发生未知错误: {e}")
+            raise StockDailyRepositoryError("查询股票日线元数据时发生未知错误", e)
+
+    async def upsert_daily_meta(self, meta: dict) -> None:
+        """
+        写入单只股票的日线元数据，用于为已有日线但缺少元数据的股票补建
+        :param meta: 包含 stock_code、first_date、last_date、bar_count、data_version、factor_digest 的参数
+        """
+        try:
+            await self._db.execute(self._meta_upsert_statement(), [meta])
+            await self._db.commit()
+        except SQLAlchemyError as e:
+            await self._db.rollback()
+            logger.error(f"保存股票日线元数据时发生错误: {e}")
+            raise StockDailyRepositoryError("保存股票日线元数据时数据库操作失败", e)
+        except Exception as e:
+            await self._db.rollback()
+            logger.error(f"保存股票日线元数据时发生未知错误: {e}")
+            raise StockDailyRepositoryError("保存股票日线元数据时发生未知错误", e)
+
+    async def find_codes_with_last_date_through(self, through: date) -> list[str]:
+        """
+        查询已入库日线的最新日期不晚于 through 的股票代码，用于收盘后同步：
+        落后的股票补齐新日线，已到最新交易日的股票重新核对当天日线
+        :param through: 最新交易日
+        """
+        try:
+            stmt = select(StockDailyMetaOrm.stock_code).where(StockDailyMetaOrm.last_date <= through).order_by(StockDailyMetaOrm.stock_code)
+            # 同步前刚写入的元数据可能尚未复制到副本，查询走主库
+            result = await self._db.execute(stmt)
+            return list(result.scalars().all())
+        except SQLAlchemyError as e:
+            await self._db.rollback()
+            logger.error(f"查询待同步的股票代码时发生错误: {e}")
+            raise StockDailyRepositoryError("查询待同步的股票代码时数据库操作失败", e)
+        except Exception as e:
+            await self._db.rollback()
+            logger.error(f"查询待同步的股票代码时发生未知错误: {e}")
+            raise StockDailyRepositoryError("查询待同步的股票代码时发生未知错误", e)
+
     async def find_stock_daily(self, stock_code: str,start_date: Optional[date]=None, end_date: Optional[date]=None)-> list[StockDailyOrm]:
         try:
             stmt = select(StockDailyOrm).where(StockDailyOrm.stock_code == stock_code)
@@ -39,7 +152,7 @@ class StockDailyRepository:
             if end_date:
                 stmt = stmt.where(StockDailyOrm.date <= end_date)
             stmt = stmt.order_by(StockDailyOrm.date)
-            result = await self._db.execute(stmt)
+            result = await self._db.execute(read_from_replica(stmt))
             stock_daily = result.scalars().all()
             return stock_daily
         except SQLAlchemyError as e:
@@ -51,6 +164,97 @@ class StockDailyRepository:
             logger.error(f"查询股票日线数据时发生未知错误: {e}")
             raise StockDailyRepositoryError("查询股票日线数据时发生未知错误", e)
 
+    @staticmethod
+    def _bars_statement(stock_codes: list[str], start_date: Optional[date], end_date: Optional[date]):
+        """构造只选取 DAILY_BAR_FIELDS 列的范围查询，按股票代码、日期排序"""
+        columns = [getattr(StockDailyOrm, name) for name in DAILY_BAR_FIELDS]
+        stmt = select(StockDailyOrm.stock_code, *columns).where(StockDailyOrm.stock_code.in_(stock_codes))
+        if start_date:
+            stmt = stmt.where(StockDailyOrm.date >= start_date)
+        if end_date:
+            stmt = stmt.where(StockDailyOrm.date <= end_date)
+        return stmt.order_by(StockDailyOrm.stock_code, StockDailyOrm.date)
+
+    @staticmethod
+    def _rows_to_bars(rows: list) -> dict[str, DailyBars]:
+        """将按股票代码排序的 (股票代码, *DAILY_BAR_FIELDS) 行按股票代码拆分为 DailyBars"""
+        return {
+            stock_code: DailyBars.from_rows(stock_code, (row[1:] for row in group))
+            for stock_code, group in groupby(rows, key=itemgetter(0))
+        }
+
+    async def find_daily_bars(self, stock_code: str, start_date: Optional[date]=None, end_date: Optional[date]=None) -> DailyBars:
+        """
+        查询单只股票的日线数据，直接读取列值构造 DailyBars，不创建 ORM 对象
+        """
+        bars = await self.find_daily_bars_batch([stock_code], start_date, end_date)
+        return bars.get(stock_code) or DailyBars.empty(stock_code)
+
+    async def find_daily_bars_batch(self, stock_codes: list[str], start_date: Optional[date]=None, end_date: Optional[date]=None) -> dict[str, DailyBars]:
+        """
+        使用一条 stock_code IN (...) 范围查询获取多只股票的日线数据
+        :param stock_codes: 股票代码列表
+        :param start_date: 起始日期
+        :param end_date: 结束日期
+        :return: 股票代码到 DailyBars 的映射，没有数据的股票不在结果中
+        """
+        try:
+            result = await self._db.execute(read_from_replica(self._bars_statement(stock_codes, start_date, end_date)))
+            return self._rows_to_bars(result.all())
+        except SQLAlchemyError as e:
+            await self._db.rollback()
+            logger.error(f"批量查询股票日线数据时发生错误: {e}")
+            raise StockDailyRepositoryError("批量查询股票日线数据时数据库操作失败", e)
+        except Exception as e:
+            await self._db.rollback()
+            logger.error(f"批量查询股票日线数据时发生未知错误: {e}")
+            raise StockDailyRepositoryError("批量查询股票日线数据时发生未知错误", e)
+
+    async def find_stock_daily_dates_batch(self, stock_codes: list[str], start_date: Optional[date]=None, end_date: Optional[date]=None) -> dict[str, np.ndarray]:
+        """
+        只查询多只股票已有的交易日期，用于在不加载整行数据的情况下检查覆盖情况
+        :return: 股票代码到升序日期数组（datetime64[D]）的映射，没有数据的股票不在结果中
+        """
+        try:
+            stmt = select(StockDailyOrm.stock_code, StockDailyOrm.date).where(StockDailyOrm.stock_code.in_(stock_codes))
+            if start_date:
+                stmt = stmt.where(StockDailyOrm.date >= start_date)
+            if end_date:
+                stmt = stmt.where(StockDailyOrm.date <= end_date)
+            stmt = stmt.order_by(StockDailyOrm.stock_code, StockDailyOrm.date)
+            result = await self._db.execute(read_from_replica(stmt))
+            return {
+                stock_code: np.array([row[1] for row in group], dtype="datetime64[D]")
+                for stock_code, group in groupby(result.all(), key=itemgetter(0))
+            }
+        except SQLAlchemyError as e:
+            await self._db.rollback()
+            logger.error(f"查询股票日线日期时发生错误: {e}")
+            raise StockDailyRepositoryError("查询股票日线日期时数据库操作失败", e)
+        except Exception as e:
+            await self._db.rollback()
+            logger.error(f"查询股票日线日期时发生未知错误: {e}")
+            raise StockDailyRepositoryError("查询股票日线日期时发生未知错误", e)
+
+    async def stream_daily_bars_batch(self, stock_codes: list[str], start_date: Optional[date]=None, end_date: Optional[date]=None, yield_per: int = STREAM_YIELD_PER) -> AsyncIterator[DailyBars]:
+        """
+        通过服务端游标逐批读取多只股票的日线数据，每批转换为 DailyBars 后输出，内存占用与查询范围长度无关
+        :param yield_per: 每次从游标拉取的行数
+        :return: 按股票代码、日期顺序输出的 DailyBars 分块，同一股票可能跨越多个分块
+        """
+        try:
+            stmt = read_from_replica(self._bars_statement(stock_codes, start_date, end_date)).execution_options(yield_per=yield_per)
+            result = await self._db.stream(stmt)
+            async for partition in result.partitions():
+                for bars in self._rows_to_bars(partition).values():
+                    yield bars
+        except SQLAlchemyError as e:
+            logger.error(f"流式查询股票日线数据时发生错误: {e}")
+            raise StockDailyRepositoryError("流式查询股票日线数据时数据库操作失败", e)
+        except Exception as e:
+            logger.error(f"流式查询股票日线数据时发生未知错误: {e}")
+            raise StockDailyRepositoryError("流式查询股票日线数据时发生未知错误", e)
+
 if __name__ == "__main__":
     from app.core.database import get_async_db
     import asyncio
@@ -62,12 +266,12 @@ if __name__ == "__main__":
             stock_code = "000001"
             start_date = "20230101"
             end_date = "20231001"
-            stock_daily_items = await client.get_daily_items(stock_code, start_date, end_date)
-            stock_daily_orms = [item.to_orm() for item in stock_daily_items]
+            daily_bars, summary = await client.get_daily_bars(stock_code, start_date, end_date)
+            logger.info(f"日线数据校验汇总: {summary}")
     
             async for db in get_async_db():
                 repository = StockDailyRepository(db)
-                await repository.save_stock_daily(stock_daily_orms)
+                await repository.bulk_upsert_daily_bars(daily_bars)
                 logger.info("股票日线数据保存成功")
 
         except Exception as e:
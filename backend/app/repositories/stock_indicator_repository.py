@@ -0,0 +1,67 @@
+from app.models.stock_indicator_state_orm import StockIndicatorStateOrm
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import select
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.sql import func
+from loguru import logger
+
+class StockIndicatorRepositoryError(Exception):
+    """用于处理技术指标滚动状态存取过程中出现的异常"""
+    pass
+
+class StockIndicatorRepository:
+    """
+    技术指标滚动状态数据仓库
+    """
+    def __init__(self, db: AsyncSession):
+        self._db = db
+
+    async def find_states(self, stock_codes: list[str], indicators: Optional[list[str]] = None) -> list[StockIndicatorStateOrm]:
+        """
+        查询多只股票的指标滚动状态
+        :param stock_codes: 股票代码列表
+        :param indicators: 指标名称列表，为空时返回全部指标
+        """
+        try:
+            stmt = select(StockIndicatorStateOrm).where(StockIndicatorStateOrm.stock_code.in_(stock_codes))
+            if indicators:
+                stmt = stmt.where(StockIndicatorStateOrm.indicator.in_(indicators))
+            result = await self._db.execute(stmt)
+            return result.scalars().all()
+        except SQLAlchemyError as e:
+            await self._db.rollback()
+            logger.error(f"查询指标滚动状态时发生错误: {e}")
+            raise StockIndicatorRepositoryError("查询指标滚动状态时数据库操作失败", e)
+        except Exception as e:
+            await self._db.rollback()
+            logger.error(f"查询指标滚动状态时发生未知错误: {e}")
+            raise StockIndicatorRepositoryError("查询指标滚动状态时发生未知错误", e)
+
+    async def upsert_states(self, rows: list[dict]) -> None:
+        """
+        使用 INSERT ... ON DUPLICATE KEY UPDATE 批量写入指标滚动状态
+        :param rows: 包含 stock_code、indicator、last_date、qfq_scale、state、last_values 的参数列表
+        """
+        if not rows:
+            return
+        try:
+            stmt = insert(StockIndicatorStateOrm)
+            stmt = stmt.on_duplicate_key_update(
+                last_date=stmt.inserted.last_date,
+                qfq_scale=stmt.inserted.qfq_scale,
+                state=stmt.inserted.state,
+                last_values=stmt.inserted.last_values,
+                updated_at=func.now(),
+            )
+            await self._db.execute(stmt, rows)
+            await self._db.commit()
+        except SQLAlchemyError as e:
+            await self._db.rollback()
+            logger.error(f"保存指标滚动状态时发生错误: {e}")
+            raise StockIndicatorRepositoryError("保存指标滚动状态时数据库操作失败", e)
+        except Exception as e:
+            await self._db.rollback()
+            logger.error(f"保存指标滚动状态时发生未知错误: {e}")
+            raise StockIndicatorRepositoryError("保存指标滚动状态时发生未知错误", e)
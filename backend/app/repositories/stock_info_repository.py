@@ -1,6 +1,8 @@
 from app.models.stock_info_orm import StockInfoOrm
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import read_from_replica
 from typing import Optional
+from datetime import datetime
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import select
 from loguru import logger
@@ -32,7 +34,7 @@ class StockInfoRepository:
     async def find_stock_info(self, stock_code: str)-> Optional[StockInfoOrm]:
         try:
             stmt = select(StockInfoOrm).where(StockInfoOrm.stock_code == stock_code)
-            result = await self._db.execute(stmt)
+            result = await self._db.execute(read_from_replica(stmt))
             stock_info = result.scalars().first()
             return stock_info
         except SQLAlchemyError as e:
@@ -44,6 +46,29 @@ class StockInfoRepository:
             logger.error(f"查询个股信息数据时发生未知错误: {e}")
             raise StockInfoRepositoryError("查询个股信息数据时发生未知错误", e)
 
+    async def find_stock_codes_updated_before(self, threshold: datetime) -> list[str]:
+        """
+        查询更新时间早于指定时间的股票代码，用于批量刷新即将过期的个股信息
+        :param threshold: 更新时间阈值
+        :return: 股票代码列表，按更新时间升序排列
+        """
+        try:
+            stmt = (
+                select(StockInfoOrm.stock_code)
+                .where(StockInfoOrm.updated_at < threshold)
+                .order_by(StockInfoOrm.updated_at)
+            )
+            result = await self._db.execute(read_from_replica(stmt))
+            return list(result.scalars().all())
+        except SQLAlchemyError as e:
+            await self._db.rollback()
+            logger.error(f"查询待刷新个股信息时发生错误: {e}")
+            raise StockInfoRepositoryError("查询待刷新个股信息时数据库操作失败", e)
+        except Exception as e:
+            await self._db.rollback()
+            logger.error(f"查询待刷新个股信息时发生未知错误: {e}")
+            raise StockInfoRepositoryError("查询待刷新个股信息时发生未知错误", e)
+
 if __name__ == "__main__":
     from app.core.database import get_async_db
     import asyncio
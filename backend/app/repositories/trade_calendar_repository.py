@@ -1,5 +1,6 @@
 from app.models.trade_calendar_orm import TradeCalendarOrm
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import read_from_replica
 from datetime import date
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import select
@@ -65,7 +66,7 @@ class TradeCalendarRepository:
                 stmt = stmt.where(TradeCalendarOrm.trade_date <= end_date)
             # 按日期排序
             stmt = stmt.order_by(TradeCalendarOrm.trade_date)
-            result = await self._db.execute(stmt)
+            result = await self._db.execute(read_from_replica(stmt))
             return result.scalars().all()  # 返回该交易所所有的交易日历记录
         except SQLAlchemyError as e:
             await self._db.rollback()
@@ -88,7 +89,7 @@ class TradeCalendarRepository:
                 TradeCalendarOrm.exchange_code == exchange_code
             ).order_by(desc(TradeCalendarOrm.trade_date))
 
-            result = await self._db.execute(stmt)
+            result = await self._db.execute(read_from_replica(stmt))
             latest_trade_day = result.scalars().first()  # 获取最早的交易日（即最近的交易日）
 
             return latest_trade_day
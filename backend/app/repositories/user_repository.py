@@ -1,9 +1,9 @@
 from app.models.user_orm import UserOrm
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import select, update
+from sqlalchemy import select, update, case
 from loguru import logger
 
 class UserRepositoryError(Exception):
@@ -79,6 +79,22 @@ class UserRepository:
             logger.error(f"更新用户信息时发生错误: {e}")
             raise UserRepositoryError("更新用户信息时数据库操作失败", e)
 
+    async def update_password(self, username: str, hashed_password: str) -> bool:
+        """只更新密码哈希，不写回其他列"""
+        try:
+            stmt = (
+                update(UserOrm)
+                .where(UserOrm.username == username, UserOrm.deleted_at.is_(None))
+                .values(hashed_password=hashed_password, updated_at=datetime.now())
+            )
+            result = await self._db.execute(stmt)
+            await self._db.commit()
+            return result.rowcount > 0
+        except SQLAlchemyError as e:
+            await self._db.rollback()
+            logger.error(f"更新密码哈希时发生错误: {e}")
+            raise UserRepositoryError("更新密码哈希时数据库操作失败", e)
+
     async def soft_delete(self, username: str) -> None:
         """软删除用户"""
         try:
@@ -93,6 +109,29 @@ class UserRepository:
             logger.error(f"软删除用户时发生错误: {e}")
             raise UserRepositoryError("软删除用户时数据库操作失败", e)
 
+    async def update_last_login_batch(self, last_logins: Dict[int, datetime]) -> int:
+        """
+        用一条 UPDATE ... SET last_login = CASE id WHEN ... END WHERE id IN (...) 批量更新多个用户的最后登录时间
+        :param last_logins: 用户 ID 到最后登录时间的映射
+        :return: 更新的行数
+        """
+        if not last_logins:
+            return 0
+        try:
+            stmt = (
+                update(UserOrm)
+                .where(UserOrm.id.in_(list(last_logins)))
+                .values(last_login=case(last_logins, value=UserOrm.id))
+                .execution_options(synchronize_session=False)
+            )
+            result = await self._db.execute(stmt)
+            await self._db.commit()
+            return result.rowcount
+        except SQLAlchemyError as e:
+            await self._db.rollback()
+            logger.error(f"批量更新最后登录时间时发生错误: {e}")
+            raise UserRepositoryError("批量更新最后登录时间时数据库操作失败", e)
+
     async def find_all_active_users(self) -> List[UserOrm]:
         """查询所有活跃用户"""
         try:
@@ -0,0 +1,257 @@
+import hashlib
+import numpy as np
+from dataclasses import dataclass, field, replace
+from datetime import date as Date
+from decimal import Decimal
+from typing import Dict, Iterable, Mapping, Optional, Sequence
+from app.schemas.stock_daily import StockDailyResponse, StockDailyResponseItem, StockDailyBatchResponse
+
+# 日线列及其 NumPy 类型，日期为 datetime64[D]
+DAILY_BAR_DTYPES = {
+    "date": "datetime64[D]",
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "change": np.float64,
+    "pct_chg": np.float64,
+    "vol": np.int64,
+    "amount": np.float64,
+    "qfq_factor": np.float64,
+    "hfq_factor": np.float64,
+}
+DAILY_BAR_FIELDS = tuple(DAILY_BAR_DTYPES)
+# 数值列的小数位数，与 stock_daily 表的 Numeric 精度一致，转换回 Decimal 时使用
+DAILY_BAR_SCALES = {
+    "open": 4, "high": 4, "low": 4, "close": 4, "change": 4,
+    "pct_chg": 2, "amount": 2, "qfq_factor": 6, "hfq_factor": 6,
+}
+# 复权时需要乘以复权因子的价格列
+ADJUSTED_PRICE_FIELDS = ("open", "high", "low", "close")
+
+@dataclass(frozen=True, eq=False)
+class DailyBars:
+    """
+    单只股票日线数据的列式容器（struct-of-arrays）
+
+    - 每个字段是一个连续的 NumPy 数组，按日期升序排列
+    - 按日期范围切片返回共享底层缓冲区的视图，不复制数据
+    - 仓储、服务、缓存与导出均使用该类型传递日线数据，只在返回逐行 JSON 时才构造 Pydantic 对象
+    - adjust 标记开高低收价格的复权方式，数据库中保存的均为不复权价格
+    """
+    stock_code: str
+    date: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    change: np.ndarray
+    pct_chg: np.ndarray
+    vol: np.ndarray
+    amount: np.ndarray
+    qfq_factor: np.ndarray
+    hfq_factor: np.ndarray
+    adjust: str = "none"
+
+    @classmethod
+    def from_columns(cls, stock_code: str, columns: Mapping[str, Sequence]) -> "DailyBars":
+        """
+        由字段到数组（或序列）的映射构造，类型已一致的数组不会被复制
+        """
+        return cls(stock_code, **{
+            name: np.asarray(columns[name], dtype=dtype) for name, dtype in DAILY_BAR_DTYPES.items()
+        })
+
+    @classmethod
+    def from_rows(cls, stock_code: str, rows: Iterable[Sequence]) -> "DailyBars":
+        """
+        由按 DAILY_BAR_FIELDS 顺序排列的行（如数据库查询结果）构造
+        """
+        rows = list(rows)
+        if not rows:
+            return cls.empty(stock_code)
+        return cls.from_columns(stock_code, dict(zip(DAILY_BAR_FIELDS, zip(*rows))))
+
+    @classmethod
+    def empty(cls, stock_code: str) -> "DailyBars":
+        """构造不含数据的实例"""
+        return cls(stock_code, **{name: np.empty(0, dtype=dtype) for name, dtype in DAILY_BAR_DTYPES.items()})
+
+    def __len__(self) -> int:
+        return len(self.date)
+
+    def __getitem__(self, index: slice) -> "DailyBars":
+        """按位置切片，返回视图"""
+        if not isinstance(index, slice):
+            raise TypeError("DailyBars 只支持切片访问")
+        return replace(self, **{name: getattr(self, name)[index] for name in DAILY_BAR_FIELDS})
+
+    def take(self, indices: np.ndarray) -> "DailyBars":
+        """按升序位置数组取出部分K线，返回复制后的新实例"""
+        return replace(self, **{name: getattr(self, name)[indices] for name in DAILY_BAR_FIELDS})
+
+    @property
+    def start_date(self) -> Optional[Date]:
+        return self.date[0].item() if len(self) else None
+
+    @property
+    def end_date(self) -> Optional[Date]:
+        return self.date[-1].item() if len(self) else None
+
+    @property
+    def nbytes(self) -> int:
+        """各列数组占用的字节数"""
+        return sum(getattr(self, name).nbytes for name in DAILY_BAR_FIELDS)
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """返回字段名到数组的映射"""
+        return {name: getattr(self, name) for name in DAILY_BAR_FIELDS}
+
+    def slice_dates(self, start_date: Optional[Date] = None, end_date: Optional[Date] = None) -> "DailyBars":
+        """
+        按闭区间 [start_date, end_date] 切片，返回共享缓冲区的视图
+        """
+        lo = 0 if start_date is None else int(np.searchsorted(self.date, np.datetime64(start_date, "D"), side="left"))
+        hi = len(self) if end_date is None else int(np.searchsorted(self.date, np.datetime64(end_date, "D"), side="right"))
+        return self[lo:hi]
+
+    def factor_digest(self) -> str:
+        """
+        日期与前、后复权因子的 SHA-256 摘要，因子先按数据库精度舍入，
+        用于判断已有日期的复权因子是否发生变化（如除权除息后前复权因子整段改变）
+        """
+        digest = hashlib.sha256(self.date.astype(np.int64).tobytes())
+        for name in ("qfq_factor", "hfq_factor"):
+            digest.update(np.round(getattr(self, name), DAILY_BAR_SCALES[name]).tobytes())
+        return digest.hexdigest()
+
+    def same_values(self, other: "DailyBars") -> bool:
+        """
+        按数据库精度比较两段日线的日期与全部数值列是否相同，
+        用于判断重新获取的日线与已入库的是否一致
+        """
+        if not np.array_equal(self.date, other.date):
+            return False
+        return all(
+            np.array_equal(np.round(getattr(self, name), DAILY_BAR_SCALES.get(name, 0)), np.round(getattr(other, name), DAILY_BAR_SCALES.get(name, 0)))
+            for name in DAILY_BAR_FIELDS[1:]
+        )
+
+    def adjusted(self, adjust: str) -> "DailyBars":
+        """
+        计算复权后的开高低收价格：四列价格组成矩阵后与复权因子一次性相乘，并按价格精度舍入，
+        成交量、涨跌额、涨跌幅与复权因子保持不变
+
+        :param adjust: none 不复权，qfq 前复权，hfq 后复权
+        :return: 新的 DailyBars，未复权时返回自身
+        """
+        if adjust == self.adjust:
+            return self
+        if self.adjust != "none":
+            raise ValueError(f"只能对不复权数据计算复权价格，当前为 {self.adjust}")
+        if adjust not in ("qfq", "hfq"):
+            raise ValueError(f"不支持的复权方式: {adjust}")
+        factor = self.qfq_factor if adjust == "qfq" else self.hfq_factor
+        prices = np.round(np.vstack([getattr(self, name) for name in ADJUSTED_PRICE_FIELDS]) * factor, DAILY_BAR_SCALES["close"])
+        return replace(self, adjust=adjust, **dict(zip(ADJUSTED_PRICE_FIELDS, prices)))
+
+    def to_rows(self) -> list[dict]:
+        """
+        转换为批量入库的参数列表，只能用于不复权数据
+        """
+        if self.adjust != "none":
+            raise ValueError("复权后的日线数据不能入库")
+        values = {name: getattr(self, name).tolist() for name in DAILY_BAR_FIELDS}
+        values["stock_code"] = [self.stock_code] * len(self)
+        names = ("stock_code",) + DAILY_BAR_FIELDS
+        return [dict(zip(names, row)) for row in zip(*(values[name] for name in names))]
+
+    def to_response(self) -> Optional[StockDailyResponse]:
+        """
+        转换为逐行的 StockDailyResponse，数值按数据库精度还原为 Decimal，无数据时返回 None
+        """
+        if not len(self):
+            return None
+        values = {"date": self.date.tolist(), "vol": self.vol.tolist()}
+        for name, scale in DAILY_BAR_SCALES.items():
+            values[name] = [Decimal(text) for text in np.char.mod(f"%.{scale}f", getattr(self, name)).tolist()]
+        daily_items = [
+            StockDailyResponseItem.model_construct(**dict(zip(DAILY_BAR_FIELDS, row)))
+            for row in zip(*(values[name] for name in DAILY_BAR_FIELDS))
+        ]
+        return StockDailyResponse(
+            stock_code=self.stock_code,
+            daily=daily_items,
+            data_count=len(daily_items),
+            start_date=self.start_date,
+            end_date=self.end_date,
+            adjust=self.adjust
+        )
+
+@dataclass
+class DailyBarsBatch:
+    """
+    多只股票的日线数据，无数据的股票对应 None，获取失败的股票记录在 errors 中
+    """
+    bars: Dict[str, Optional[DailyBars]]
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    def to_response(self) -> StockDailyBatchResponse:
+        """转换为逐行的 StockDailyBatchResponse"""
+        return StockDailyBatchResponse(
+            data={
+                stock_code: bars.to_response() if bars is not None else None
+                for stock_code, bars in self.bars.items()
+            },
+            errors=self.errors
+        )
+
+if __name__ == "__main__":
+    # 使用 tracemalloc 对比 1 万条日线数据在 ORM 对象列表、响应对象列表与 DailyBars 中的内存占用
+    import pickle
+    import tracemalloc
+    from datetime import timedelta
+    from loguru import logger
+    from app.models.stock_daily_orm import StockDailyOrm
+
+    BAR_COUNT = 10_000
+    rng = np.random.default_rng(0)
+    dates = [Date(1990, 12, 19) + timedelta(days=i) for i in range(BAR_COUNT)]
+    closes = np.round(10 * np.exp(np.cumsum(rng.normal(0, 0.02, BAR_COUNT))), 2)
+
+    def make_rows() -> list[tuple]:
+        """构造与数据库查询结果一致的行（Decimal 数值）"""
+        return [
+            (
+                dates[i], Decimal(f"{closes[i]:.4f}"), Decimal(f"{closes[i] * 1.01:.4f}"), Decimal(f"{closes[i] * 0.99:.4f}"),
+                Decimal(f"{closes[i]:.4f}"), Decimal("0.1200"), Decimal("1.05"), int(rng.integers(1e3, 1e6)),
+                Decimal(f"{closes[i] * 1e5:.2f}"), Decimal("0.812345"), Decimal("3.215400"),
+            )
+            for i in range(BAR_COUNT)
+        ]
+
+    def measure(build) -> tuple[object, int]:
+        """测量构造结果在构造完成后仍占用的内存"""
+        tracemalloc.start()
+        result = build()
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return result, current
+
+    rows = make_rows()
+    _, orm_bytes = measure(lambda: [StockDailyOrm(stock_code="000001", **dict(zip(DAILY_BAR_FIELDS, row))) for row in make_rows()])
+    _, response_bytes = measure(lambda: DailyBars.from_rows("000001", rows).to_response())
+    _, rows_bytes = measure(make_rows)
+    bars, bars_bytes = measure(lambda: DailyBars.from_rows("000001", rows))
+
+    assert bars.to_response().daily[5].close == rows[5][4]
+    window = bars.slice_dates(dates[100], dates[199])
+    assert len(window) == 100 and np.shares_memory(window.close, bars.close)
+
+    logger.info(f"{BAR_COUNT} 条日线数据的内存占用（tracemalloc）：")
+    logger.info(f"  List[StockDailyOrm]:              {orm_bytes / 1024:>10.1f} KB")
+    logger.info(f"  查询结果行（Decimal 元组）:        {rows_bytes / 1024:>10.1f} KB")
+    logger.info(f"  StockDailyResponse（逐行对象）:    {response_bytes / 1024:>10.1f} KB")
+    logger.info(f"  DailyBars:                        {bars_bytes / 1024:>10.1f} KB（列数组 {bars.nbytes / 1024:.1f} KB）")
+    logger.info(f"  缓存序列化大小：StockDailyResponse {len(pickle.dumps(bars.to_response())) / 1024:.1f} KB，"
+                f"DailyBars {len(pickle.dumps(bars)) / 1024:.1f} KB")
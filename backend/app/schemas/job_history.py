@@ -0,0 +1,24 @@
+from pydantic import BaseModel, Field
+from typing import Optional, Any
+from datetime import date, datetime
+
+# 任务执行记录请求模型
+class JobHistoryRequest(BaseModel):
+    job_name: Optional[str] = Field(None, description="任务名称，如 post_close，为空时返回全部任务")
+    limit: int = Field(20, ge=1, le=100, description="返回的记录数")
+
+# 任务执行记录
+class JobHistoryItem(BaseModel):
+    id: int = Field(..., description="执行记录 ID")
+    job_name: str = Field(..., description="任务名称")
+    trade_date: Optional[date] = Field(None, description="任务处理的交易日")
+    status: str = Field(..., description="执行状态：running、success、failed、skipped、aborted")
+    worker: str = Field(..., description="执行任务的工作进程标识")
+    started_at: datetime = Field(..., description="开始时间")
+    finished_at: Optional[datetime] = Field(None, description="结束时间")
+    duration_ms: Optional[int] = Field(None, description="总耗时（毫秒）")
+    stages: Optional[list[dict[str, Any]]] = Field(None, description="各阶段的状态、耗时与统计")
+    error: Optional[str] = Field(None, description="失败原因")
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,113 @@
+import numpy as np
+from dataclasses import dataclass, replace
+from datetime import date as Date
+from decimal import Decimal
+from typing import Dict, Optional
+from app.schemas.daily_bars import ADJUSTED_PRICE_FIELDS, DAILY_BAR_SCALES
+from app.schemas.stock_period import StockPeriodResponse, StockPeriodResponseItem
+
+# 周期K线列及其 NumPy 类型，date 为按交易日历对齐的周期结束日期
+PERIOD_BAR_DTYPES = {
+    "date": "datetime64[D]",
+    "first_date": "datetime64[D]",
+    "last_date": "datetime64[D]",
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "pct_chg": np.float64,
+    "vol": np.int64,
+    "amount": np.float64,
+    "trade_days": np.int64,
+}
+PERIOD_BAR_FIELDS = tuple(PERIOD_BAR_DTYPES)
+
+@dataclass(frozen=True, eq=False)
+class PeriodBars:
+    """
+    单只股票周期K线（周线/月线/季线）的列式容器，结构与 DailyBars 一致
+
+    - 每个字段是按周期升序排列的 NumPy 数组，最后一根可能属于尚未结束的周期
+    - qfq_scale 为最后一根日线的前复权因子与后复权因子之比，后复权K线乘以该比值即为前复权K线
+    """
+    stock_code: str
+    period: str
+    adjust: str
+    date: np.ndarray
+    first_date: np.ndarray
+    last_date: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    pct_chg: np.ndarray
+    vol: np.ndarray
+    amount: np.ndarray
+    trade_days: np.ndarray
+    qfq_scale: float = 1.0
+
+    @classmethod
+    def empty(cls, stock_code: str, period: str, adjust: str) -> "PeriodBars":
+        """构造不含数据的实例"""
+        return cls(stock_code, period, adjust, **{name: np.empty(0, dtype=dtype) for name, dtype in PERIOD_BAR_DTYPES.items()})
+
+    @classmethod
+    def concat(cls, head: "PeriodBars", tail: "PeriodBars") -> "PeriodBars":
+        """按顺序拼接两段周期K线，qfq_scale 取自后一段"""
+        return replace(tail, **{name: np.concatenate([getattr(head, name), getattr(tail, name)]) for name in PERIOD_BAR_FIELDS})
+
+    def __len__(self) -> int:
+        return len(self.date)
+
+    def __getitem__(self, index: slice) -> "PeriodBars":
+        """按位置切片，返回视图"""
+        if not isinstance(index, slice):
+            raise TypeError("PeriodBars 只支持切片访问")
+        return replace(self, **{name: getattr(self, name)[index] for name in PERIOD_BAR_FIELDS})
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """返回字段名到数组的映射"""
+        return {name: getattr(self, name) for name in PERIOD_BAR_FIELDS}
+
+    def slice_dates(self, start_date: Optional[Date] = None, end_date: Optional[Date] = None) -> "PeriodBars":
+        """
+        按周期结束日期的闭区间 [start_date, end_date] 切片，返回共享缓冲区的视图
+        """
+        lo = 0 if start_date is None else int(np.searchsorted(self.date, np.datetime64(start_date, "D"), side="left"))
+        hi = len(self) if end_date is None else int(np.searchsorted(self.date, np.datetime64(end_date, "D"), side="right"))
+        return self[lo:hi]
+
+    def last_period_open(self, today: Date) -> bool:
+        """最后一根K线所在周期是否尚未结束：交易日历上该周期还有今天或之后、尚未入库的交易日"""
+        if not len(self):
+            return False
+        period_end = self.date[-1]
+        return bool(self.last_date[-1] < period_end and np.datetime64(today, "D") <= period_end)
+
+    def to_qfq(self) -> "PeriodBars":
+        """
+        由后复权K线换算前复权K线。同一时点的前、后复权因子之比在全部历史上相同，
+        而开高低收的取首、取大、取小、取尾与正数缩放可交换，因此整段乘以 qfq_scale 即可
+        """
+        if self.adjust != "hfq":
+            raise ValueError(f"只能由后复权K线换算前复权K线，当前为 {self.adjust}")
+        prices = np.round(np.vstack([getattr(self, name) for name in ADJUSTED_PRICE_FIELDS]) * self.qfq_scale, DAILY_BAR_SCALES["close"])
+        return replace(self, adjust="qfq", **dict(zip(ADJUSTED_PRICE_FIELDS, prices)))
+
+    def to_response(self, today: Date) -> StockPeriodResponse:
+        """转换为逐行的 StockPeriodResponse，数值按日线精度还原为 Decimal"""
+        values = {name: getattr(self, name).tolist() for name in ("date", "first_date", "last_date", "vol", "trade_days")}
+        for name in ("open", "high", "low", "close", "pct_chg", "amount"):
+            values[name] = [Decimal(text) for text in np.char.mod(f"%.{DAILY_BAR_SCALES[name]}f", getattr(self, name)).tolist()]
+        bars = [
+            StockPeriodResponseItem.model_construct(**dict(zip(PERIOD_BAR_FIELDS, row)))
+            for row in zip(*(values[name] for name in PERIOD_BAR_FIELDS))
+        ]
+        return StockPeriodResponse(
+            stock_code=self.stock_code,
+            period=self.period,
+            adjust=self.adjust,
+            data_count=len(bars),
+            last_period_open=self.last_period_open(today),
+            bars=bars
+        )
@@ -1,13 +1,38 @@
 from pydantic import BaseModel, Field
 from datetime import date as Date
 from decimal import Decimal
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
+
+# 复权方式：不复权、前复权、后复权
+DailyAdjust = Literal["none", "qfq", "hfq"]
+# 降采样方法：LTTB 保留收盘价曲线形状，OHLC 按桶聚合
+DownsampleMethod = Literal["lttb", "ohlc"]
+# 降采样后的K线数量范围
+MIN_CHART_POINTS = 3
+MAX_CHART_POINTS = 10_000
 
 # 股票日线数据请求模型
 class StockDailyRequest(BaseModel):
     stock_code: str = Field(..., description="股票代码")
     start_date: Optional[Date] = Field(None, description="起始日期")
     end_date: Optional[Date] = Field(None, description="结束日期")
+    adjust: DailyAdjust = Field("none", description="复权方式：none 不复权，qfq 前复权，hfq 后复权")
+    max_points: Optional[int] = Field(None, ge=MIN_CHART_POINTS, le=MAX_CHART_POINTS, description="最多返回的K线数量，超过时按 downsample 指定的方法降采样，用于绘图")
+    downsample: DownsampleMethod = Field("lttb", description="降采样方法：lttb 按收盘价保留形状关键点，ohlc 按桶聚合开高低收")
+
+# 批量请求单次允许的最大股票数量
+MAX_BATCH_STOCK_CODES = 50
+
+# 股票日线数据批量请求模型
+class StockDailyBatchRequest(BaseModel):
+    stock_codes: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_STOCK_CODES, description="股票代码列表")
+    start_date: Optional[Date] = Field(None, description="起始日期")
+    end_date: Optional[Date] = Field(None, description="结束日期")
+    adjust: DailyAdjust = Field("none", description="复权方式：none 不复权，qfq 前复权，hfq 后复权")
+
+# 股票日线数据流式请求模型
+class StockDailyStreamRequest(StockDailyBatchRequest):
+    format: Literal["ndjson", "json"] = Field("ndjson", description="输出格式：ndjson 每行一条日线数据，json 为分块输出的单个 JSON 对象")
 
 # 股票日线数据基础模型
 class StockDailyBase(BaseModel):
@@ -43,4 +68,35 @@ class StockDailyResponse(BaseModel):
     data_count: int = Field(..., description="返回的日线数据数量")
     start_date: Date = Field(..., description="数据的起始日期")
     end_date: Date = Field(..., description="数据的结束日期")
-    daily: List[StockDailyResponseItem] = Field(..., description="日线数据列表")
\ No newline at end of file
+    adjust: DailyAdjust = Field("none", description="开高低收价格的复权方式")
+    daily: List[StockDailyResponseItem] = Field(..., description="日线数据列表")
+
+# 股票日线数据批量响应模型
+class StockDailyBatchResponse(BaseModel):
+    data: Dict[str, Optional[StockDailyResponse]] = Field(..., description="按股票代码组织的日线数据，无数据时为 null")
+    errors: Dict[str, str] = Field(default_factory=dict, description="获取失败的股票代码及错误信息")
+
+# 股票日线数据增量同步请求模型
+class StockDailyDeltaRequest(BaseModel):
+    stock_code: str = Field(..., description="股票代码")
+    since_date: Date = Field(..., description="客户端已有数据的最新日期，只返回该日期之后的日线")
+    data_version: int = Field(..., ge=0, description="客户端数据对应的数据版本，未知时传 0")
+    adjust: DailyAdjust = Field("none", description="复权方式：none 不复权，qfq 前复权，hfq 后复权")
+
+# 股票日线数据增量同步响应模型
+class StockDailyDeltaResponse(BaseModel):
+    stock_code: str = Field(..., description="股票代码")
+    data_version: int = Field(..., description="服务端当前的数据版本")
+    last_date: Date = Field(..., description="服务端已有日线的最新日期")
+    full_refresh: bool = Field(..., description="为 true 时客户端的数据版本已过期（如除权除息后复权因子改变），需要重新全量获取，此时不返回日线")
+    daily: Optional[StockDailyResponse] = Field(None, description="since_date 之后的日线数据，没有新数据时为 null")
+
+# 股票日线数据入库校验汇总模型
+class StockDailyIngestSummary(BaseModel):
+    stock_code: str = Field(..., description="股票代码")
+    total: int = Field(..., description="待校验的日线数据数量")
+    accepted: int = Field(..., description="通过校验的数量")
+    rejected: int = Field(..., description="未通过校验的数量")
+    reasons: Dict[str, int] = Field(default_factory=dict, description="各校验规则拒绝的数量")
+    anomalies: Dict[str, int] = Field(default_factory=dict, description="存在异常但照常入库的数量，如开高低收不一致、成交量为负")
+    rejected_dates: List[Date] = Field(default_factory=list, description="被拒绝的部分交易日期（最多保留前 20 个）")
@@ -0,0 +1,37 @@
+from pydantic import BaseModel, Field
+from datetime import date as Date
+from typing import Dict, List, Literal, Optional
+from app.schemas.stock_daily import DailyAdjust, MAX_BATCH_STOCK_CODES
+from app.utils.indicator_utils import DEFAULT_INDICATORS
+
+# 技术指标请求模型
+class StockIndicatorRequest(BaseModel):
+    stock_code: str = Field(..., description="股票代码")
+    indicators: List[str] = Field(default_factory=lambda: list(DEFAULT_INDICATORS), min_length=1, description="指标名称，如 ma20、ema12、macd、macd_12_26_9、rsi14、boll20")
+    start_date: Optional[Date] = Field(None, description="起始日期，指标仍基于起始日期之前的完整历史计算")
+    end_date: Optional[Date] = Field(None, description="结束日期")
+    adjust: DailyAdjust = Field("qfq", description="计算所用价格的复权方式，默认前复权")
+
+# 技术指标响应模型，指标值按日期对齐，预热期内为 null
+class StockIndicatorResponse(BaseModel):
+    stock_code: str = Field(..., description="股票代码")
+    adjust: DailyAdjust = Field(..., description="计算所用价格的复权方式")
+    data_count: int = Field(..., description="返回的日期数量")
+    dates: List[Date] = Field(..., description="交易日期")
+    indicators: Dict[str, Dict[str, List[Optional[float]]]] = Field(..., description="指标名称到各输出列的映射")
+
+# 最新技术指标批量请求模型
+class StockIndicatorLatestRequest(BaseModel):
+    stock_codes: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_STOCK_CODES, description="股票代码列表")
+    indicators: List[str] = Field(default_factory=lambda: list(DEFAULT_INDICATORS), min_length=1, description="指标名称")
+    adjust: Literal["qfq", "hfq"] = Field("qfq", description="复权方式")
+
+# 单只股票的最新技术指标
+class StockIndicatorLatestItem(BaseModel):
+    date: Date = Field(..., description="最后一根K线的日期")
+    indicators: Dict[str, Dict[str, Optional[float]]] = Field(..., description="指标名称到各输出值的映射")
+
+# 最新技术指标批量响应模型
+class StockIndicatorLatestResponse(BaseModel):
+    data: Dict[str, Optional[StockIndicatorLatestItem]] = Field(..., description="按股票代码组织的最新指标")
+    errors: Dict[str, str] = Field(default_factory=dict, description="获取失败的股票代码及错误信息")
@@ -0,0 +1,39 @@
+from pydantic import BaseModel, Field
+from datetime import date as Date
+from decimal import Decimal
+from typing import List, Literal, Optional
+from app.schemas.stock_daily import DailyAdjust
+
+# K 线周期：周线、月线、季线
+BarPeriod = Literal["week", "month", "quarter"]
+
+# 周期K线请求模型
+class StockPeriodRequest(BaseModel):
+    stock_code: str = Field(..., description="股票代码")
+    period: BarPeriod = Field(..., description="K线周期：week 周线，month 月线，quarter 季线")
+    start_date: Optional[Date] = Field(None, description="起始日期，按周期结束日期筛选")
+    end_date: Optional[Date] = Field(None, description="结束日期，按周期结束日期筛选")
+    adjust: DailyAdjust = Field("none", description="复权方式：none 不复权，qfq 前复权，hfq 后复权")
+
+# 单根周期K线
+class StockPeriodResponseItem(BaseModel):
+    date: Date = Field(..., description="周期的最后一个交易日（按交易日历对齐）")
+    first_date: Date = Field(..., description="周期内第一根日线的日期")
+    last_date: Date = Field(..., description="周期内最后一根日线的日期")
+    open: Decimal = Field(..., description="开盘价")
+    high: Decimal = Field(..., description="最高价")
+    low: Decimal = Field(..., description="最低价")
+    close: Decimal = Field(..., description="收盘价")
+    pct_chg: Decimal = Field(..., description="周期涨跌幅（%），由日涨跌幅复合计算")
+    vol: int = Field(..., description="成交量")
+    amount: Decimal = Field(..., description="成交额")
+    trade_days: int = Field(..., description="周期内的日线数量")
+
+# 周期K线响应模型
+class StockPeriodResponse(BaseModel):
+    stock_code: str = Field(..., description="股票代码")
+    period: BarPeriod = Field(..., description="K线周期")
+    adjust: DailyAdjust = Field(..., description="复权方式")
+    data_count: int = Field(..., description="周期K线数量")
+    last_period_open: bool = Field(..., description="最后一根K线所在周期是否尚未结束")
+    bars: List[StockPeriodResponseItem] = Field(..., description="周期K线，按日期升序")
@@ -0,0 +1,73 @@
+import asyncio
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from loguru import logger
+from app.core.database import AsyncSessionLocal
+from app.repositories.user_repository import UserRepository
+
+class LastLoginRecorder:
+    """
+    最后登录时间的异步批量写入器
+
+    - 登录时只在内存中记录，同一用户在一个周期内的多次登录合并为最后一次
+    - 后台任务每隔 flush_interval 秒用一条多行 UPDATE 写入数据库，登录请求不再等待提交
+    - 写入失败时把记录放回待写入集合，下个周期重试；关闭时写入剩余记录
+    """
+    def __init__(self, flush_interval: float = 5.0):
+        self._flush_interval = flush_interval
+        # 用户 ID -> (用户名, 最后登录时间)
+        self._pending: Dict[int, Tuple[str, datetime]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    def record(self, user_id: int, username: str, login_time: datetime) -> None:
+        """记录一次登录，在当前事件循环中按需启动后台写入任务"""
+        previous = self._pending.get(user_id)
+        if previous is None or previous[1] < login_time:
+            self._pending[user_id] = (username, login_time)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            # 关闭时取消的是等待，正在进行的写入仍会完成
+            await asyncio.shield(self.flush())
+
+    async def flush(self) -> int:
+        """
+        把待写入的最后登录时间一次性写入数据库，并使对应用户的资料缓存失效
+        :return: 更新的行数
+        """
+        from app.services.user_service import UserService
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            try:
+                async with AsyncSessionLocal() as session:
+                    updated = await UserRepository(session).update_last_login_batch(
+                        {user_id: login_time for user_id, (_, login_time) in batch.items()}
+                    )
+            except Exception as e:
+                # 合并回待写入集合，保留每个用户较新的登录时间
+                for user_id, entry in batch.items():
+                    current = self._pending.get(user_id)
+                    if current is None or current[1] < entry[1]:
+                        self._pending[user_id] = entry
+                logger.error(f"批量写入 {len(batch)} 个用户的最后登录时间失败，下个周期重试: {e}")
+                return 0
+            for username, _ in batch.values():
+                await UserService.invalidate_profile_cache(username)
+            logger.info(f"批量写入 {len(batch)} 个用户的最后登录时间，更新 {updated} 行")
+            return updated
+
+    async def stop(self) -> None:
+        """停止后台写入任务并写入剩余记录"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+last_login_recorder = LastLoginRecorder()
@@ -0,0 +1,279 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+from loguru import logger
+from app.config.scheduler import scheduler_settings
+from app.core.cache_utlis import invalidate_cache_scopes
+from app.core.database import AsyncSessionLocal
+from app.core.leader_election import scheduler_leader
+from app.models.job_history_orm import JobHistoryOrm
+from app.repositories.job_history_repository import JobHistoryRepository
+from app.repositories.stock_daily_repository import StockDailyRepository
+from app.repositories.trade_calendar_repository import TradeCalendarRepository
+from app.services.stock_daily_service import StockDailyService
+from app.services.stock_indicator_service import StockIndicatorService
+from app.services.trade_calendar_service import TradeCalendarService, EXCHANGE_CODES
+from app.utils.stock_utlis import get_stock_exchange_code
+
+# 各阶段按顺序执行，前一阶段失败或判断为非交易日时后续阶段跳过
+STAGES = ("calendar", "daily_sync", "cache_invalidation", "warm_up")
+# 按交易所、按股票缓存的方法，新交易日入库后对应范围内的缓存全部失效
+CALENDAR_CACHED_METHODS = (
+    StockDailyService._get_full_trade_calendar,
+    TradeCalendarService.get_trade_calendar_data,
+    TradeCalendarService.get_latest_trading_day_data,
+)
+DAILY_CACHED_METHODS = (
+    StockDailyService.get_daily_bars,
+    StockDailyService.get_chart_bars,
+    StockIndicatorService.get_indicators,
+)
+
+class PostClosePipelineError(Exception):
+    """收盘后数据处理异常"""
+    pass
+
+class LeadershipLostError(PostClosePipelineError):
+    """执行过程中失去调度器主节点身份"""
+    pass
+
+@dataclass
+class PipelineContext:
+    """一次执行中各阶段之间传递的数据"""
+    trade_date: date
+    latest_trade_dates: Dict[str, date] = field(default_factory=dict)
+    synced_codes: List[str] = field(default_factory=list)
+
+    @property
+    def is_trade_day(self) -> bool:
+        return self.latest_trade_dates.get(scheduler_settings.POST_CLOSE_CALENDAR_EXCHANGE) == self.trade_date
+
+class PostClosePipeline:
+    """
+    收盘后数据处理：刷新交易日历 -> 增量同步日线 -> 失效相关缓存 -> 预热缓存
+
+    - 刷新日历后按最新交易日判断当天是否为交易日，非交易日跳过后续阶段
+    - 每个阶段开始前确认本进程仍是调度器主节点，失去主节点身份时中止
+    - 同一交易日已成功执行过时不再执行，主节点切换后不会重复同步
+    - 每次执行写入 job_history，各阶段的耗时另在进程内汇总
+    """
+    JOB_NAME = "post_close"
+
+    def __init__(self, is_leader: Callable[[], bool] = lambda: scheduler_leader.is_leader):
+        self._is_leader = is_leader
+        self._stages: List[Tuple[str, Callable[[PipelineContext], Awaitable[dict]]]] = [
+            ("calendar", self._refresh_calendar),
+            ("daily_sync", self._sync_daily),
+            ("cache_invalidation", self._invalidate_caches),
+            ("warm_up", self._warm_up),
+        ]
+        self._stage_stats = {
+            name: {"runs": 0, "failures": 0, "last_ms": None, "max_ms": 0.0, "total_ms": 0.0}
+            for name in STAGES
+        }
+        self._run_counts: Dict[str, int] = {}
+        self._last_run: Optional[dict] = None
+
+    async def run(self, trade_date: Optional[date] = None) -> dict:
+        """
+        执行一次收盘后数据处理
+        :param trade_date: 要处理的交易日，缺省为交易所时区的今天
+        :return: 执行结果，包括状态与各阶段的耗时
+        """
+        trade_date = trade_date or datetime.now(ZoneInfo(scheduler_settings.SCHEDULER_TIMEZONE)).date()
+        if await self._already_succeeded(trade_date):
+            logger.info(f"{trade_date} 的收盘后数据处理已成功执行过，跳过")
+            return {"trade_date": trade_date.isoformat(), "status": "skipped", "stages": []}
+        started_at = datetime.now()
+        started = time.perf_counter()
+        run_id = await self._record_start(trade_date, started_at)
+        context = PipelineContext(trade_date)
+        status, error, stages = "success", None, []
+        for name, stage in self._stages:
+            if status != "success":
+                stages.append({"name": name, "status": "skipped"})
+                continue
+            stage_started = time.perf_counter()
+            try:
+                self._ensure_leader()
+                detail = await stage(context)
+            except LeadershipLostError as e:
+                status, error = "aborted", str(e)
+                stages.append({"name": name, "status": "aborted"})
+                logger.warning(f"收盘后数据处理在 {name} 阶段中止: {e}")
+                continue
+            except Exception as e:
+                duration_ms = self._observe(name, stage_started, failed=True)
+                status, error = "failed", f"{name}: {e}"
+                stages.append({"name": name, "status": "failed", "duration_ms": duration_ms})
+                logger.error(f"收盘后数据处理的 {name} 阶段失败: {e}")
+                continue
+            duration_ms = self._observe(name, stage_started)
+            stages.append({"name": name, "status": "success", "duration_ms": duration_ms, **detail})
+            logger.info(f"收盘后数据处理的 {name} 阶段完成，耗时 {duration_ms:.0f} ms: {detail}")
+            if name == "calendar" and not context.is_trade_day:
+                logger.info(f"{trade_date} 不是交易日，跳过日线同步与缓存处理")
+                status = "skipped"
+        duration_ms = round((time.perf_counter() - started) * 1e3, 1)
+        result = {"trade_date": trade_date.isoformat(), "status": status, "duration_ms": duration_ms, "stages": stages, "error": error}
+        self._run_counts[status] = self._run_counts.get(status, 0) + 1
+        self._last_run = {**result, "started_at": started_at.isoformat(timespec="seconds")}
+        await self._record_finish(run_id, result)
+        logger.info(f"{trade_date} 的收盘后数据处理结束，状态 {status}，耗时 {duration_ms:.0f} ms")
+        return result
+
+    def _ensure_leader(self) -> None:
+        if not self._is_leader():
+            raise LeadershipLostError("本进程已不是调度器主节点")
+
+    def _observe(self, name: str, started: float, failed: bool = False) -> float:
+        """记录阶段耗时，返回耗时（毫秒）"""
+        duration_ms = round((time.perf_counter() - started) * 1e3, 1)
+        stats = self._stage_stats[name]
+        stats["runs"] += 1
+        stats["failures"] += int(failed)
+        stats["last_ms"] = duration_ms
+        stats["max_ms"] = max(stats["max_ms"], duration_ms)
+        stats["total_ms"] += duration_ms
+        return duration_ms
+
+    async def _refresh_calendar(self, context: PipelineContext) -> dict:
+        """刷新全部交易所的交易日历并读取各交易所的最新交易日"""
+        async with AsyncSessionLocal() as session:
+            await TradeCalendarService(session).refresh_all_exchange_calendars()
+            repository = TradeCalendarRepository(session)
+            for exchange_code in EXCHANGE_CODES:
+                latest_day = await repository.get_latest_trade_day(exchange_code)
+                if latest_day is not None:
+                    context.latest_trade_dates[exchange_code] = latest_day.trade_date
+        return {
+            "latest_trade_dates": {code: day.isoformat() for code, day in context.latest_trade_dates.items()},
+            "trade_day": context.is_trade_day,
+        }
+
+    async def _sync_daily(self, context: PipelineContext) -> dict:
+        """
+        同步已入库日线不晚于所属交易所最新交易日的股票：补齐新日线，并核对改写最新一根日线，
+        单只股票失败不影响其他股票
+        """
+        async with AsyncSessionLocal() as session:
+            stock_codes = await StockDailyRepository(session).find_codes_with_last_date_through(max(context.latest_trade_dates.values()))
+        semaphore = asyncio.Semaphore(scheduler_settings.POST_CLOSE_SYNC_CONCURRENCY)
+        failed = 0
+
+        async def sync(stock_code: str) -> None:
+            nonlocal failed
+            async with semaphore:
+                self._ensure_leader()
+                try:
+                    latest_trade_date = context.latest_trade_dates.get(get_stock_exchange_code(stock_code))
+                    if latest_trade_date is None:
+                        return
+                    async with AsyncSessionLocal() as session:
+                        if await StockDailyService(session).sync_latest_bars(stock_code, latest_trade_date):
+                            context.synced_codes.append(stock_code)
+                except Exception as e:
+                    failed += 1
+                    logger.error(f"同步股票 {stock_code} 的日线数据失败: {e}")
+
+        results = await asyncio.gather(*(sync(stock_code) for stock_code in stock_codes), return_exceptions=True)
+        # 等待已开始的同步完成后再中止，不留下仍在写入的任务
+        for result in results:
+            if isinstance(result, LeadershipLostError):
+                raise result
+        return {"candidates": len(stock_codes), "synced": len(context.synced_codes), "failed": failed}
+
+    async def _invalidate_caches(self, context: PipelineContext) -> dict:
+        """
+        按范围失效内容可能随新交易日变化的缓存：各交易所的交易日历与最新交易日，
+        以及已同步股票的日线、绘图日线与技术指标，不论缓存的日期范围、复权方式等其他参数。
+        结束日期早于新交易日的缓存内容其实不变，也一并删除，由之后的请求重新读取
+        """
+        deleted = 0
+        for method in CALENDAR_CACHED_METHODS:
+            deleted += await invalidate_cache_scopes(method, context.latest_trade_dates)
+        for method in DAILY_CACHED_METHODS:
+            deleted += await invalidate_cache_scopes(method, context.synced_codes)
+        return {"deleted": deleted}
+
+    async def _warm_up(self, context: PipelineContext) -> dict:
+        """预先读取交易日历与已同步股票的全部历史日线，收盘后的第一批请求直接命中缓存"""
+        async with AsyncSessionLocal() as session:
+            calendar_service = TradeCalendarService(session)
+            daily_service = StockDailyService(session)
+            for exchange_code in context.latest_trade_dates:
+                await calendar_service.get_latest_trading_day_data(exchange_code)
+                await daily_service.get_trade_dates(exchange_code)
+        stock_codes = context.synced_codes[:scheduler_settings.POST_CLOSE_WARMUP_LIMIT]
+        semaphore = asyncio.Semaphore(scheduler_settings.POST_CLOSE_SYNC_CONCURRENCY)
+        failed = 0
+
+        async def warm(stock_code: str) -> None:
+            nonlocal failed
+            async with semaphore:
+                try:
+                    async with AsyncSessionLocal() as session:
+                        await StockDailyService(session).get_daily_bars(stock_code, None, None, "none")
+                except Exception as e:
+                    failed += 1
+                    logger.warning(f"预热股票 {stock_code} 的日线缓存失败: {e}")
+
+        await asyncio.gather(*(warm(stock_code) for stock_code in stock_codes))
+        return {"exchanges": len(context.latest_trade_dates), "stocks": len(stock_codes), "failed": failed}
+
+    async def _already_succeeded(self, trade_date: date) -> bool:
+        try:
+            async with AsyncSessionLocal() as session:
+                return await JobHistoryRepository(session).find_successful_run(self.JOB_NAME, trade_date) is not None
+        except Exception as e:
+            logger.warning(f"查询收盘后数据处理的执行记录失败，继续执行: {e}")
+            return False
+
+    async def _record_start(self, trade_date: date, started_at: datetime) -> Optional[int]:
+        """写入执行记录，失败时只记录日志，不影响任务执行"""
+        try:
+            async with AsyncSessionLocal() as session:
+                return await JobHistoryRepository(session).create_run(JobHistoryOrm(
+                    job_name=self.JOB_NAME,
+                    trade_date=trade_date,
+                    status="running",
+                    worker=scheduler_leader.stats()["token"],
+                    started_at=started_at,
+                ))
+        except Exception as e:
+            logger.error(f"写入收盘后数据处理的执行记录失败: {e}")
+            return None
+
+    async def _record_finish(self, run_id: Optional[int], result: dict) -> None:
+        if run_id is None:
+            return
+        try:
+            async with AsyncSessionLocal() as session:
+                await JobHistoryRepository(session).finish_run(run_id, {
+                    "status": result["status"],
+                    "finished_at": datetime.now(),
+                    "duration_ms": int(result["duration_ms"]),
+                    "stages": result["stages"],
+                    "error": result["error"],
+                })
+        except Exception as e:
+            logger.error(f"更新收盘后数据处理的执行记录失败: {e}")
+
+    def stats(self) -> dict:
+        """当前工作进程执行收盘后数据处理的统计，只有主节点上有数据"""
+        return {
+            "runs": dict(self._run_counts),
+            "last_run": self._last_run,
+            "stages": {
+                name: {
+                    **{key: round(value, 1) if isinstance(value, float) else value for key, value in stats.items()},
+                    "avg_ms": round(stats["total_ms"] / stats["runs"], 1) if stats["runs"] else None,
+                }
+                for name, stats in self._stage_stats.items()
+            },
+        }
+
+post_close_pipeline = PostClosePipeline()
@@ -1,19 +1,27 @@
-from typing import Optional, List
-from app.models.stock_daily_orm import StockDailyOrm
-from app.schemas.stock_daily import StockDailyItem
+import asyncio
+import json
+import numpy as np
+from typing import Optional, List, Dict, AsyncIterator, Literal
 from app.repositories.stock_daily_repository import StockDailyRepository, StockDailyRepositoryError
 from app.external.stock_daily import StockDailyClient
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import datetime, date
-from decimal import Decimal
+from datetime import datetime, date, timedelta
+from zoneinfo import ZoneInfo
 from app.external.exceptions import StockExternalDataError, StockExternalDataProcessingError
-from app.schemas.stock_daily import StockDailyResponse, StockDailyResponseItem
+from app.core.rate_limiter import RateLimitExceeded, acquire_upstream_budget
+from app.core.admission import AdmissionRejected, db_read_slot, upstream_slot
+from app.schemas.stock_daily import StockDailyResponse, StockDailyDeltaResponse, DailyAdjust, DownsampleMethod
+from app.schemas.daily_bars import DailyBars, DailyBarsBatch
+from app.utils.daily_encoding import encode_json_rows
+from app.utils.downsample_utils import DownsampleError, downsample_daily_bars
 from app.repositories.trade_calendar_repository import TradeCalendarRepository
 from loguru import logger
 from app.utils.stock_utlis import get_stock_exchange_code
-from app.core.cache_utlis import redis_cache
+from app.core.cache_utlis import redis_cache, set_resource_version
 from app.models.trade_calendar_orm import TradeCalendarOrm
-from app.utils.date_utlis import parse_date
+from app.models.stock_daily_meta_orm import StockDailyMetaOrm
+from app.core.database import AsyncSessionLocal
+from app.config.scheduler import scheduler_settings
 
 class StockDailyServiceError(Exception):
     """股票日线数据服务异常"""
@@ -21,91 +29,104 @@ class StockDailyServiceError(Exception):
 
 class StockDailyService:
     DATE_FORMAT = "%Y%m%d"
+    # 批量请求中并发补齐缺失数据的最大股票数
+    BATCH_FILL_CONCURRENCY = 4
+    # 流式输出时每次从游标读取并写出的行数
+    STREAM_CHUNK_ROWS = 500
+    # 镜像到 Redis 的日线版本的资源类型与有效期（秒），有效期限制了未入库的新日线被 304 掩盖的最长时间
+    VERSION_KIND = "stock_daily"
+    VERSION_TTL = 600
     def __init__(self, db_session: AsyncSession,calendar_repository: Optional[TradeCalendarRepository] = None):
+        self._db_session = db_session
         self._repository = StockDailyRepository(db_session)
         self._client = StockDailyClient()
         # 使用传入的交易日历仓储，如果没有则创建一个新的实例
         self._calendar_repository = calendar_repository or TradeCalendarRepository(db_session)
 
-    @redis_cache(ttl=3600)
-    async def get_daily_data(self,stock_code: str,start_date: Optional[str] = None,end_date: Optional[str] = None) -> StockDailyResponse:
+    @redis_cache(ttl=3600, scope="stock_code")
+    async def get_daily_bars(self,stock_code: str,start_date: Optional[str] = None,end_date: Optional[str] = None,adjust: DailyAdjust = "none") -> DailyBars:
         """
-        获取指定股票代码和日期范围的股票日线数据，并返回 StockDailyResponse 模型。
+        获取指定股票代码和日期范围的股票日线数据，以列式的 DailyBars 返回并缓存。
         如果数据库中没有完整的数据，则从外部接口获取并保存。
+        复权数据由同一区间的不复权缓存计算得到，并以包含复权方式的键单独缓存，重复请求无需再次计算。
         """
-        # 获取原始数据
-        raw_data = await self._get_raw_daily_data(stock_code, start_date, end_date)
-        # 将 ORM 模型转换为 StockDailyResponse 模型 
-        daily_data = self._convert_to_response(raw_data)
-        return daily_data
+        if adjust == "none":
+            return await self._get_raw_daily_bars(stock_code, start_date, end_date)
+        daily_bars = await self.get_daily_bars(stock_code, start_date, end_date, "none")
+        return self._adjust_bars(daily_bars, adjust)
+
+    @redis_cache(ttl=3600, scope="stock_code")
+    async def get_chart_bars(
+        self,
+        stock_code: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        adjust: DailyAdjust = "none",
+        max_points: int = 1000,
+        method: DownsampleMethod = "lttb"
+    ) -> DailyBars:
+        """
+        获取降采样到不超过 max_points 根的日线数据，用于绘图。
+        原始数据取自 get_daily_bars 的缓存，降采样结果按 (股票代码, 日期范围, 复权方式, max_points, 方法) 单独缓存。
+        """
+        daily_bars = await self.get_daily_bars(stock_code, start_date, end_date, adjust)
+        try:
+            chart_bars = downsample_daily_bars(daily_bars, max_points, method)
+        except DownsampleError as e:
+            logger.error(f"股票 {stock_code} 的日线数据降采样失败: {e}")
+            raise StockDailyServiceError(f"日线数据降采样失败: {e}") from e
+        logger.info(f"股票 {stock_code} 的日线数据按 {method} 降采样，{len(daily_bars)} 根降为 {len(chart_bars)} 根")
+        return chart_bars
+
+    async def get_daily_data(self,stock_code: str,start_date: Optional[str] = None,end_date: Optional[str] = None,adjust: DailyAdjust = "none") -> Optional[StockDailyResponse]:
+        """
+        获取指定股票代码和日期范围的股票日线数据，并返回逐行的 StockDailyResponse 模型。
+        """
+        daily_bars = await self.get_daily_bars(stock_code, start_date, end_date, adjust)
+        return daily_bars.to_response()
 
     @staticmethod
-    def _convert_to_response(stock_data: List[StockDailyOrm]) -> Optional[StockDailyResponse]:
-        """将 ORM 数据转换为 StockDailyResponse 格式"""
-        if not stock_data:
-            return None
-        sorted_data = sorted(stock_data, key=lambda x: x.date)
-        stock_code = sorted_data[0].stock_code
-        # 将 ORM 数据转换为 StockDailyResponseItem
-        daily_items = [
-            StockDailyResponseItem(
-                date=record.date,
-                open=record.open,
-                high=record.high,
-                low=record.low,
-                close=record.close,
-                change=record.change,
-                pct_chg=record.pct_chg,
-                vol=record.vol,
-                amount=record.amount,
-                qfq_factor=record.qfq_factor,
-                hfq_factor=record.hfq_factor
-            ) for record in sorted_data
-        ]
-        # 构建 StockDailyResponse
-        return StockDailyResponse(
-            stock_code=stock_code,
-            daily=daily_items,
-            data_count=len(daily_items),
-            start_date=sorted_data[0].date,
-            end_date=sorted_data[-1].date
-        )
-    
-    async def _get_raw_daily_data(
+    def _adjust_bars(daily_bars: DailyBars, adjust: DailyAdjust) -> DailyBars:
+        """计算复权价格，不支持的复权方式转换为服务异常"""
+        try:
+            return daily_bars.adjusted(adjust)
+        except ValueError as e:
+            logger.error(f"计算股票 {daily_bars.stock_code} 的复权价格失败: {e}")
+            raise StockDailyServiceError(f"计算复权价格失败: {e}") from e
+
+    async def _get_raw_daily_bars(
         self,
         stock_code: str,
         start_date: Optional[str] = None,
         end_date: Optional[str] = None
-    ) -> List[StockDailyOrm]:
+    ) -> DailyBars:
         """
         获取指定股票代码和日期范围的股票日线数据。
         如果数据库中没有完整的数据，则从外部接口获取并保存。
         """
         try:
-            # 查询数据库中的数据
-            existing_records = await self._repository.find_stock_daily(stock_code, start_date, end_date)
-            logger.info(f"查询数据库中的数据，股票代码: {stock_code}, 起始日期: {start_date}, 结束日期: {end_date}, 数据条数: {len(existing_records)}")
+            # 查询数据库中的数据，只在查询期间占用数据库读取名额，外部抓取不占用
+            async with db_read_slot():
+                existing_bars = await self._repository.find_daily_bars(stock_code, start_date, end_date)
+            logger.info(f"查询数据库中的数据，股票代码: {stock_code}, 起始日期: {start_date}, 结束日期: {end_date}, 数据条数: {len(existing_bars)}")
             # 如果数据不存在或有缺失，从外部接口获取并保存该股票从入市至今的数据
-            if not existing_records or await self._has_missing_dates(existing_records, start_date, end_date):
+            if not len(existing_bars) or await self._has_missing_dates(existing_bars, start_date, end_date):
                 logger.info(f"数据库中没有完整的数据，开始从外部接口获取数据，股票代码: {stock_code}, 起始日期: {start_date}, 结束日期: {end_date}")
-                # 从外部接口获取数据
-                stock_daily_items = await StockDailyClient.get_daily_items(stock_code)
-                
-                if not stock_daily_items:
-                    return []
+                # 每次外部抓取都扣减当前请求的 upstream 限流额度
+                await acquire_upstream_budget()
+                fetched_bars = await self._fetch_closed_bars(stock_code)
 
-                # 将 Pydantic 模型转换为 ORM 模型
-                orm_items = StockDailyService._daily_to_orm(stock_daily_items)
+                if not len(fetched_bars):
+                    return fetched_bars
 
-                # 保存到数据库
-                await self._repository.save_stock_daily(orm_items)
+                # 批量写入数据库并更新元数据，再增量更新技术指标的滚动状态与周期K线
+                await self._save_daily_bars(fetched_bars)
 
-                # 重新查询数据库以获取完整数据
-                existing_records = await self._repository.find_stock_daily(stock_code, start_date, end_date)
-                return existing_records
+                # 获取的是完整历史，直接按日期范围切片即可，无需重新查询数据库
+                return fetched_bars.slice_dates(self._to_date(start_date), self._to_date(end_date))
             else:
                 logger.info(f"数据库中已有完整的数据，直接返回数据，股票代码: {stock_code}, 起始日期: {start_date}, 结束日期: {end_date}")  
-                return existing_records
+                return existing_bars
         except StockDailyRepositoryError as e:
             logger.error(f"数据交互时候出现错误: {e}")
             raise StockDailyServiceError(f"数据交互时候出现错误，股票代码: {stock_code}, 错误: {e}") from e
@@ -115,13 +136,390 @@ class StockDailyService:
         except StockExternalDataProcessingError as e:
             logger.error(f"外部数据处理失败: {e}")
             raise StockDailyServiceError(f"外部数据处理失败，股票代码: {stock_code}, 错误: {e}") from e
-        except StockDailyServiceError as e:
+        except (StockDailyServiceError, RateLimitExceeded, AdmissionRejected) as e:
             raise e
         except Exception as e:
             logger.error(f"服务内部出现未知错误: {e}")
             raise StockDailyServiceError(f"服务内部出现未知错误，股票代码: {stock_code}, 错误: {e}") from e
     
-    @redis_cache(ttl=3600)
+    async def get_daily_data_batch(
+        self,
+        stock_codes: List[str],
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        adjust: DailyAdjust = "none"
+    ) -> DailyBarsBatch:
+        """
+        批量获取多只股票在同一日期范围内的日线数据，结果按股票代码组织。
+        使用一条 IN 查询读取全部股票并统一检查覆盖情况，只对有缺失的股票以有限并发从外部接口补齐。
+        """
+        stock_codes = list(dict.fromkeys(stock_codes))
+        errors: Dict[str, str] = {}
+        try:
+            async with db_read_slot():
+                bars_by_code = await self._repository.find_daily_bars_batch(stock_codes, start_date, end_date)
+            logger.info(f"批量查询数据库中的数据，股票数: {len(stock_codes)}, 起始日期: {start_date}, 结束日期: {end_date}, 数据条数: {sum(len(bars) for bars in bars_by_code.values())}")
+            dates_by_code = {stock_code: bars.date for stock_code, bars in bars_by_code.items()}
+            missing_codes = await self._find_codes_with_missing_dates(stock_codes, dates_by_code, start_date, end_date, errors)
+            if missing_codes:
+                logger.info(f"以下股票在数据库中没有完整的数据，开始从外部接口补齐: {missing_codes}")
+                await acquire_upstream_budget(len(missing_codes))
+                filled_bars = await self._fill_missing_stocks(missing_codes, errors)
+                for stock_code, bars in filled_bars.items():
+                    bars_by_code[stock_code] = bars.slice_dates(self._to_date(start_date), self._to_date(end_date))
+            return DailyBarsBatch(
+                bars={
+                    stock_code: self._adjust_bars(bars_by_code[stock_code], adjust) if len(bars_by_code.get(stock_code, ())) else None
+                    for stock_code in stock_codes
+                },
+                errors=errors
+            )
+        except StockDailyRepositoryError as e:
+            logger.error(f"批量获取日线数据时数据交互出现错误: {e}")
+            raise StockDailyServiceError(f"批量获取日线数据时数据交互出现错误: {e}") from e
+        except (StockDailyServiceError, RateLimitExceeded, AdmissionRejected) as e:
+            raise e
+        except Exception as e:
+            logger.error(f"批量获取日线数据时服务内部出现未知错误: {e}")
+            raise StockDailyServiceError(f"批量获取日线数据时服务内部出现未知错误: {e}") from e
+
+    async def prepare_daily_stream(
+        self,
+        stock_codes: List[str],
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> Dict[str, str]:
+        """
+        流式输出前的准备：只查询已有交易日期检查覆盖情况，并补齐有缺失的股票
+
+        Returns:
+            Dict[str, str]: 无法获取数据的股票代码及错误信息
+        """
+        stock_codes = list(dict.fromkeys(stock_codes))
+        errors: Dict[str, str] = {}
+        try:
+            async with db_read_slot():
+                dates_by_code = await self._repository.find_stock_daily_dates_batch(stock_codes, start_date, end_date)
+            missing_codes = await self._find_codes_with_missing_dates(stock_codes, dates_by_code, start_date, end_date, errors)
+            if missing_codes:
+                logger.info(f"以下股票在数据库中没有完整的数据，开始从外部接口补齐: {missing_codes}")
+                await acquire_upstream_budget(len(missing_codes))
+                await self._fill_missing_stocks(missing_codes, errors)
+            return errors
+        except StockDailyRepositoryError as e:
+            logger.error(f"准备流式日线数据时数据交互出现错误: {e}")
+            raise StockDailyServiceError(f"准备流式日线数据时数据交互出现错误: {e}") from e
+        except (StockDailyServiceError, RateLimitExceeded, AdmissionRejected) as e:
+            raise e
+        except Exception as e:
+            logger.error(f"准备流式日线数据时服务内部出现未知错误: {e}")
+            raise StockDailyServiceError(f"准备流式日线数据时服务内部出现未知错误: {e}") from e
+
+    @classmethod
+    async def stream_daily_data(
+        cls,
+        stock_codes: List[str],
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        errors: Optional[Dict[str, str]] = None,
+        media_format: Literal["ndjson", "json"] = "ndjson",
+        adjust: DailyAdjust = "none"
+    ) -> AsyncIterator[str]:
+        """
+        边读取边输出日线数据，每次写出一个游标分块，内存占用与查询范围长度无关。
+        请求级数据库会话在响应开始发送前就已释放，因此这里使用独立的会话，
+        并在读取期间持有数据库读取名额，名额不足时错误信息附带在数据流中。
+
+        - ndjson：每行一个 JSON 对象，先输出各股票的错误信息 {"stock_code", "error"}，再输出日线数据
+        - json：输出 {"errors": {...}, "daily": [...]} 形式的单个 JSON 对象
+        """
+        stock_codes = [stock_code for stock_code in dict.fromkeys(stock_codes) if stock_code not in (errors or {})]
+        is_ndjson = media_format == "ndjson"
+        if is_ndjson:
+            head = "".join(json.dumps({"stock_code": stock_code, "error": error}, ensure_ascii=False) + "\n" for stock_code, error in (errors or {}).items())
+            separator = "\n"
+        else:
+            head = f'{{"errors":{json.dumps(errors or {}, ensure_ascii=False)},"daily":['
+            separator = ","
+        if head:
+            yield head
+        row_count = 0
+        try:
+            async with db_read_slot(), AsyncSessionLocal() as session:
+                async for bars in StockDailyRepository(session).stream_daily_bars_batch(stock_codes, start_date, end_date, yield_per=cls.STREAM_CHUNK_ROWS):
+                    chunk = separator.join(encode_json_rows(cls._adjust_bars(bars, adjust)))
+                    if is_ndjson:
+                        yield chunk + separator
+                    else:
+                        yield chunk if row_count == 0 else separator + chunk
+                    row_count += len(bars)
+            logger.info(f"流式输出日线数据完成，股票数: {len(stock_codes)}, 数据条数: {row_count}")
+        except Exception as e:
+            # 响应头已经发出，只能在数据流中附带错误信息
+            logger.error(f"流式输出日线数据时出现错误: {e}")
+            if is_ndjson:
+                yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+            else:
+                yield f'],"error":{json.dumps(str(e), ensure_ascii=False)}}}'
+                return
+        if not is_ndjson:
+            yield "]}"
+
+    async def _find_codes_with_missing_dates(
+        self,
+        stock_codes: List[str],
+        dates_by_code: Dict[str, np.ndarray],
+        start_date: Optional[date],
+        end_date: Optional[date],
+        errors: Dict[str, str]
+    ) -> List[str]:
+        """
+        一次性检查多只股票在日期范围内的覆盖情况，每个交易所的交易日历只读取一次
+
+        Args:
+            dates_by_code (Dict[str, np.ndarray]): 数据库中各股票已有的交易日期（升序的 datetime64[D] 数组）
+
+        Returns:
+            List[str]: 有缺失日期（或完全没有数据）的股票代码
+        """
+        trade_dates_by_exchange: Dict[str, np.ndarray] = {}
+        missing_codes = []
+        for stock_code in stock_codes:
+            try:
+                exchange_code = get_stock_exchange_code(stock_code)
+            except ValueError as e:
+                errors[stock_code] = str(e)
+                continue
+            record_dates = dates_by_code.get(stock_code)
+            if record_dates is None or not len(record_dates):
+                missing_codes.append(stock_code)
+                continue
+            if exchange_code not in trade_dates_by_exchange:
+                trade_dates_by_exchange[exchange_code] = await self.get_trade_dates(exchange_code)
+            required_dates = self._required_trade_dates(trade_dates_by_exchange[exchange_code], record_dates, start_date, end_date)
+            if not np.isin(required_dates, record_dates, assume_unique=True).all():
+                missing_codes.append(stock_code)
+        return missing_codes
+
+    async def _fill_missing_stocks(self, stock_codes: List[str], errors: Dict[str, str]) -> Dict[str, DailyBars]:
+        """
+        以有限并发从外部接口获取多只股票的完整日线数据并保存。
+        外部获取并发进行，数据库写入共用同一个会话，因此串行执行。
+
+        Returns:
+            Dict[str, DailyBars]: 补齐成功的股票代码及其完整日线数据
+        """
+        semaphore = asyncio.Semaphore(self.BATCH_FILL_CONCURRENCY)
+        save_lock = asyncio.Lock()
+
+        async def fill(stock_code: str) -> Optional[DailyBars]:
+            async with semaphore:
+                try:
+                    fetched_bars = await self._fetch_closed_bars(stock_code)
+                    if not len(fetched_bars):
+                        errors[stock_code] = "外部接口没有返回有效的日线数据"
+                        return None
+                    async with save_lock:
+                        await self._save_daily_bars(fetched_bars)
+                    return fetched_bars
+                except Exception as e:
+                    logger.error(f"补齐股票 {stock_code} 的日线数据失败: {e}")
+                    errors[stock_code] = str(e)
+                    return None
+
+        results = await asyncio.gather(*(fill(stock_code) for stock_code in stock_codes))
+        return {bars.stock_code: bars for bars in results if bars is not None}
+
+    async def _fetch_closed_bars(self, stock_code: str) -> DailyBars:
+        """
+        从外部接口获取完整日线并按列校验，抓取占用单独的准入名额。
+        收盘前抓到的当天日线仍在变化，丢弃后再入库，留给收盘后的同步写入
+        """
+        async with upstream_slot():
+            fetched_bars, summary = await StockDailyClient.get_daily_bars(stock_code)
+        logger.info(f"股票 {stock_code} 日线数据校验完成，共 {summary.total} 条，通过 {summary.accepted} 条，拒绝 {summary.rejected} 条")
+        return fetched_bars.slice_dates(None, self._closed_session_cutoff())
+
+    @staticmethod
+    def _closed_session_cutoff() -> date:
+        """已收盘交易日的最晚日期：交易所时区的收盘时间之后为今天，之前为昨天"""
+        now = datetime.now(ZoneInfo(scheduler_settings.SCHEDULER_TIMEZONE))
+        if (now.hour, now.minute) >= (scheduler_settings.MARKET_CLOSE_HOUR, scheduler_settings.MARKET_CLOSE_MINUTE):
+            return now.date()
+        return now.date() - timedelta(days=1)
+
+    async def _save_daily_bars(self, fetched_bars: DailyBars, rewritten: bool = False) -> None:
+        """
+        保存外部接口获取的完整日线数据，元数据在同一事务中写入，之后更新派生数据
+        :param rewritten: 已入库的日线被改写，数据版本需要加一
+        """
+        async with db_read_slot():
+            previous_meta = await self._repository.find_daily_meta(fetched_bars.stock_code)
+            meta = self._daily_meta_row(previous_meta, fetched_bars, rewritten)
+            await self._repository.bulk_upsert_daily_bars(fetched_bars, meta)
+        await set_resource_version(self.VERSION_KIND, fetched_bars.stock_code, self.daily_version(meta["data_version"], meta["last_date"]), self.VERSION_TTL)
+        await self._on_bars_saved(fetched_bars)
+
+    @staticmethod
+    def _daily_meta_row(previous_meta: Optional[StockDailyMetaOrm], daily_bars: DailyBars, rewritten: bool = False) -> dict:
+        """
+        由完整日线计算元数据：上次记录的日期范围内的日期或复权因子发生变化、或调用方改写了已入库的日线时数据版本加一，
+        只追加新日线时版本不变
+        """
+        data_version = 1
+        if previous_meta is not None:
+            known_bars = daily_bars.slice_dates(None, previous_meta.last_date)
+            unchanged = (
+                not rewritten
+                and len(known_bars) == previous_meta.bar_count
+                and known_bars.factor_digest() == previous_meta.factor_digest
+            )
+            data_version = previous_meta.data_version + (0 if unchanged else 1)
+        return {
+            "stock_code": daily_bars.stock_code,
+            "first_date": daily_bars.start_date,
+            "last_date": daily_bars.end_date,
+            "bar_count": len(daily_bars),
+            "data_version": data_version,
+            "factor_digest": daily_bars.factor_digest(),
+        }
+
+    async def get_daily_meta(self, stock_code: str) -> Optional[StockDailyMetaOrm]:
+        """
+        读取日线元数据，已有元数据时只读不抓取，新日线由收盘后同步或区间查询的缺失补齐写入；
+        已有日线但缺少元数据的股票基于完整历史补建一次。
+        读取到的版本会镜像到 Redis 供条件请求使用，落后于最近一个已收盘交易日的版本不镜像，避免在补齐前被 304 固定
+        """
+        async with db_read_slot():
+            meta = await self._repository.find_daily_meta(stock_code)
+        if meta is None:
+            daily_bars = await self.get_daily_bars(stock_code, None, None, "none")
+            async with db_read_slot():
+                meta = await self._repository.find_daily_meta(stock_code)
+                if meta is None and len(daily_bars):
+                    await self._repository.upsert_daily_meta(self._daily_meta_row(None, daily_bars))
+                    meta = await self._repository.find_daily_meta(stock_code)
+        if meta is None:
+            return None
+        trade_dates = await self.get_trade_dates(get_stock_exchange_code(stock_code))
+        closed_index = int(np.searchsorted(trade_dates, np.datetime64(self._closed_session_cutoff(), "D"), side="right")) - 1
+        if closed_index >= 0 and np.datetime64(meta.last_date, "D") < trade_dates[closed_index]:
+            logger.warning(f"股票 {stock_code} 的日线元数据停留在 {meta.last_date}，落后于最近一个已收盘交易日 {trade_dates[closed_index]}")
+        else:
+            await set_resource_version(self.VERSION_KIND, stock_code, self.daily_version(meta.data_version, meta.last_date), self.VERSION_TTL)
+        return meta
+
+    async def sync_latest_bars(self, stock_code: str, latest_trade_date: date) -> bool:
+        """
+        收盘后增量同步：从外部接口获取并保存新日线，不经过响应缓存。
+        已入库的最新一根日线也重新核对，与收盘后的数据不一致（如盘中写入的未收盘日线）时一并改写并使数据版本加一。
+        响应缓存由调用方在同步完成后统一失效
+        :param latest_trade_date: 股票所属交易所的最新交易日
+        :return: 是否写入了新的或改写了已有的日线
+        """
+        try:
+            async with db_read_slot():
+                meta = await self._repository.find_daily_meta(stock_code)
+            if meta is None or meta.last_date > latest_trade_date:
+                return False
+            fetched_bars = await self._fetch_closed_bars(stock_code)
+            if not len(fetched_bars) or fetched_bars.end_date < meta.last_date:
+                return False
+            async with db_read_slot():
+                stored_last_bar = await self._repository.find_daily_bars(stock_code, meta.last_date, meta.last_date)
+            rewritten = not stored_last_bar.same_values(fetched_bars.slice_dates(meta.last_date, meta.last_date))
+            if fetched_bars.end_date == meta.last_date and not rewritten:
+                return False
+            if rewritten:
+                logger.info(f"股票 {stock_code} 已入库的 {meta.last_date} 日线与收盘后数据不一致，重新写入")
+            await self._save_daily_bars(fetched_bars, rewritten)
+            return True
+        except StockDailyRepositoryError as e:
+            raise StockDailyServiceError(f"同步日线数据时数据交互出现错误，股票代码: {stock_code}, 错误: {e}") from e
+        except (StockExternalDataError, StockExternalDataProcessingError) as e:
+            raise StockDailyServiceError(f"同步日线数据时外部数据获取失败，股票代码: {stock_code}, 错误: {e}") from e
+
+    @staticmethod
+    def daily_version(data_version: int, last_date: date) -> str:
+        """日线数据的版本标识：数据版本与最新日期，追加新日线或复权因子变化时都会改变"""
+        return f"{data_version}.{last_date:%Y%m%d}"
+
+    async def get_daily_delta(
+        self,
+        stock_code: str,
+        since_date: date,
+        data_version: int,
+        adjust: DailyAdjust = "none"
+    ) -> StockDailyDeltaResponse:
+        """
+        增量同步：客户端传入已有数据的最新日期与数据版本，只返回之后的新日线。
+        数据版本与服务端不一致（复权因子发生变化）时返回 full_refresh，由客户端重新全量获取。
+        依据 stock_daily_meta 中的覆盖范围与版本判断，不扫描历史日线。
+        """
+        try:
+            meta = await self.get_daily_meta(stock_code)
+        except StockDailyRepositoryError as e:
+            logger.error(f"读取股票 {stock_code} 的日线元数据失败: {e}")
+            raise StockDailyServiceError(f"读取日线元数据失败，股票代码: {stock_code}, 错误: {e}") from e
+        if meta is None:
+            raise StockDailyServiceError(f"股票 {stock_code} 没有日线数据")
+        full_refresh = data_version != meta.data_version
+        daily = None
+        if not full_refresh and since_date < meta.last_date:
+            # 结束日期取元数据中的最新日期，新日线入库后缓存键随之变化
+            daily_bars = await self.get_daily_bars(stock_code, since_date + timedelta(days=1), meta.last_date, adjust)
+            daily = daily_bars.to_response()
+        logger.info(f"股票 {stock_code} 增量同步：客户端版本 {data_version}，服务端版本 {meta.data_version}，"
+                    f"全量刷新 {full_refresh}，新日线 {daily.data_count if daily else 0} 条")
+        return StockDailyDeltaResponse(
+            stock_code=stock_code,
+            data_version=meta.data_version,
+            last_date=meta.last_date,
+            full_refresh=full_refresh,
+            daily=daily
+        )
+
+    async def _on_bars_saved(self, daily_bars: DailyBars) -> None:
+        """
+        日线数据入库后更新派生数据：技术指标的滚动状态与已缓存周期K线的当前周期，
+        失败时只记录日志，不影响日线数据的返回
+        """
+        # 延迟导入，指标服务与周期K线服务都依赖日线服务
+        from app.services.stock_indicator_service import StockIndicatorService
+        from app.services.stock_period_service import StockPeriodService
+        try:
+            await StockIndicatorService(self._db_session).apply_new_bars(daily_bars)
+        except Exception as e:
+            logger.error(f"更新股票 {daily_bars.stock_code} 的技术指标状态失败: {e}")
+        try:
+            await StockPeriodService(self._db_session, daily_service=self).apply_new_bars(daily_bars)
+        except Exception as e:
+            logger.error(f"更新股票 {daily_bars.stock_code} 的周期K线失败: {e}")
+
+    async def get_trade_dates(self, exchange_code: str) -> np.ndarray:
+        """获取交易所的全部交易日，返回升序的 datetime64[D] 数组"""
+        calendar_items = await self._get_full_trade_calendar(exchange_code=exchange_code)
+        return np.sort(np.array([item.trade_date for item in calendar_items], dtype="datetime64[D]"))
+
+    @classmethod
+    def _required_trade_dates(
+        cls,
+        trade_dates: np.ndarray,
+        record_dates: np.ndarray,
+        start_date: Optional[date],
+        end_date: Optional[date]
+    ) -> np.ndarray:
+        """
+        计算区间内应有的交易日：起始日期缺省时使用已有记录的最早日期，
+        结束日期缺省或晚于最近一个已收盘交易日时截止到该日，盘中的当天不算缺失
+        """
+        start_date, end_date = cls._to_date(start_date), cls._to_date(end_date)
+        cutoff = cls._closed_session_cutoff()
+        actual_start_date = np.datetime64(start_date, "D") if start_date is not None else record_dates[0]
+        actual_end_date = np.datetime64(min(end_date, cutoff) if end_date is not None else cutoff, "D")
+        return trade_dates[np.searchsorted(trade_dates, actual_start_date, side="left"):np.searchsorted(trade_dates, actual_end_date, side="right")]
+
+    @redis_cache(ttl=3600, scope="exchange_code")
     async def _get_full_trade_calendar(self,exchange_code: str) -> list[TradeCalendarOrm]:
         """
         获取并缓存某个交易所的完整交易日历（不限制日期范围）
@@ -131,13 +529,14 @@ class StockDailyService:
         Returns:
             list[TradeCalendarOrm]: 交易日历列表
         """
-        calendar_items = await self._calendar_repository.find_trade_calendar(exchange_code=exchange_code)
+        async with db_read_slot():
+            calendar_items = await self._calendar_repository.find_trade_calendar(exchange_code=exchange_code)
         
         return calendar_items
         
     async def _has_missing_dates(
         self,
-        stock_daily_records: List[StockDailyOrm],
+        daily_bars: DailyBars,
         start_date: Optional[date] = None,
         end_date: Optional[date] = None
     ) -> bool:
@@ -145,63 +544,37 @@ class StockDailyService:
         检查指定时间范围内的日线数据是否有缺失日期
 
         Args:
-            stock_daily_records (List[StockDailyOrm]): 数据库中已有的日线记录
+            daily_bars (DailyBars): 数据库中已有的日线数据
             start_date (Optional[date]): 起始日期，如果为None则使用记录中最早的日期
-            end_date (Optional[date]): 结束日期，如果为None则使用今天的日期
+            end_date (Optional[date]): 结束日期，如果为None则使用最近一个已收盘交易日
 
         Returns:
             bool: 是否有缺失日期，True表示有缺失，False表示数据完整
         """
         try:
-            if not stock_daily_records:
+            if not len(daily_bars):
                 logger.warning("未找到任何日线记录，数据不完整")
                 return False
-            stock_code= stock_daily_records[0].stock_code
-            exchange_code=get_stock_exchange_code(stock_code)
-            # 设置日期范围
-            sorted_records = sorted(stock_daily_records, key=lambda x: x.date)
-            actual_start_date = start_date if start_date is not None else sorted_records[0].date
-            actual_end_date = end_date if end_date is not None else datetime.now().date()
-            if isinstance(actual_start_date, datetime):
-                actual_start_date = actual_start_date.date()
-            if isinstance(actual_end_date, datetime):
-                actual_end_date = actual_end_date.date()
+            stock_code = daily_bars.stock_code
+            exchange_code = get_stock_exchange_code(stock_code)
             # 从交易日历仓储获取应有的交易日
-            calendar_items = await self._get_full_trade_calendar(exchange_code=exchange_code)
-            trade_dates_required = {
-                item.trade_date for item in calendar_items
-                if actual_start_date <= item.trade_date <= actual_end_date
-            }
-            logger.debug(f"区间 {actual_start_date} 至 {actual_end_date} 应有交易日数量: {len(trade_dates_required)}")
-
-            # 获取已有日线数据的日期
-            record_dates = {record.date for record in stock_daily_records}
-            logger.debug(f"已有日线记录日期数: {len(record_dates)}")
+            trade_dates = await self.get_trade_dates(exchange_code)
+            trade_dates_required = self._required_trade_dates(trade_dates, daily_bars.date, start_date, end_date)
+            logger.debug(f"区间内应有交易日数量: {len(trade_dates_required)}, 已有日线记录日期数: {len(daily_bars)}")
 
             # 判断是否覆盖所有交易日
-            missing_dates = trade_dates_required - record_dates
-            if missing_dates:
-                logger.warning(f"存在缺失的交易日: {sorted(missing_dates)}")
+            missing_dates = trade_dates_required[~np.isin(trade_dates_required, daily_bars.date, assume_unique=True)]
+            if len(missing_dates):
+                logger.warning(f"存在 {len(missing_dates)} 个缺失的交易日，最早: {missing_dates[0]}, 最晚: {missing_dates[-1]}")
                 return True
             else:
-                logger.info(f"所有交易日均已覆盖，股票代码: {stock_code}, 起始日期: {actual_start_date}, 结束日期: {actual_end_date}")
+                logger.info(f"所有交易日均已覆盖，股票代码: {stock_code}, 起始日期: {start_date}, 结束日期: {end_date}")
                 return False
         except Exception as e:
             logger.error(f"检查日线数据完整性时出错: {e}")
             raise StockDailyServiceError(f"检查数据完整性失败: {e}") from e
 
     
-    @staticmethod
-    def _daily_to_orm(daily_items: list[StockDailyItem]) -> list[StockDailyOrm]:
-        """
-        将 Pydantic 模型列表转换为 ORM 模型列表
-        """
-        try:
-            return [daily_item.to_orm() for daily_item in daily_items]
-        except Exception as e:
-            logger.error(f"转换数据模型时发生错误: {e}")
-            raise StockDailyServiceError(f"转换数据模型时发生错误: {e}") from e
-    
     @classmethod
     def _parse_date(cls, date_str: Optional[str]) -> Optional[date]:
         """解析日期字符串"""
@@ -213,15 +586,16 @@ class StockDailyService:
             logger.error(f"日期格式错误: {date_str}，应为YYYYMMDD格式")
             raise StockDailyServiceError(f"日期格式错误: {date_str}，应为YYYYMMDD格式") from e
         
-    @staticmethod
-    def _convert_decimal(value):
-        try:
-            if isinstance(value, Decimal):
-                return float(value)  
+    @classmethod
+    def _to_date(cls, value) -> Optional[date]:
+        """将 date、datetime 或 YYYYMMDD 字符串统一转换为 date"""
+        if not value:
+            return None
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
             return value
-        except Exception as e:
-            logger.error(f"转换数据时发生错误: {e}")
-            raise StockDailyServiceError(f"转换数据时发生错误: {e}") from e
+        return cls._parse_date(value)
 
 if __name__ == "__main__":
     import asyncio
@@ -236,10 +610,9 @@ if __name__ == "__main__":
                 stock_code = "000001"
                 start_date = "20220101"
                 end_date = "20221001"
-                stock_data = await service._get_raw_daily_data(stock_code, start_date, end_date)
-                logger.info(f"已找到股票代码为{stock_code}的 {len(stock_data)} 条数据")
-                for record in stock_data:
-                    logger.info(record)
+                daily_bars = await service._get_raw_daily_bars(stock_code, start_date, end_date)
+                logger.info(f"已找到股票代码为{stock_code}的 {len(daily_bars)} 条数据")
+                logger.info(daily_bars.columns())
                 break
         except Exception as e:
             logger.error(f"获取股票数据时发生错误: {e}")
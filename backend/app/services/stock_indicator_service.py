@@ -0,0 +1,232 @@
+import math
+import numpy as np
+from datetime import date
+from typing import Dict, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+from app.core.admission import db_read_slot
+from app.core.cache_utlis import redis_cache
+from app.core.lazy_import import import_module_async
+from app.models.stock_indicator_state_orm import StockIndicatorStateOrm
+from app.repositories.stock_indicator_repository import StockIndicatorRepository, StockIndicatorRepositoryError
+from app.schemas.daily_bars import DailyBars
+from app.schemas.stock_daily import DailyAdjust
+from app.schemas.stock_indicator import StockIndicatorResponse, StockIndicatorLatestItem, StockIndicatorLatestResponse
+from app.utils.indicator_utils import (
+    DEFAULT_INDICATORS, IndicatorError, IndicatorSpec, compute_indicator, parse_indicator, update_indicator
+)
+
+class StockIndicatorServiceError(Exception):
+    """技术指标服务异常"""
+    pass
+
+class StockIndicatorService:
+    """
+    技术指标服务
+
+    - 区间指标：基于缓存的日线数据整段向量化计算，结果按请求参数缓存
+    - 滚动状态：每只股票每个指标保存一份基于后复权收盘价的滚动状态，新 K 线入库时以 O(1) 增量更新，
+      最新指标直接读取状态，前复权值按最后一根 K 线的复权因子之比换算
+    """
+    # 新增 K 线超过该数量时直接整段重算状态
+    MAX_INCREMENTAL_BARS = 60
+    # 返回值保留的小数位数
+    VALUE_DECIMALS = 4
+
+    def __init__(self, db_session: AsyncSession):
+        self._db_session = db_session
+        self._repository = StockIndicatorRepository(db_session)
+
+    @staticmethod
+    def _parse_specs(indicators: List[str]) -> List[IndicatorSpec]:
+        """解析并去重指标名称"""
+        try:
+            specs = {}
+            for name in indicators:
+                spec = parse_indicator(name)
+                specs[spec.name] = spec
+            return list(specs.values())
+        except IndicatorError as e:
+            raise StockIndicatorServiceError(str(e)) from e
+
+    @classmethod
+    def _to_float(cls, value: float) -> Optional[float]:
+        return None if math.isnan(value) else round(value, cls.VALUE_DECIMALS)
+
+    @redis_cache(ttl=3600, scope="stock_code")
+    async def get_indicators(
+        self,
+        stock_code: str,
+        indicators: List[str],
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        adjust: DailyAdjust = "qfq"
+    ) -> StockIndicatorResponse:
+        """
+        计算指定区间的技术指标。指标基于截至结束日期的完整历史计算，再截取到起始日期之后，
+        因此区间开头的指标值不受预热期影响。
+        """
+        specs = self._parse_specs(indicators)
+        # 延迟导入，避免与日线服务在入库后更新指标状态时形成循环导入
+        from app.services.stock_daily_service import StockDailyService, StockDailyServiceError
+        try:
+            daily_bars = await StockDailyService(self._db_session).get_daily_bars(stock_code, None, end_date, adjust)
+        except StockDailyServiceError as e:
+            logger.error(f"计算技术指标时获取日线数据失败: {e}")
+            raise StockIndicatorServiceError(f"计算技术指标时获取日线数据失败: {e}") from e
+        start = 0 if start_date is None else int(np.searchsorted(daily_bars.date, np.datetime64(start_date, "D")))
+        # 指标计算用到 pandas，第一次计算前在线程中导入
+        await import_module_async("pandas")
+        values = {}
+        for spec in specs:
+            outputs, _ = compute_indicator(spec, daily_bars.close)
+            values[spec.name] = {
+                output: np.where(np.isnan(series[start:]), None, np.round(series[start:], self.VALUE_DECIMALS)).tolist()
+                for output, series in outputs.items()
+            }
+        dates = daily_bars.date[start:].tolist()
+        logger.info(f"计算股票 {stock_code} 的技术指标完成，指标: {[spec.name for spec in specs]}, 日期数: {len(dates)}")
+        return StockIndicatorResponse(
+            stock_code=stock_code,
+            adjust=adjust,
+            data_count=len(dates),
+            dates=dates,
+            indicators=values
+        )
+
+    async def get_latest(
+        self,
+        stock_codes: List[str],
+        indicators: List[str],
+        adjust: str = "qfq"
+    ) -> StockIndicatorLatestResponse:
+        """
+        读取多只股票最后一根 K 线的技术指标。已有滚动状态的股票不需要读取日线数据；
+        缺少状态的股票会基于完整历史计算一次并保存状态。
+        """
+        specs = self._parse_specs(indicators)
+        names = [spec.name for spec in specs]
+        stock_codes = list(dict.fromkeys(stock_codes))
+        errors: Dict[str, str] = {}
+        try:
+            async with db_read_slot():
+                states = await self._repository.find_states(stock_codes, names)
+            states_by_code: Dict[str, dict] = {}
+            for state in states:
+                states_by_code.setdefault(state.stock_code, {})[state.indicator] = state
+            data = {}
+            for stock_code in stock_codes:
+                code_states = states_by_code.get(stock_code, {})
+                if len(code_states) < len(specs):
+                    code_states = await self._build_missing_states(stock_code, specs, code_states, errors)
+                data[stock_code] = self._latest_item(specs, code_states, adjust) if code_states else None
+            return StockIndicatorLatestResponse(data=data, errors=errors)
+        except StockIndicatorRepositoryError as e:
+            logger.error(f"读取最新技术指标时数据交互出现错误: {e}")
+            raise StockIndicatorServiceError(f"读取最新技术指标时数据交互出现错误: {e}") from e
+
+    async def _build_missing_states(
+        self,
+        stock_code: str,
+        specs: List[IndicatorSpec],
+        code_states: dict,
+        errors: Dict[str, str]
+    ) -> dict:
+        """基于完整的后复权历史计算缺少的指标状态并保存"""
+        from app.services.stock_daily_service import StockDailyService
+        try:
+            daily_bars = await StockDailyService(self._db_session).get_daily_bars(stock_code, None, None, "none")
+            if not len(daily_bars):
+                errors[stock_code] = "没有日线数据"
+                return {}
+            missing = [spec for spec in specs if spec.name not in code_states]
+            rows = self._rebuild_rows(daily_bars, missing)
+            async with db_read_slot():
+                await self._repository.upsert_states(rows)
+            return {**code_states, **{row["indicator"]: StockIndicatorStateOrm(**row) for row in rows}}
+        except Exception as e:
+            logger.error(f"计算股票 {stock_code} 的指标状态失败: {e}")
+            errors[stock_code] = str(e)
+            return {}
+
+    def _latest_item(self, specs: List[IndicatorSpec], code_states: dict, adjust: str) -> StockIndicatorLatestItem:
+        """由滚动状态组装最新指标，前复权时把与价格成正比的指标乘以复权因子之比"""
+        values = {}
+        last_date = None
+        for spec in specs:
+            state = code_states[spec.name]
+            scale = state.qfq_scale if adjust == "qfq" and spec.price_linear else 1.0
+            values[spec.name] = {output: self._to_float(value * scale) if value is not None else None for output, value in state.last_values.items()}
+            last_date = max(last_date, state.last_date) if last_date else state.last_date
+        return StockIndicatorLatestItem(date=last_date, indicators=values)
+
+    async def apply_new_bars(self, daily_bars: DailyBars) -> None:
+        """
+        日线数据入库后更新该股票的全部指标状态：
+        新 K 线较少时对每根新 K 线做 O(1) 增量更新，没有状态、状态对应的日期已不在数据中
+        或新 K 线过多时整段重算
+        :param daily_bars: 刚入库的不复权日线数据（需包含状态最后日期之后的全部 K 线）
+        """
+        if not len(daily_bars):
+            return
+        stock_code = daily_bars.stock_code
+        async with db_read_slot():
+            states = await self._repository.find_states([stock_code])
+        if not states:
+            rows = self._rebuild_rows(daily_bars, [parse_indicator(name) for name in DEFAULT_INDICATORS])
+            async with db_read_slot():
+                await self._repository.upsert_states(rows)
+            logger.info(f"股票 {stock_code} 的指标状态已初始化，共 {len(rows)} 个指标")
+            return
+        hfq_bars = daily_bars.adjusted("hfq")
+        qfq_scale = self._qfq_scale(daily_bars)
+        rows, rebuild_specs = [], []
+        for state in states:
+            spec = parse_indicator(state.indicator)
+            position = int(np.searchsorted(hfq_bars.date, np.datetime64(state.last_date, "D")))
+            if position >= len(hfq_bars) or hfq_bars.date[position] != np.datetime64(state.last_date, "D"):
+                rebuild_specs.append(spec)
+                continue
+            new_closes = hfq_bars.close[position + 1:]
+            if not len(new_closes):
+                continue
+            if len(new_closes) > self.MAX_INCREMENTAL_BARS:
+                rebuild_specs.append(spec)
+                continue
+            rolling_state, last_values = state.state, state.last_values
+            for close in new_closes.tolist():
+                last_values, rolling_state = update_indicator(spec, rolling_state, close)
+            rows.append(self._state_row(stock_code, spec, hfq_bars.end_date, qfq_scale, rolling_state, last_values))
+        if rebuild_specs:
+            rows.extend(self._rebuild_rows(daily_bars, rebuild_specs))
+        async with db_read_slot():
+            await self._repository.upsert_states(rows)
+        logger.info(f"股票 {stock_code} 的指标状态已更新，增量 {len(rows) - len(rebuild_specs)} 个，重算 {len(rebuild_specs)} 个")
+
+    def _rebuild_rows(self, daily_bars: DailyBars, specs: List[IndicatorSpec]) -> List[dict]:
+        """基于完整的后复权收盘价整段计算指标状态"""
+        hfq_bars = daily_bars.adjusted("hfq")
+        qfq_scale = self._qfq_scale(daily_bars)
+        rows = []
+        for spec in specs:
+            outputs, rolling_state = compute_indicator(spec, hfq_bars.close)
+            last_values = {output: float(series[-1]) for output, series in outputs.items()}
+            rows.append(self._state_row(daily_bars.stock_code, spec, hfq_bars.end_date, qfq_scale, rolling_state, last_values))
+        return rows
+
+    @staticmethod
+    def _qfq_scale(daily_bars: DailyBars) -> float:
+        """最后一根 K 线的前复权因子与后复权因子之比：前复权价 = 后复权价 × 该比值"""
+        return float(daily_bars.qfq_factor[-1] / daily_bars.hfq_factor[-1])
+
+    @staticmethod
+    def _state_row(stock_code: str, spec: IndicatorSpec, last_date: date, qfq_scale: float, rolling_state: dict, last_values: Dict[str, float]) -> dict:
+        return {
+            "stock_code": stock_code,
+            "indicator": spec.name,
+            "last_date": last_date,
+            "qfq_scale": qfq_scale,
+            "state": rolling_state,
+            # JSON 不支持 NaN，预热期内的值保存为 null
+            "last_values": {output: None if math.isnan(value) else value for output, value in last_values.items()},
+        }
@@ -0,0 +1,113 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+from loguru import logger
+from app.core.database import AsyncSessionLocal
+from app.core.cache_utlis import invalidate_cache
+from app.external.stock_info import StockInfoClient
+from app.repositories.stock_info_repository import StockInfoRepository
+
+class StockInfoRefresher:
+    """
+    个股信息后台刷新器（stale-while-revalidate）
+
+    - 过期的个股信息先直接返回给用户，再由后台任务刷新
+    - 刷新队列有界，同一股票代码在队列中或刷新中时不会重复入队
+    - 提供夜间批量刷新即将过期记录的任务
+    """
+    def __init__(self, max_queue_size: int = 200, worker_count: int = 2, batch_concurrency: int = 4):
+        self._max_queue_size = max_queue_size
+        self._worker_count = worker_count
+        self._batch_concurrency = batch_concurrency
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: set[str] = set()
+        self._workers: list[asyncio.Task] = []
+        self._client = StockInfoClient()
+
+    def enqueue(self, stock_code: str) -> bool:
+        """
+        将股票代码加入后台刷新队列
+        :param stock_code: 股票代码
+        :return: 是否成功入队（已在队列中或队列已满时返回 False）
+        """
+        if stock_code in self._pending:
+            logger.debug(f"股票 {stock_code} 已在刷新队列中，跳过")
+            return False
+        self._ensure_workers()
+        try:
+            self._queue.put_nowait(stock_code)
+        except asyncio.QueueFull:
+            logger.warning(f"个股信息刷新队列已满，暂不刷新股票 {stock_code}")
+            return False
+        self._pending.add(stock_code)
+        logger.info(f"股票 {stock_code} 已加入个股信息后台刷新队列")
+        return True
+
+    def _ensure_workers(self) -> None:
+        """在当前事件循环中按需启动后台刷新任务"""
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self._max_queue_size)
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < self._worker_count:
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    async def _worker(self) -> None:
+        while True:
+            stock_code = await self._queue.get()
+            try:
+                await self.refresh_one(stock_code)
+            finally:
+                self._pending.discard(stock_code)
+                self._queue.task_done()
+
+    async def refresh_one(self, stock_code: str) -> bool:
+        """
+        从外部接口刷新单只股票的个股信息，使对应的响应缓存失效并更新版本
+        :param stock_code: 股票代码
+        :return: 是否刷新成功
+        """
+        from app.services.stock_info_service import StockInfoService
+        try:
+            stock_info_item = await self._client.get_info_item(stock_code)
+            async with AsyncSessionLocal() as session:
+                await StockInfoRepository(session).save_stock_info(stock_info_item.to_orm())
+                # 先让响应缓存失效，再更新版本，避免新版本对应到旧的缓存内容
+                await invalidate_cache(StockInfoService.get_info_data, stock_code)
+                await StockInfoService(session).get_info_version(stock_code)
+            logger.info(f"后台刷新股票 {stock_code} 的个股信息成功")
+            return True
+        except Exception as e:
+            logger.error(f"后台刷新股票 {stock_code} 的个股信息失败: {e}")
+            return False
+
+    async def refresh_expiring(self, max_age: timedelta, ahead: timedelta) -> int:
+        """
+        批量刷新所有在 ahead 时间内即将过期的个股信息
+        :param max_age: 个股信息的最大有效期
+        :param ahead: 提前刷新的时间窗口
+        :return: 刷新成功的数量
+        """
+        async with AsyncSessionLocal() as session:
+            stock_codes = await StockInfoRepository(session).find_stock_codes_updated_before(datetime.now() - max_age + ahead)
+        logger.info(f"共有 {len(stock_codes)} 只股票的个股信息即将过期，开始批量刷新")
+        semaphore = asyncio.Semaphore(self._batch_concurrency)
+
+        async def refresh_with_limit(stock_code: str) -> bool:
+            async with semaphore:
+                return await self.refresh_one(stock_code)
+
+        results = await asyncio.gather(*(refresh_with_limit(stock_code) for stock_code in stock_codes))
+        refreshed = sum(results)
+        logger.info(f"个股信息批量刷新完成，成功 {refreshed} 只，失败 {len(stock_codes) - refreshed} 只")
+        return refreshed
+
+    async def stop(self) -> None:
+        """停止后台刷新任务"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._pending.clear()
+        self._queue = None
+
+stock_info_refresher = StockInfoRefresher()
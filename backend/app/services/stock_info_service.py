@@ -8,8 +8,11 @@ from datetime import datetime, timedelta
 from decimal import Decimal
 import json
 from app.external.exceptions import StockExternalDataError, StockExternalDataProcessingError
+from app.core.rate_limiter import RateLimitExceeded, acquire_upstream_budget
+from app.core.admission import AdmissionRejected, db_read_slot, upstream_slot
 from loguru import logger
-from app.core.cache_utlis import redis_cache
+from app.core.cache_utlis import redis_cache, set_resource_version
+from app.services.stock_info_refresher import stock_info_refresher
 
 class StockInfoServiceError(Exception):
     """个股信息服务异常"""
@@ -18,6 +21,9 @@ class StockInfoServiceError(Exception):
 class StockInfoService:
     DATE_FORMAT = "%Y%m%d"
     MAX_AGE= timedelta(days=1)
+    # 镜像到 Redis 的个股信息版本的资源类型与有效期（秒）
+    VERSION_KIND = "stock_info"
+    VERSION_TTL = 3600
     def __init__(self, db_session: AsyncSession,max_age: timedelta = timedelta(days=1)):
         self._repository = StockInfoRepository(db_session)
         self._client = StockInfoClient()
@@ -38,32 +44,54 @@ class StockInfoService:
         info_data = self._convert_to_response(raw_data)
         return info_data
 
+    async def get_info_version(self, stock_code: str) -> str:
+        """
+        获取个股信息的版本（记录的更新时间），并镜像到 Redis 供条件请求使用；
+        数据库中没有数据时会先从外部接口获取
+        """
+        record = await self.get_raw_info_data(stock_code)
+        version = self.info_version(record)
+        await set_resource_version(self.VERSION_KIND, stock_code, version, self.VERSION_TTL)
+        return version
+
+    @staticmethod
+    def info_version(record: StockInfoOrm) -> str:
+        """个股信息的版本标识"""
+        return f"{record.updated_at:%Y%m%d%H%M%S}"
+
     async def get_raw_info_data(
         self,
         stock_code: str
     ) -> StockInfoOrm:
         """
-        获取指定股票代码和日期范围的股票日线数据。
-        如果数据库中没有完整的数据，则从外部接口获取并保存。
+        获取指定股票代码的个股信息。
+        如果数据库中没有数据，则从外部接口获取并保存；
+        如果数据已过期，则直接返回旧数据，并交由后台任务刷新。
         """
         try:
-            # 查询数据库中的数据
-            existing_record = await self._repository.find_stock_info(stock_code)
-            if not existing_record or self._is_stock_info_expired(existing_record):
-                logger.info(f"数据库中没有找到股票 {stock_code} 的数据，或数据已过期，准备从外部接口获取")
+            # 查询数据库中的数据，数据库读取名额只在查询与保存期间占用，外部抓取不占用
+            async with db_read_slot():
+                existing_record = await self._repository.find_stock_info(stock_code)
+            if existing_record and self._is_stock_info_expired(existing_record):
+                logger.info(f"股票 {stock_code} 的数据已过期，先返回旧数据，并在后台刷新")
+                stock_info_refresher.enqueue(stock_code)
+            elif not existing_record:
+                logger.info(f"数据库中没有找到股票 {stock_code} 的数据，准备从外部接口获取")
+                await acquire_upstream_budget()
                 # 从外部接口获取数据
-                stock_info_item = await self._client.get_info_item(stock_code)
+                async with upstream_slot():
+                    stock_info_item = await self._client.get_info_item(stock_code)
                 logger.info(f"从外部接口获取股票 {stock_code} 的数据成功")
                 if not stock_info_item:
                     logger.error(f"获取股票 {stock_code} 的数据失败")
                     raise StockExternalDataError(f"获取股票 {stock_code} 的数据失败")
                 # 将 Pydantic 模型转换为 ORM 模型
                 orm_item = stock_info_item.to_orm()
-                # 保存到数据库
-                await self._repository.save_stock_info(orm_item)
-                logger.info(f"保存股票 {stock_code} 的数据到数据库成功")
-                # 重新查询数据库以获取完整数据
-                existing_record = await self._repository.find_stock_info(stock_code)
+                # 保存到数据库，并重新查询数据库以获取完整数据
+                async with db_read_slot():
+                    await self._repository.save_stock_info(orm_item)
+                    logger.info(f"保存股票 {stock_code} 的数据到数据库成功")
+                    existing_record = await self._repository.find_stock_info(stock_code)
             return existing_record
         except StockInfoRepositoryError as e:
             logger.error(f"数据交互时候出现错误: {e}")
@@ -74,7 +102,7 @@ class StockInfoService:
         except StockExternalDataProcessingError as e:
             logger.error(f"外部数据处理失败: {e}")
             raise StockInfoServiceError(f"外部数据处理失败，股票代码: {stock_code}, 错误: {e}") from e
-        except StockInfoServiceError as e:
+        except (StockInfoServiceError, RateLimitExceeded, AdmissionRejected) as e:
             raise e
         except Exception as e:
             logger.error(f"服务内部出现未知错误: {e}")
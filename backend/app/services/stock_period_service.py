@@ -0,0 +1,134 @@
+import pickle
+from datetime import date
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+from app.core.redis import get_cache, set_cache, delete_cache
+from app.schemas.daily_bars import DailyBars
+from app.schemas.period_bars import PeriodBars
+from app.schemas.stock_daily import DailyAdjust
+from app.schemas.stock_period import BarPeriod, StockPeriodResponse
+from app.services.stock_daily_service import StockDailyService, StockDailyServiceError
+from app.utils.resample_utils import BAR_PERIODS, ResampleError, resample_daily_bars, update_open_period
+from app.utils.stock_utlis import get_stock_exchange_code
+
+class StockPeriodServiceError(Exception):
+    """周期K线服务异常"""
+    pass
+
+class StockPeriodService:
+    """
+    周期K线服务
+
+    - 周线、月线、季线由日线按交易日历对齐的周期向量化聚合
+    - 每只股票每个周期在 Redis 中缓存一份完整的不复权与后复权周期K线，前复权由后复权换算
+    - 日线入库或读取时发现新日线，只重算最后一个（尚未结束的）周期，已结束的周期保持不变
+    """
+    # 缓存有效期（秒），缓存随新日线增量更新，过期只是为了回收不再访问的股票
+    CACHE_TTL = 7 * 24 * 3600
+    CACHE_KEY_PREFIX = "period_bars"
+
+    def __init__(self, db_session: AsyncSession, daily_service: Optional[StockDailyService] = None):
+        self._db_session = db_session
+        self._daily_service = daily_service or StockDailyService(db_session)
+
+    @staticmethod
+    def _base_adjust(adjust: DailyAdjust) -> str:
+        """缓存中保存的复权方式：前复权K线由后复权K线换算"""
+        return "none" if adjust == "none" else "hfq"
+
+    @classmethod
+    def _cache_key(cls, stock_code: str, period: str, base_adjust: str) -> str:
+        return f"{cls.CACHE_KEY_PREFIX}:{period}:{base_adjust}:{stock_code}"
+
+    async def _load(self, stock_code: str, period: str, base_adjust: str) -> Optional[PeriodBars]:
+        cached = await get_cache(self._cache_key(stock_code, period, base_adjust))
+        if not cached:
+            return None
+        try:
+            return pickle.loads(cached)
+        except Exception:
+            return None  # 缓存损坏时重新聚合
+
+    async def _store(self, period_bars: PeriodBars) -> None:
+        key = self._cache_key(period_bars.stock_code, period_bars.period, period_bars.adjust)
+        await set_cache(key, pickle.dumps(period_bars), self.CACHE_TTL)
+
+    async def _get_trade_dates(self, stock_code: str):
+        return await self._daily_service.get_trade_dates(get_stock_exchange_code(stock_code))
+
+    async def get_period_bars(
+        self,
+        stock_code: str,
+        period: BarPeriod,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        adjust: DailyAdjust = "none"
+    ) -> PeriodBars:
+        """
+        获取指定股票的周期K线，按周期结束日期筛选。
+        没有缓存时基于完整日线历史聚合；有缓存时只读取最后一个周期起的日线，
+        日线服务会补齐缺失的新日线，有新日线时只重算最后一个周期。
+        """
+        base_adjust = self._base_adjust(adjust)
+        try:
+            trade_dates = await self._get_trade_dates(stock_code)
+            period_bars = await self._load(stock_code, period, base_adjust)
+            if period_bars is None or not len(period_bars):
+                daily_bars = await self._daily_service.get_daily_bars(stock_code, None, None, "none")
+                period_bars = resample_daily_bars(daily_bars.adjusted(base_adjust), period, trade_dates)
+                await self._store(period_bars)
+                logger.info(f"聚合股票 {stock_code} 的{period}K线完成，共 {len(period_bars)} 根")
+            else:
+                daily_bars = await self._daily_service.get_daily_bars(stock_code, period_bars.first_date[-1].item(), None, "none")
+                if len(daily_bars) and daily_bars.date[-1] > period_bars.last_date[-1]:
+                    period_bars = update_open_period(period_bars, daily_bars.adjusted(base_adjust), trade_dates)
+                    await self._store(period_bars)
+                    logger.info(f"股票 {stock_code} 的{period}K线已更新到 {daily_bars.end_date}")
+            if adjust == "qfq":
+                period_bars = period_bars.to_qfq()
+            return period_bars.slice_dates(start_date, end_date)
+        except StockDailyServiceError as e:
+            logger.error(f"聚合周期K线时获取日线数据失败: {e}")
+            raise StockPeriodServiceError(f"聚合周期K线时获取日线数据失败: {e}") from e
+        except (ResampleError, ValueError) as e:
+            logger.error(f"聚合股票 {stock_code} 的{period}K线失败: {e}")
+            raise StockPeriodServiceError(f"聚合周期K线失败: {e}") from e
+
+    async def get_period_data(
+        self,
+        stock_code: str,
+        period: BarPeriod,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        adjust: DailyAdjust = "none"
+    ) -> StockPeriodResponse:
+        """获取周期K线并转换为逐行响应"""
+        period_bars = await self.get_period_bars(stock_code, period, start_date, end_date, adjust)
+        return period_bars.to_response(date.today())
+
+    async def apply_new_bars(self, daily_bars: DailyBars) -> None:
+        """
+        日线数据入库后更新该股票已缓存的周期K线，只重算各周期的最后一根；
+        没有缓存的周期不做处理，首次读取时再聚合
+        :param daily_bars: 刚入库的不复权日线数据（需覆盖各周期最后一根K线的起始日之后的全部日线）
+        """
+        if not len(daily_bars):
+            return
+        stock_code = daily_bars.stock_code
+        trade_dates = None
+        for period in BAR_PERIODS:
+            for base_adjust in ("none", "hfq"):
+                period_bars = await self._load(stock_code, period, base_adjust)
+                if period_bars is None:
+                    continue
+                if trade_dates is None:
+                    trade_dates = await self._get_trade_dates(stock_code)
+                try:
+                    await self._store(update_open_period(period_bars, daily_bars.adjusted(base_adjust), trade_dates))
+                except ResampleError as e:
+                    # 日线没有覆盖最后一个周期时删除缓存，下次读取时整段重新聚合
+                    logger.warning(f"增量更新股票 {stock_code} 的{period}K线失败，删除缓存: {e}")
+                    await delete_cache(self._cache_key(stock_code, period, base_adjust))
+        if trade_dates is not None:
+            logger.info(f"股票 {stock_code} 已缓存的周期K线已更新到 {daily_bars.end_date}")
@@ -8,7 +8,8 @@ from app.external.trade_calendar import TradeCalendarClient
 from app.external.exceptions import StockExternalDataError, StockExternalDataProcessingError
 from datetime import timedelta,datetime
 from app.models.trade_calendar_orm import TradeCalendarOrm
-from app.core.cache_utlis import redis_cache
+from app.core.cache_utlis import redis_cache, invalidate_cache, set_resource_version
+from app.core.admission import AdmissionRejected, db_read_slot, upstream_slot
 
 EXCHANGE_CODES = ["SH", "SZ", "BJ"]
 
@@ -17,12 +18,15 @@ class TradeCalendarServiceError(Exception):
     pass
 
 class TradeCalendarService:
-    
+    # 镜像到 Redis 的交易日历版本的资源类型与有效期（秒）
+    VERSION_KIND = "trade_calendar"
+    VERSION_TTL = 3600
+
     def __init__(self, db_session: AsyncSession):
         self._repository = TradeCalendarRepository(db_session)
         self._client = TradeCalendarClient()
 
-    @redis_cache(ttl=3600)
+    @redis_cache(ttl=3600, scope="exchange_code")
     async def get_trade_calendar_data(self,exchange_code: str,start_date: Optional[date] = None,end_date: Optional[date] = None) -> TradeCalendarResponse:
         """
         获取指定交易所的交易日历数据，并返回标准响应格式
@@ -32,11 +36,13 @@ class TradeCalendarService:
             raw_data = await self.get_raw_trade_calendar(exchange_code, start_date, end_date)
             # 转换为响应格式
             return self._convert_calendar_to_response(raw_data)
+        except AdmissionRejected:
+            raise
         except Exception as e:
             logger.error(f"获取交易日历响应数据时发生错误: {e}")
             raise TradeCalendarServiceError(f"获取交易日历响应数据失败: {e}")
 
-    @redis_cache(ttl=3600)
+    @redis_cache(ttl=3600, scope="exchange_code")
     async def get_latest_trading_day_data(
         self,
         exchange_code: str
@@ -49,6 +55,8 @@ class TradeCalendarService:
             raw_data = await self.get_raw_latest_trading_day(exchange_code)
             # 转换为响应格式
             return self._convert_last_trading_day_to_response(raw_data)
+        except AdmissionRejected:
+            raise
         except Exception as e:
             logger.error(f"获取最新交易日响应数据时发生错误: {e}")
             raise TradeCalendarServiceError(f"获取最新交易日响应数据失败: {e}")
@@ -68,13 +76,18 @@ class TradeCalendarService:
         logger.info(f"正在从外部接口获取{exchange_code}交易所的数据")
         try:
             # 从外部接口获取交易日历数据
-            calendar_item = await self._client.get_exchange_trade_calendar_item(exchange_code=exchange_code,start_date=start_date,end_date=end_date)
+            async with upstream_slot():
+                calendar_item = await self._client.get_exchange_trade_calendar_item(exchange_code=exchange_code,start_date=start_date,end_date=end_date)
             if calendar_item:
                 # 转换为ORM对象并保存到数据库
                 orm_items = calendar_item.to_orm()
                 if orm_items:
-                    await self._repository.save_trade_calendar(orm_items)
+                    async with db_read_slot():
+                        await self._repository.save_trade_calendar(orm_items)
                     logger.info(f"成功保存{exchange_code}交易所的{len(orm_items)}条交易日历数据")
+                    # 日历只会追加新的交易日，更新版本并让最新交易日的缓存失效
+                    await invalidate_cache(TradeCalendarService.get_latest_trading_day_data, exchange_code)
+                    await self.get_calendar_version(exchange_code)
                 else:
                     logger.error(f"{exchange_code}交易所接口返回的数据无法转换为ORM对象")
                     raise StockExternalDataProcessingError(f"{exchange_code}交易所接口数据无效")
@@ -87,6 +100,8 @@ class TradeCalendarService:
         except TradeCalendarRepositoryError as e:
             logger.error(f"保存数据库时发生错误: {e}")
             raise e  # 重新抛出保存数据错误
+        except AdmissionRejected:
+            raise
         except Exception as e:
             logger.error(f"增量获取并保存{exchange_code}交易日历时发生未知错误: {e}")
             raise TradeCalendarServiceError(f"增量获取并保存{exchange_code}交易日历失败: {e}")
@@ -102,15 +117,17 @@ class TradeCalendarService:
         如果数据库中没有数据，则从外部接口获取并保存
         """
         try:
-            # 从数据库获取交易日历数据
-            trade_dates = await self._repository.find_trade_calendar(exchange_code,start_date,end_date)
+            # 从数据库获取交易日历数据，数据库读取名额只在查询期间占用
+            async with db_read_slot():
+                trade_dates = await self._repository.find_trade_calendar(exchange_code,start_date,end_date)
             
             if not trade_dates:
                 # 如果数据库中没有数据，从外部接口获取
                 logger.info(f"数据库中没有{exchange_code}交易所的数据，从外部接口获取")
                 await self._fetch_and_save_calendar(exchange_code)
                 # 重新从数据库获取数据
-                trade_dates = await self._repository.find_trade_calendar(exchange_code,start_date,end_date)
+                async with db_read_slot():
+                    trade_dates = await self._repository.find_trade_calendar(exchange_code,start_date,end_date)
             # 转换为响应格式
             return trade_dates
 
@@ -120,20 +137,41 @@ class TradeCalendarService:
         except StockExternalDataError as e:
             logger.error(f"获取外部数据失败: {e}")
             raise TradeCalendarServiceError(f"获取外部交易日历数据失败: {e}")
+        except AdmissionRejected:
+            raise
         except Exception as e:
             logger.error(f"处理交易日历数据时发生未知错误: {e}")
             raise TradeCalendarServiceError(f"处理交易日历数据时发生未知错误: {e}")
 
+    async def get_calendar_version(self, exchange_code: str) -> Optional[date]:
+        """
+        获取交易日历的版本，即库中最新的交易日：日历只会追加新的交易日，最新交易日不变则日历不变。
+        读取到的版本会镜像到 Redis，供条件请求使用
+        """
+        try:
+            async with db_read_slot():
+                latest_day = await self._repository.get_latest_trade_day(exchange_code)
+        except TradeCalendarRepositoryError as e:
+            logger.error(f"获取交易日历版本失败: {e}")
+            raise TradeCalendarServiceError(f"获取交易日历版本失败: {e}")
+        if not latest_day:
+            return None
+        await set_resource_version(self.VERSION_KIND, exchange_code, latest_day.trade_date.isoformat(), self.VERSION_TTL)
+        return latest_day.trade_date
+
     async def get_raw_latest_trading_day(self, exchange_code: str) -> TradeCalendarOrm:
         """获取指定交易所的最新交易日"""
         try:
-            latest_day = await self._repository.get_latest_trade_day(exchange_code)
+            async with db_read_slot():
+                latest_day = await self._repository.get_latest_trade_day(exchange_code)
             if not latest_day:
                 raise TradeCalendarRepositoryError(f"未找到{exchange_code}的最新交易日数据")
             return latest_day
         except TradeCalendarRepositoryError as e:
             logger.error(f"获取最新交易日失败: {e}")
             raise TradeCalendarServiceError(f"获取最新交易日失败: {e}")
+        except AdmissionRejected:
+            raise
         except Exception as e:
             logger.error(f"获取最新交易日时发生未知错误: {e}")
             raise TradeCalendarServiceError(f"获取最新交易日时发生未知错误: {e}")
@@ -1,3 +1,4 @@
+import pickle
 from typing import Optional, List
 from datetime import datetime, timedelta
 from loguru import logger
@@ -8,8 +9,13 @@ from app.schemas.user import (
     UserRegisterRequest, UserUpdateRequest, UserResponseItem, 
     UserLoginResponse, PasswordChangeRequest, UserItem
 )
-from app.utils.password_utils import verify_password, get_password_hash
-from app.core.token_utils import create_access_token
+from app.utils.password_utils import hash_password, verify_and_update_password
+from app.core.password_executor import PasswordHashBusyError
+from app.core.token_utils import create_access_token, claims_cache
+from app.core.token_revocation import token_revocation_list, TokenRevocationError
+from app.utils.auth_utils import verify_access_token
+from app.core.redis import get_cache, set_cache, delete_cache
+from app.services.last_login_recorder import last_login_recorder
 
 class UserServiceError(Exception):
     """用户服务异常"""
@@ -18,9 +24,46 @@ class UserServiceError(Exception):
 class UserService(object):
     # 默认token过期时间 (8小时)
     ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 8
+    # 用户资料缓存有效期（秒），资料、状态变更、注销与最后登录时间写入后主动失效；缓存只保存响应中的资料字段，不含密码哈希
+    PROFILE_CACHE_TTL = 600
+    PROFILE_CACHE_KEY_PREFIX = "user_profile"
 
     def __init__(self, db_session: AsyncSession):
         self._repository = UserRepository(db_session)
+
+    @classmethod
+    def _profile_cache_key(cls, username: str) -> str:
+        return f"{cls.PROFILE_CACHE_KEY_PREFIX}:{username}"
+
+    @classmethod
+    async def invalidate_profile_cache(cls, username: str) -> None:
+        """使用户资料缓存失效，缓存不可用时只记录警告"""
+        try:
+            await delete_cache(cls._profile_cache_key(username))
+        except Exception as e:
+            logger.warning(f"删除用户 {username} 的资料缓存失败: {e}")
+
+    async def _find_profile(self, username: str) -> Optional[UserResponseItem]:
+        """
+        按用户名读取未注销用户的资料，优先读取 Redis 中的资料缓存；不存在的用户不缓存。
+        只用于展示资料，登录验证与写入前都从数据库读取最新的记录
+        """
+        key = self._profile_cache_key(username)
+        try:
+            cached = await get_cache(key)
+            if cached:
+                return UserResponseItem(**pickle.loads(cached))
+        except Exception as e:
+            logger.warning(f"读取用户 {username} 的资料缓存失败: {e}")
+        user = await self._repository.find_active_by_username(username)
+        if user is None:
+            return None
+        profile = self._convert_to_response_item(user)
+        try:
+            await set_cache(key, pickle.dumps(profile.model_dump()), self.PROFILE_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"写入用户 {username} 的资料缓存失败: {e}")
+        return profile
     
     async def register_user(self, user_data: UserRegisterRequest) -> UserResponseItem:
         """注册新用户"""
@@ -39,7 +82,7 @@ class UserService(object):
             
             logger.debug(f"用户唯一性得到检验。创建新用户: {user_data.username}, {user_data.email}")
             # 创建新用户
-            hashed_password = get_password_hash(user_data.password)
+            hashed_password = await hash_password(user_data.password)
             user_item = UserItem(
                 username=user_data.username,
                 email=user_data.email,
@@ -54,6 +97,8 @@ class UserService(object):
         except UserRepositoryError as e:
             logger.error(f"用户注册时数据库操作失败: {e}")
             raise UserServiceError(f"用户注册失败: {e}")
+        except PasswordHashBusyError as e:
+            raise UserServiceError(str(e))
         except UserServiceError:
             raise
         except Exception as e:
@@ -68,13 +113,18 @@ class UserService(object):
                 logger.warning(f"认证失败，用户不存在: {username}")
                 raise UserServiceError("用户不存在")
             
-            if not verify_password(password, user.hashed_password):
+            verified, new_hash = await verify_and_update_password(password, user.hashed_password)
+            if not verified:
                 logger.warning(f"认证失败，密码错误: {username}")
                 raise UserServiceError("密码错误")
             
-            # 更新最后登录时间
+            # 最后登录时间由后台批量写入，登录请求不等待提交
             user.last_login = datetime.now()
-            await self._repository.update_user(user)
+            last_login_recorder.record(user.id, user.username, user.last_login)
+            # bcrypt 工作因子调整后，用本次登录的明文密码按新的工作因子重新哈希，只写回密码哈希一列
+            if new_hash is not None:
+                await self._repository.update_password(username, new_hash)
+                logger.info(f"用户 {username} 的密码哈希已按新的工作因子更新")
             
             return user
         except UserServiceError:
@@ -82,6 +132,8 @@ class UserService(object):
         except UserRepositoryError as e:
             logger.error(f"用户认证时数据库操作失败: {e}")
             raise UserServiceError(f"用户认证失败: {e}")
+        except PasswordHashBusyError as e:
+            raise UserServiceError(str(e))
         except Exception as e:
             logger.error(f"用户认证过程中发生未知错误: {e}")
             raise UserServiceError(f"用户认证过程中发生未知错误: {e}")
@@ -101,7 +153,7 @@ class UserService(object):
             # 生成访问令牌
             expires_delta = timedelta(minutes=self.ACCESS_TOKEN_EXPIRE_MINUTES)
             access_token = create_access_token(
-                data={"sub": user.username, "id": user.id},
+                data={"sub": user.username, "id": user.id, "role": (user.role or UserRoleEnum.user).value},
                 expires_delta=expires_delta
             )
             
@@ -120,16 +172,50 @@ class UserService(object):
             logger.error(f"用户登录过程中发生未知错误: {e}")
             raise UserServiceError(f"用户登录失败: {e}")
         
+    async def logout_user(self, token: str) -> bool:
+        """用户登出：吊销当前访问令牌"""
+        try:
+            claims = await verify_access_token(token)
+        except ValueError as e:
+            logger.warning(f"登出失败，令牌无效: {e}")
+            raise UserServiceError("令牌无效或已登出")
+        jti, expires_at = claims.get("jti"), claims.get("exp")
+        if not jti or expires_at is None:
+            raise UserServiceError("令牌缺少 jti 或 exp 声明，无法吊销")
+        try:
+            await token_revocation_list.revoke(jti, expires_at)
+        except TokenRevocationError as e:
+            raise UserServiceError(f"用户登出失败: {e}")
+        claims_cache.discard(token)
+        logger.info(f"用户登出成功: {claims.get('sub')}")
+        return True
+
+    async def ban_user(self, username: str) -> bool:
+        """封禁用户：修改账户状态并吊销该用户已签发的全部令牌"""
+        try:
+            user = await self._repository.update_user_info(username, status=UserStatusEnum.banned)
+            await self.invalidate_profile_cache(username)
+            if not user:
+                logger.warning(f"封禁失败，用户不存在: 用户名 {username}")
+                raise UserServiceError("用户不存在")
+            await token_revocation_list.revoke_user(username)
+            return True
+        except UserRepositoryError as e:
+            logger.error(f"封禁用户时数据库操作失败: {e}")
+            raise UserServiceError(f"封禁用户失败: {e}")
+        except TokenRevocationError as e:
+            raise UserServiceError(f"封禁用户时吊销令牌失败: {e}")
+
     async def get_user_profile(self, username: str) -> UserResponseItem:
         """获取用户资料"""
         try:
             # 检查用户是否存在
-            user = await self._repository.find_active_by_username(username)
-            if not user:
+            profile = await self._find_profile(username)
+            if not profile:
                 logger.warning(f"获取用户资料失败，用户不存在: {username}")
                 raise UserServiceError("用户不存在")
             
-            return self._convert_to_response_item(user)
+            return profile
         except UserRepositoryError as e:
             logger.error(f"获取用户资料时数据库操作失败: {e}")
             raise UserServiceError(f"获取用户资料失败: {e}")
@@ -165,6 +251,7 @@ class UserService(object):
                 birth_date=update_data.birth_date,
                 country=update_data.country
             )
+            await self.invalidate_profile_cache(username)
             
             if not updated_user:
                 logger.error(f"更新用户信息失败: 用户名 {username}")
@@ -191,19 +278,21 @@ class UserService(object):
                 raise UserServiceError("用户不存在")
             
             # 验证旧密码
-            if not verify_password(password_data.old_password, user.hashed_password):
+            verified, _ = await verify_and_update_password(password_data.old_password, user.hashed_password)
+            if not verified:
                 logger.warning(f"更改密码失败，旧密码不正确: 用户名 {username}")
                 raise UserServiceError("旧密码不正确")
             
-            # 哈希新密码并更新
-            hashed_password = get_password_hash(password_data.new_password)
-            user.hashed_password = hashed_password
-            await self._repository.update_user(user)
+            # 哈希新密码，只更新密码哈希一列
+            hashed_password = await hash_password(password_data.new_password)
+            await self._repository.update_password(username, hashed_password)
             
             return True
         except UserRepositoryError as e:
             logger.error(f"更改密码时数据库操作失败: {e}")
             raise UserServiceError(f"更改密码失败: {e}")
+        except PasswordHashBusyError as e:
+            raise UserServiceError(str(e))
         except UserServiceError:
             # 直接抛出服务异常
             raise
@@ -219,10 +308,15 @@ class UserService(object):
                 logger.warning(f"删除用户失败，用户不存在: 用户名 {username}")
                 raise UserServiceError("用户不存在")
             await self._repository.soft_delete(username)
+            await self.invalidate_profile_cache(username)
+            # 注销后该用户已签发的令牌全部失效
+            await token_revocation_list.revoke_user(username)
             return True
         except UserRepositoryError as e:
             logger.error(f"删除用户时数据库操作失败: {e}")
             raise UserServiceError(f"删除用户失败: {e}")
+        except TokenRevocationError as e:
+            raise UserServiceError(f"用户已删除，但吊销令牌失败: {e}")
         except UserServiceError:
             # 直接抛出服务异常
             raise
@@ -0,0 +1,112 @@
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Tuple
+from loguru import logger
+
+# 启动耗时基准：python -m app.startup_benchmark
+# 1. 导入耗时：多次在新进程中执行 python -X importtime -c "import app.main"，统计 app.main 的累计导入耗时，
+#    并按顶层包汇总各依赖自身的导入耗时，确认 akshare / pandas / pyarrow 不在启动路径上
+# 2. 首个响应耗时：多次启动 uvicorn，从创建进程到第一个 HTTP 响应（/api/v1/docs）的时间，包括解释器启动、导入与 lifespan 启动
+# 基准结果见同目录的 startup_benchmark_baseline.txt
+
+RUNS = 5
+TOP_PACKAGES = 12
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+FIRST_RESPONSE_PATH = "/api/v1/docs"
+FIRST_RESPONSE_TIMEOUT = 60.0
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)")
+# 不应出现在启动路径上的依赖
+LAZY_PACKAGES = ("akshare", "pandas", "pyarrow")
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(BACKEND_DIR), env.get("PYTHONPATH")]))
+    return env
+
+def measure_import() -> Tuple[float, Counter]:
+    """
+    在新进程中导入 app.main 一次
+    :return: (app.main 累计导入耗时（毫秒）, 顶层包 -> 自身导入耗时（毫秒）)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, env=_env(), capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"导入 app.main 失败:\n{result.stderr[-2000:]}")
+    total, packages = 0.0, Counter()
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, name = int(match.group(1)), int(match.group(2)), match.group(3)
+        packages[name.split(".")[0]] += self_us / 1e3
+        if name == "app.main":
+            total = cumulative_us / 1e3
+    return total, packages
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def measure_first_response() -> float:
+    """启动 uvicorn 并轮询，返回从创建进程到收到第一个 HTTP 响应的耗时（毫秒）"""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}{FIRST_RESPONSE_PATH}"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < FIRST_RESPONSE_TIMEOUT:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn 启动失败，退出码 {process.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1):
+                    pass
+                return (time.perf_counter() - started) * 1e3
+            except urllib.error.HTTPError:
+                # 任何 HTTP 响应都说明服务已可处理请求
+                return (time.perf_counter() - started) * 1e3
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                time.sleep(0.01)
+        raise RuntimeError(f"{FIRST_RESPONSE_TIMEOUT:.0f} 秒内没有收到响应")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def _summary(values: List[float]) -> str:
+    return f"中位数 {statistics.median(values):.0f} ms，最小 {min(values):.0f} ms，最大 {max(values):.0f} ms"
+
+if __name__ == "__main__":
+    logger.remove()
+    logger.add(lambda message: print(message, end=""), level="INFO", format="{message}")
+
+    totals, packages = [], Counter()
+    for _ in range(RUNS):
+        total, run_packages = measure_import()
+        totals.append(total)
+        packages.update(run_packages)
+    logger.info(f"import app.main（{RUNS} 次）：{_summary(totals)}")
+    logger.info(f"各顶层包自身导入耗时（{RUNS} 次平均）：")
+    for package, elapsed in packages.most_common(TOP_PACKAGES):
+        logger.info(f"  {package:<24}{elapsed / RUNS:>8.1f} ms")
+    loaded = [package for package in LAZY_PACKAGES if package in packages]
+    logger.info(f"启动路径上的延迟导入依赖：{', '.join(loaded) if loaded else '无'}")
+
+    first_responses = [measure_first_response() for _ in range(RUNS)]
+    logger.info(f"启动到首个响应（{RUNS} 次）：{_summary(first_responses)}")
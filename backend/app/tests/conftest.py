@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+from app.schemas.daily_bars import DailyBars
+
+@pytest.fixture
+def make_bars():
+    """
+    生成测试用日线的工厂：从 start 起逐日一根，收盘价在 10 到 11 之间线性变化，
+    开盘、最高、最低价与收盘价相同，复权因子在整段内不变
+    """
+    def factory(stock_code: str = "600000", days: int = 5, start: str = "2024-01-01",
+                qfq_factor: float = 1.0, hfq_factor: float = 1.0) -> DailyBars:
+        closes = np.linspace(10, 11, days)
+        return DailyBars.from_columns(stock_code, {
+            "date": np.datetime64(start) + np.arange(days),
+            "open": closes, "high": closes, "low": closes, "close": closes,
+            "change": np.zeros(days), "pct_chg": np.zeros(days), "vol": np.full(days, 100),
+            "amount": closes * 100, "qfq_factor": np.full(days, qfq_factor), "hfq_factor": np.full(days, hfq_factor),
+        })
+    return factory
@@ -0,0 +1,111 @@
+import asyncio
+import json
+from types import SimpleNamespace
+import pytest
+from app.core import admission
+from app.core.admission import AdmissionController, AdmissionRejected, DB_READ
+from app.schemas.daily_bars import DailyBars
+from app.services import stock_daily_service
+from app.services.stock_daily_service import StockDailyService
+
+@pytest.fixture
+def admission_enabled(monkeypatch):
+    monkeypatch.setattr(admission.admission_settings, "ADMISSION_ENABLED", True)
+
+@pytest.fixture
+def db_read(monkeypatch, admission_enabled):
+    """只有 1 个名额、不排队的数据库读取准入控制器"""
+    controller = AdmissionController(DB_READ, 1, 0, 0.05)
+    monkeypatch.setitem(admission.admission_controllers, DB_READ, controller)
+    return controller
+
+@pytest.fixture
+def fake_stream_db(monkeypatch, db_read, make_bars):
+    """流式读取时记录执行中的数据库读取数量"""
+    active_during_read = []
+
+    class FakeSession:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            return False
+
+    class FakeRepository:
+        def __init__(self, session):
+            pass
+
+        async def stream_daily_bars_batch(self, stock_codes, start_date, end_date, yield_per):
+            for stock_code in stock_codes:
+                active_during_read.append(db_read.stats()["active"])
+                yield make_bars(stock_code, days=3)
+
+    monkeypatch.setattr(stock_daily_service, "AsyncSessionLocal", FakeSession)
+    monkeypatch.setattr(stock_daily_service, "StockDailyRepository", FakeRepository)
+    return active_during_read
+
+async def _collect(stream) -> list:
+    return [chunk async for chunk in stream]
+
+def test_stream_body_holds_db_read_slot(db_read, fake_stream_db):
+    chunks = asyncio.run(_collect(StockDailyService.stream_daily_data(["600000", "000001"])))
+    rows = [json.loads(line) for line in "".join(chunks).splitlines()]
+    assert {row["stock_code"] for row in rows} == {"600000", "000001"}
+    assert fake_stream_db == [1, 1]
+    assert db_read.stats()["active"] == 0
+    assert db_read.stats()["admitted"] == 1
+
+def test_stream_reports_rejection_in_body(db_read, fake_stream_db):
+    async def scenario():
+        async with db_read.slot():
+            return await _collect(StockDailyService.stream_daily_data(["600000"], media_format="json"))
+
+    body = json.loads("".join(asyncio.run(scenario())))
+    assert body["daily"] == []
+    assert "繁忙" in body["error"]
+    assert fake_stream_db == []
+
+def test_db_read_slot_is_released_before_upstream_fetch(db_read, make_bars, monkeypatch):
+    # 缓存未命中：查询期间占用数据库名额，等待外部接口期间不占用
+    service = StockDailyService(None)
+    active_during = {}
+
+    async def find_daily_bars(stock_code, start_date, end_date):
+        active_during["query"] = db_read.stats()["active"]
+        return DailyBars.empty(stock_code)
+
+    async def get_daily_bars(stock_code):
+        active_during["fetch"] = db_read.stats()["active"]
+        return make_bars(stock_code, days=3), SimpleNamespace(total=3, accepted=3, rejected=0)
+
+    async def save_daily_bars(daily_bars, rewritten=False):
+        pass
+
+    service._repository = SimpleNamespace(find_daily_bars=find_daily_bars)
+    service._save_daily_bars = save_daily_bars
+    monkeypatch.setattr(stock_daily_service.StockDailyClient, "get_daily_bars", staticmethod(get_daily_bars))
+    assert len(asyncio.run(service._get_raw_daily_bars("600000"))) == 3
+    assert active_during == {"query": 1, "fetch": 0}
+    assert db_read.stats()["active"] == 0
+
+def test_overload_rejects_instead_of_queueing(admission_enabled):
+    # 2 个名额、2 个排队位置，等待期限短于一次执行：多出的请求立即拒绝，排队的请求超时拒绝
+    controller = AdmissionController(DB_READ, 2, 2, 0.05)
+    outcomes = []
+
+    async def request():
+        try:
+            async with controller.slot():
+                await asyncio.sleep(0.2)
+            outcomes.append("ok")
+        except AdmissionRejected as e:
+            outcomes.append(e.reason)
+
+    async def scenario():
+        await asyncio.gather(*(request() for _ in range(10)))
+
+    asyncio.run(scenario())
+    assert outcomes.count("ok") == 2
+    assert outcomes.count("队列已满") == 6
+    assert outcomes.count("等待超时") == 2
+    assert controller.stats()["active"] == controller.stats()["waiting"] == 0
@@ -0,0 +1,98 @@
+import asyncio
+import fnmatch
+import pickle
+from datetime import date
+import pytest
+from app.core import cache_utlis
+from app.core.cache_utlis import invalidate_cache, invalidate_cache_scopes, redis_cache
+from app.services.post_close_pipeline import PipelineContext, PostClosePipeline
+from app.services.stock_daily_service import StockDailyService
+from app.services.stock_indicator_service import StockIndicatorService
+from app.services.trade_calendar_service import TradeCalendarService
+
+class FakeService:
+    def __init__(self):
+        self.calls = 0
+
+    @redis_cache(ttl=60, scope="stock_code")
+    async def get_bars(self, stock_code, start_date=None, end_date=None):
+        self.calls += 1
+        return (stock_code, start_date, end_date)
+
+@pytest.fixture
+def store(monkeypatch):
+    """用内存字典代替 Redis 中的缓存键"""
+    data = {}
+
+    async def get_cache(key):
+        return data.get(key)
+
+    async def set_cache(key, value, ttl):
+        data[key] = value
+
+    async def delete_cache(key):
+        return data.pop(key, None) is not None
+
+    async def scan_cache_keys(pattern):
+        return [key.encode() for key in data if fnmatch.fnmatchcase(key, pattern)]
+
+    async def delete_cache_keys(keys):
+        return sum(data.pop(key.decode(), None) is not None for key in keys)
+
+    for name, fake in [("get_cache", get_cache), ("set_cache", set_cache), ("delete_cache", delete_cache),
+                       ("scan_cache_keys", scan_cache_keys), ("delete_cache_keys", delete_cache_keys)]:
+        monkeypatch.setattr(cache_utlis, name, fake)
+    return data
+
+def test_scope_is_part_of_key_for_positional_and_keyword_calls(store):
+    service = FakeService()
+
+    async def scenario():
+        await service.get_bars("600000", "2024-01-01")
+        await service.get_bars(stock_code="600000", start_date="2024-01-01")
+
+    asyncio.run(scenario())
+    assert {key.rsplit(":", 2)[1] for key in store} == {"600000"}
+    assert len(store) == 2
+
+def test_invalidate_scopes_deletes_every_range_of_the_scope(store):
+    service = FakeService()
+
+    async def scenario():
+        for stock_code in ("600000", "000001"):
+            await service.get_bars(stock_code)
+            await service.get_bars(stock_code, "2024-01-01")
+            await service.get_bars(stock_code, "2024-01-01", "2024-06-30")
+        deleted = await invalidate_cache_scopes(FakeService.get_bars, ["600000"])
+        await service.get_bars("600000", "2024-01-01")
+        return deleted
+
+    calls_before = 6
+    assert asyncio.run(scenario()) == 3
+    assert service.calls == calls_before + 1
+    assert sum(":000001:" in key for key in store) == 3
+
+def test_invalidate_single_call_matches_scoped_key(store):
+    service = FakeService()
+
+    async def scenario():
+        await service.get_bars("600000", None, None)
+        return await invalidate_cache(FakeService.get_bars, "600000", None, None)
+
+    assert asyncio.run(scenario())
+    assert store == {}
+
+def test_post_close_invalidates_open_ranges_charts_and_indicators(store):
+    cached_keys = [
+        cache_utlis._make_cache_key(StockDailyService.get_daily_bars, (None, "600000", "2024-01-01", None, "qfq"), {}, "600000"),
+        cache_utlis._make_cache_key(StockDailyService.get_chart_bars, (None, "600000", None, None, "none", 500, "lttb"), {}, "600000"),
+        cache_utlis._make_cache_key(StockIndicatorService.get_indicators, (None, "600000", ["ma5"]), {}, "600000"),
+        cache_utlis._make_cache_key(TradeCalendarService.get_trade_calendar_data, (None, "SH", date(2024, 1, 1), None), {}, "SH"),
+        cache_utlis._make_cache_key(StockDailyService._get_full_trade_calendar, (None, "SH"), {}, "SH"),
+    ]
+    untouched = cache_utlis._make_cache_key(StockDailyService.get_daily_bars, (None, "000001", None, None, "none"), {}, "000001")
+    store.update({key: pickle.dumps(None) for key in [*cached_keys, untouched]})
+    context = PipelineContext(date(2024, 6, 3), latest_trade_dates={"SH": date(2024, 6, 3)}, synced_codes=["600000"])
+    result = asyncio.run(PostClosePipeline(is_leader=lambda: True)._invalidate_caches(context))
+    assert result == {"deleted": len(cached_keys)}
+    assert list(store) == [untouched]
@@ -0,0 +1,131 @@
+import asyncio
+from datetime import date
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from app.schemas.daily_bars import DailyBars, DAILY_BAR_FIELDS
+from app.services import stock_daily_service
+from app.services.stock_daily_service import StockDailyService
+
+def _meta(daily_bars: DailyBars, data_version: int = 3) -> SimpleNamespace:
+    return SimpleNamespace(**{**StockDailyService._daily_meta_row(None, daily_bars), "data_version": data_version})
+
+@pytest.fixture
+def closed_until(monkeypatch):
+    """固定最近一个已收盘交易日的截止日期"""
+    def set_cutoff(cutoff: date) -> None:
+        monkeypatch.setattr(StockDailyService, "_closed_session_cutoff", staticmethod(lambda: cutoff))
+    return set_cutoff
+
+def test_first_meta_starts_at_version_one(make_bars):
+    row = StockDailyService._daily_meta_row(None, make_bars(days=5))
+    assert row["data_version"] == 1
+    assert (row["first_date"], row["last_date"], row["bar_count"]) == (date(2024, 1, 1), date(2024, 1, 5), 5)
+
+def test_appending_bars_keeps_version(make_bars):
+    row = StockDailyService._daily_meta_row(_meta(make_bars(days=5)), make_bars(days=7))
+    assert row["data_version"] == 3
+    assert row["last_date"] == date(2024, 1, 7)
+
+def test_changed_factors_bump_version(make_bars):
+    # 除权除息后前复权因子整段改变
+    assert StockDailyService._daily_meta_row(_meta(make_bars(days=5)), make_bars(days=6, qfq_factor=0.8))["data_version"] == 4
+
+def test_missing_known_bar_bumps_version(make_bars):
+    # 已知范围内少了一根日线，即使因子不变也视为数据变化
+    complete = make_bars(days=6)
+    fetched = DailyBars.from_columns("600000", {name: np.delete(getattr(complete, name), 2) for name in DAILY_BAR_FIELDS})
+    assert StockDailyService._daily_meta_row(_meta(make_bars(days=5)), fetched)["data_version"] == 4
+
+def test_delta_requests_full_refresh_on_version_mismatch(make_bars):
+    service = StockDailyService(None)
+    meta = SimpleNamespace(data_version=4, last_date=date(2024, 1, 7))
+    requested = []
+
+    async def get_daily_meta(stock_code):
+        return meta
+
+    async def get_daily_bars(stock_code, start_date, end_date, adjust):
+        requested.append((start_date, end_date))
+        return make_bars(days=7).slice_dates(start_date, end_date)
+
+    service.get_daily_meta = get_daily_meta
+    service.get_daily_bars = get_daily_bars
+    stale = asyncio.run(service.get_daily_delta("600000", date(2024, 1, 5), 3))
+    assert stale.full_refresh and stale.daily is None and not requested
+    current = asyncio.run(service.get_daily_delta("600000", date(2024, 1, 5), 4))
+    assert not current.full_refresh
+    assert requested == [(date(2024, 1, 6), date(2024, 1, 7))]
+    assert current.daily.data_count == 2
+
+def test_meta_read_never_fetches_and_mirrors_only_closed_sessions(make_bars, closed_until, monkeypatch):
+    service = StockDailyService(None)
+    mirrored = []
+
+    async def find_daily_meta(stock_code):
+        return _meta(make_bars(days=4))
+
+    async def get_trade_dates(exchange_code):
+        return make_bars(days=5).date
+
+    async def get_raw_daily_bars(*args):
+        raise AssertionError("读取元数据不应从外部接口获取日线")
+
+    async def set_resource_version(kind, key, version, ttl):
+        mirrored.append(version)
+
+    service._repository = SimpleNamespace(find_daily_meta=find_daily_meta)
+    service.get_trade_dates = get_trade_dates
+    service._get_raw_daily_bars = get_raw_daily_bars
+    monkeypatch.setattr(stock_daily_service, "set_resource_version", set_resource_version)
+    # 1 月 5 日盘中：最近一个已收盘交易日是 1 月 4 日，元数据是最新的
+    closed_until(date(2024, 1, 4))
+    assert asyncio.run(service.get_daily_meta("600000")).last_date == date(2024, 1, 4)
+    assert mirrored == ["3.20240104"]
+    # 1 月 5 日收盘后同步尚未完成：返回已有元数据，但不镜像落后的版本
+    closed_until(date(2024, 1, 5))
+    assert asyncio.run(service.get_daily_meta("600000")).last_date == date(2024, 1, 4)
+    assert mirrored == ["3.20240104"]
+
+def test_intraday_session_is_not_required(make_bars, closed_until):
+    closed_until(date(2024, 1, 4))
+    trade_dates, record_dates = make_bars(days=5).date, make_bars(days=4).date
+    assert StockDailyService._required_trade_dates(trade_dates, record_dates, None, None)[-1] == np.datetime64("2024-01-04")
+    assert StockDailyService._required_trade_dates(trade_dates, record_dates, None, date(2024, 1, 5))[-1] == np.datetime64("2024-01-04")
+
+def test_fetched_intraday_bar_is_dropped(make_bars, closed_until, monkeypatch):
+    async def get_daily_bars(stock_code):
+        return make_bars(stock_code, days=5), SimpleNamespace(total=5, accepted=5, rejected=0)
+
+    monkeypatch.setattr(stock_daily_service.StockDailyClient, "get_daily_bars", staticmethod(get_daily_bars))
+    closed_until(date(2024, 1, 4))
+    assert asyncio.run(StockDailyService(None)._fetch_closed_bars("600000")).end_date == date(2024, 1, 4)
+
+def test_rewritten_latest_bar_bumps_version(make_bars):
+    assert StockDailyService._daily_meta_row(_meta(make_bars(days=5)), make_bars(days=5), rewritten=True)["data_version"] == 4
+
+@pytest.mark.parametrize("stored_close, expected", [(10.9, True), (11.0, False)])
+def test_sync_rechecks_bar_already_at_latest_trade_date(make_bars, stored_close, expected):
+    # 最新一根日线已入库：与收盘后数据不同（盘中写入）时改写，相同时跳过
+    service = StockDailyService(None)
+    fetched, saved = make_bars(days=5), []
+    stored = make_bars(days=5).slice_dates(date(2024, 1, 5), date(2024, 1, 5))
+    stored.close[:] = stored_close
+
+    async def find_daily_meta(stock_code):
+        return _meta(fetched)
+
+    async def find_daily_bars(stock_code, start_date, end_date):
+        return stored
+
+    async def fetch_closed_bars(stock_code):
+        return fetched
+
+    async def save_daily_bars(daily_bars, rewritten=False):
+        saved.append(rewritten)
+
+    service._repository = SimpleNamespace(find_daily_meta=find_daily_meta, find_daily_bars=find_daily_bars)
+    service._fetch_closed_bars = fetch_closed_bars
+    service._save_daily_bars = save_daily_bars
+    assert asyncio.run(service.sync_latest_bars("600000", date(2024, 1, 5))) is expected
+    assert saved == ([True] if expected else [])
@@ -0,0 +1,55 @@
+from datetime import date
+import numpy as np
+import pandas as pd
+from app.external.stock_daily import StockDailyClient
+
+def _daily(**overrides) -> pd.DataFrame:
+    """三个交易日的日线数据，overrides 按列覆盖第二行的值"""
+    frame = pd.DataFrame({
+        "date": [date(2024, 1, 2), date(2024, 1, 3), date(2024, 1, 4)],
+        "open": 10.0, "close": 10.5, "high": 11.0, "low": 9.5,
+        "vol": 1200.0, "amount": 1.26e6, "pct_chg": 5.0, "change": 0.5,
+        "qfq_factor": 0.8, "hfq_factor": 3.0,
+    })
+    for column, value in overrides.items():
+        frame.loc[1, column] = value
+    return frame
+
+def test_negative_qfq_factor_is_accepted():
+    # 上市较早的股票前复权价格可能为负，这些交易日必须入库，否则会成为永久缺口
+    columns, summary = StockDailyClient._validate_daily_columns(_daily(qfq_factor=-0.35), "600601")
+    assert summary.rejected == 0
+    assert columns["qfq_factor"][1] == -0.35
+
+def test_anomalies_are_recorded_but_stored():
+    columns, summary = StockDailyClient._validate_daily_columns(_daily(high=9.0), "600601")
+    assert summary.rejected == 0
+    assert summary.anomalies == {"inconsistent_ohlc": 1}
+    assert len(columns["date"]) == 3
+
+def test_unstorable_rows_are_rejected():
+    _, missing = StockDailyClient._validate_daily_columns(_daily(vol=np.nan), "600601")
+    assert missing.reasons == {"missing_value": 1}
+    assert missing.rejected_dates == [date(2024, 1, 3)]
+    _, out_of_range = StockDailyClient._validate_daily_columns(_daily(hfq_factor=2e4), "600601")
+    assert out_of_range.reasons == {"out_of_range": 1}
+    _, non_positive = StockDailyClient._validate_daily_columns(_daily(close=0.0), "600601")
+    assert non_positive.reasons == {"non_positive_price": 1}
+
+def test_bad_close_rejects_only_its_row():
+    # 收盘价缺失或为 0 的交易日只拒绝该行，同一股票的其他交易日照常入库
+    raw = _daily().drop(columns=["qfq_factor", "hfq_factor"]).set_index("date")
+    raw.index = pd.to_datetime(raw.index)
+    raw.loc[raw.index[1], "close"] = 0.0
+    raw.loc[raw.index[2], "close"] = np.nan
+    qfq_close = (raw["close"] * 0.8).to_frame("qfq_close")
+    hfq_close = (raw["close"] * 3.0).to_frame("hfq_close")
+    columns, summary = StockDailyClient._transform_stock_daily(
+        StockDailyClient._frame_to_columns(raw),
+        StockDailyClient._frame_to_columns(qfq_close),
+        StockDailyClient._frame_to_columns(hfq_close),
+        "600601",
+    )
+    assert (summary.accepted, summary.rejected) == (1, 2)
+    assert summary.rejected_dates == [date(2024, 1, 3), date(2024, 1, 4)]
+    assert columns["date"].tolist() == [date(2024, 1, 2)]
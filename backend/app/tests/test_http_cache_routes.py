@@ -0,0 +1,95 @@
+from datetime import date
+from types import SimpleNamespace
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api import stock_router, trade_calendar_router
+from app.config.rate_limit import rate_limit_settings
+from app.services.stock_daily_service import StockDailyService
+from app.services.trade_calendar_service import TradeCalendarService
+from app.utils import http_cache
+from app.utils.auth_utils import is_user_authenticated
+
+LAST_DATE = date(2024, 1, 5)
+
+class FakeDailyService:
+    """记录调用的日线服务，304 快速路径不应调用任何方法"""
+    def __init__(self, make_bars):
+        self.calls = []
+        self._make_bars = make_bars
+
+    async def get_daily_meta(self, stock_code):
+        self.calls.append("get_daily_meta")
+        return SimpleNamespace(data_version=1, last_date=LAST_DATE)
+
+    async def get_daily_bars(self, stock_code, start_date, end_date, adjust):
+        self.calls.append("get_daily_bars")
+        return self._make_bars(stock_code, days=5)
+
+class FakeCalendarService:
+    def __init__(self):
+        self.calls = []
+
+    async def get_calendar_version(self, exchange_code):
+        self.calls.append("get_calendar_version")
+        return LAST_DATE
+
+@pytest.fixture
+def client(monkeypatch, make_bars):
+    """只挂载日线与交易日历路由，跳过身份验证与限流，资源版本镜像保存在内存中"""
+    versions = {}
+
+    async def get_resource_version(kind, key):
+        return versions.get((kind, key))
+
+    monkeypatch.setattr(http_cache, "get_resource_version", get_resource_version)
+    monkeypatch.setattr(rate_limit_settings, "RATE_LIMIT_ENABLED", False)
+    app = FastAPI()
+    app.include_router(stock_router.router)
+    app.include_router(trade_calendar_router.router)
+    daily_service, calendar_service = FakeDailyService(make_bars), FakeCalendarService()
+    app.dependency_overrides[is_user_authenticated] = lambda: True
+    app.dependency_overrides[stock_router.get_stock_daily_service] = lambda: daily_service
+    app.dependency_overrides[trade_calendar_router.get_trade_calendar_service] = lambda: calendar_service
+    with TestClient(app) as test_client:
+        yield SimpleNamespace(http=test_client, versions=versions, daily=daily_service, calendar=calendar_service)
+
+def test_daily_is_private_and_revalidates_from_mirrored_version(client):
+    params = {"stock_code": "600000"}
+    response = client.http.get("/stock/daily", params=params)
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "private, max-age=60"
+    assert response.headers["vary"] == "Accept, Accept-Encoding"
+    etag = response.headers["etag"]
+
+    # 版本已镜像到 Redis：直接返回 304，不调用服务
+    client.versions[(StockDailyService.VERSION_KIND, "600000")] = StockDailyService.daily_version(1, LAST_DATE)
+    client.daily.calls.clear()
+    not_modified = client.http.get("/stock/daily", params=params, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+    assert not_modified.headers["cache-control"] == "private, max-age=60"
+    assert client.daily.calls == []
+
+def test_daily_revalidates_from_database_without_mirrored_version(client):
+    params = {"stock_code": "600000"}
+    etag = client.http.get("/stock/daily", params=params).headers["etag"]
+    client.daily.calls.clear()
+    not_modified = client.http.get("/stock/daily", params=params, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert client.daily.calls == ["get_daily_meta"]
+
+def test_latest_trading_day_is_private_and_revalidates(client):
+    params = {"exchange_code": "SH"}
+    response = client.http.get("/calendar/latest-trading-day", params=params)
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "private, max-age=300"
+    assert "public" not in response.headers["cache-control"]
+
+    client.versions[(TradeCalendarService.VERSION_KIND, "SH")] = LAST_DATE.isoformat()
+    client.calendar.calls.clear()
+    not_modified = client.http.get("/calendar/latest-trading-day", params=params, headers={"If-None-Match": response.headers["etag"]})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["cache-control"] == "private, max-age=300"
+    assert client.calendar.calls == []
@@ -0,0 +1,83 @@
+import asyncio
+import pickle
+import pytest
+from app.core import cache_utlis
+from app.core.database import LazyAsyncSession, get_async_db, pool_stats
+from app.api.stock_router import get_stock_daily_service, get_stock_info_service
+from app.api.trade_calendar_router import get_trade_calendar_service
+
+CACHED_RESULT = {"cached": True}
+
+@pytest.fixture
+def all_cache_hits(monkeypatch):
+    """让 redis_cache 的每次读取都命中"""
+    async def get_cache(key):
+        return pickle.dumps(CACHED_RESULT)
+
+    async def set_cache(key, value, ttl):
+        raise AssertionError("缓存全部命中时不应写入缓存")
+
+    monkeypatch.setattr(cache_utlis, "get_cache", get_cache)
+    monkeypatch.setattr(cache_utlis, "set_cache", set_cache)
+
+@pytest.fixture
+def session_tracker(monkeypatch):
+    """记录请求过程中创建的会话"""
+    created = []
+    original_init = LazyAsyncSession.__init__
+
+    def tracking_init(self, *args, **kwargs):
+        original_init(self, *args, **kwargs)
+        created.append(self)
+
+    monkeypatch.setattr(LazyAsyncSession, "__init__", tracking_init)
+    return created
+
+async def _request(service_dependency, call):
+    """按 FastAPI 的依赖注入顺序处理一次请求：获取会话、构造服务、调用服务、关闭会话"""
+    async for db in get_async_db():
+        service = await service_dependency(db)
+        return await call(service)
+
+def test_cache_hits_do_not_check_out_connections(all_cache_hits, session_tracker):
+    checkouts_before = {role: stats["checkouts"] for role, stats in pool_stats.items()}
+
+    async def workload():
+        for _ in range(20):
+            assert await _request(get_stock_daily_service, lambda s: s.get_daily_bars("000001", "20240101", "20240131")) == CACHED_RESULT
+            assert await _request(get_stock_info_service, lambda s: s.get_info_data("000001")) == CACHED_RESULT
+            assert await _request(get_trade_calendar_service, lambda s: s.get_trade_calendar_data("SH")) == CACHED_RESULT
+
+    asyncio.run(workload())
+    assert len(session_tracker) == 60
+    assert not any(session.materialized for session in session_tracker)
+    assert {role: stats["checkouts"] for role, stats in pool_stats.items()} == checkouts_before
+
+def test_session_created_on_first_use():
+    class FakeSession:
+        closed = False
+
+        async def execute(self, statement):
+            return statement
+
+        async def close(self):
+            self.closed = True
+
+    created = []
+
+    def factory():
+        created.append(FakeSession())
+        return created[-1]
+
+    async def scenario():
+        session = LazyAsyncSession(factory)
+        assert not session.materialized
+        assert await session.execute("SELECT 1") == "SELECT 1"
+        assert await session.execute("SELECT 2") == "SELECT 2"
+        await session.close()
+        return session
+
+    session = asyncio.run(scenario())
+    assert session.materialized
+    assert len(created) == 1
+    assert created[0].closed
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import time
+from datetime import datetime
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from app.api import stock_router, user_router
+from app.config.password import password_settings
+from app.config.rate_limit import rate_limit_settings
+from app.core import password_executor
+from app.core.password_executor import PasswordHashBusyError, run_password_hash, shutdown_password_executor
+from app.models.user_orm import UserOrm, UserRoleEnum, UserStatusEnum
+from app.services.user_service import UserService
+from app.utils import password_utils
+from app.utils.auth_utils import is_user_authenticated
+from app.utils.password_utils import get_password_hash
+
+# python -m app.core.password_executor 的轻量版本：少量并发登录，确认哈希都在线程池中执行、登录期间其他请求仍能完成。
+# 延迟只做宽松的上限检查，精确的延迟对比由完整的负载测试给出
+LOGIN_BURST, PROBE_INTERVAL, MAX_PROBE_LATENCY = 4, 0.02, 1.0
+TEST_USERNAME, TEST_PASSWORD = "loadtest", "securepassword123"
+
+@pytest.fixture
+def password_pool(monkeypatch):
+    monkeypatch.setattr(password_settings, "PASSWORD_HASH_POOL_SIZE", 2)
+    shutdown_password_executor()
+    yield
+    shutdown_password_executor()
+
+def test_hash_runs_in_pool_threads(password_pool):
+    assert asyncio.run(run_password_hash(lambda: threading.current_thread().name)).startswith("password-hash")
+
+def test_pending_hashes_beyond_limit_are_rejected(password_pool, monkeypatch):
+    monkeypatch.setattr(password_settings, "PASSWORD_HASH_MAX_PENDING", 3)
+    release = threading.Event()
+
+    async def scenario():
+        tasks = [asyncio.create_task(run_password_hash(release.wait, 5)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(PasswordHashBusyError):
+            await run_password_hash(release.wait, 5)
+        release.set()
+        return await asyncio.gather(*tasks)
+
+    assert asyncio.run(scenario()) == [True] * 3
+    assert password_executor._pending == 0
+
+def test_login_burst_does_not_stall_other_requests(password_pool, monkeypatch, make_bars):
+    monkeypatch.setattr(rate_limit_settings, "RATE_LIMIT_ENABLED", False)
+    hashed_password = get_password_hash(TEST_PASSWORD)
+    daily_bars = make_bars("000001", days=20)
+    hash_threads = []
+
+    async def recording_run_password_hash(func, *args, **kwargs):
+        """记录每次哈希实际执行所在的线程"""
+        def run(*args, **kwargs):
+            hash_threads.append(threading.current_thread().name)
+            return func(*args, **kwargs)
+        return await run_password_hash(run, *args, **kwargs)
+
+    monkeypatch.setattr(password_utils, "run_password_hash", recording_run_password_hash)
+
+    class MemoryUserRepository:
+        async def find_active_by_username(self, username):
+            return UserOrm(id=1, username=username, email="loadtest@example.com", nickname=username,
+                           hashed_password=hashed_password, status=UserStatusEnum.enabled, role=UserRoleEnum.user, created_at=datetime.now())
+
+        async def update_password(self, username, hashed_password):
+            return True
+
+    class MemoryDailyService:
+        async def get_daily_bars(self, *args, **kwargs):
+            return daily_bars
+
+    def memory_user_service():
+        service = UserService(None)
+        service._repository = MemoryUserRepository()
+        return service
+
+    app = FastAPI()
+    app.include_router(stock_router.router)
+    app.include_router(user_router.router)
+    app.dependency_overrides[user_router.get_user_service] = memory_user_service
+    app.dependency_overrides[stock_router.get_stock_daily_service] = MemoryDailyService
+    app.dependency_overrides[is_user_authenticated] = lambda: True
+
+    async def scenario():
+        latencies, stop = [], asyncio.Event()
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            async def probe():
+                # 延迟从计划发起的时刻算起，事件循环被阻塞的时间也计入
+                scheduled = time.perf_counter()
+                while not stop.is_set():
+                    await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                    response = await client.post("/stock/daily", json={"stock_code": "000001"})
+                    latencies.append(time.perf_counter() - scheduled)
+                    assert response.json()["status"] == 0
+                    scheduled = max(scheduled + PROBE_INTERVAL, time.perf_counter())
+
+            probe_task = asyncio.create_task(probe())
+            logins = await asyncio.gather(*(
+                client.post("/user/login", json={"username": TEST_USERNAME, "password": TEST_PASSWORD})
+                for _ in range(LOGIN_BURST)
+            ))
+            stop.set()
+            await probe_task
+        return logins, latencies
+
+    logins, latencies = asyncio.run(scenario())
+    assert all(response.json()["status"] == 0 for response in logins)
+    # 每次登录的 bcrypt 校验都在密码哈希线程中执行，而不是在事件循环线程内
+    assert len(hash_threads) == LOGIN_BURST
+    assert all(name.startswith("password-hash") for name in hash_threads)
+    assert latencies and max(latencies) < MAX_PROBE_LATENCY
@@ -0,0 +1,81 @@
+import asyncio
+from datetime import date
+from app.services.post_close_pipeline import PostClosePipeline, STAGES
+
+TRADE_DATE = date(2024, 6, 3)
+
+class RecordingPipeline(PostClosePipeline):
+    """各阶段只记录调用顺序，执行记录写入内存"""
+    def __init__(self, latest_trade_date: date = TRADE_DATE, failing_stage: str = None, leader_until: str = None):
+        self.calls = []
+        self.finished = []
+        self._latest_trade_date = latest_trade_date
+        self._failing_stage = failing_stage
+        self._leader_until = leader_until
+        super().__init__(is_leader=lambda: self._leader_until not in self.calls)
+
+    def _call(self, name: str) -> dict:
+        self.calls.append(name)
+        if name == self._failing_stage:
+            raise RuntimeError(f"{name} 失败")
+        return {}
+
+    async def _refresh_calendar(self, context):
+        context.latest_trade_dates.update({"SH": self._latest_trade_date, "SZ": self._latest_trade_date})
+        return self._call("calendar")
+
+    async def _sync_daily(self, context):
+        context.synced_codes.append("600000")
+        return self._call("daily_sync")
+
+    async def _invalidate_caches(self, context):
+        assert context.synced_codes == ["600000"]
+        return self._call("cache_invalidation")
+
+    async def _warm_up(self, context):
+        return self._call("warm_up")
+
+    async def _already_succeeded(self, trade_date):
+        return False
+
+    async def _record_start(self, trade_date, started_at):
+        return 1
+
+    async def _record_finish(self, run_id, result):
+        self.finished.append(result)
+
+def _statuses(result: dict) -> list:
+    return [stage["status"] for stage in result["stages"]]
+
+def test_stages_run_in_order_on_trade_day():
+    pipeline = RecordingPipeline()
+    result = asyncio.run(pipeline.run(TRADE_DATE))
+    assert pipeline.calls == list(STAGES)
+    assert result["status"] == "success"
+    assert _statuses(result) == ["success"] * 4
+    assert pipeline.finished == [result]
+    stats = pipeline.stats()
+    assert all(stats["stages"][name]["runs"] == 1 for name in STAGES)
+    assert stats["runs"] == {"success": 1}
+
+def test_non_trade_day_skips_after_calendar():
+    pipeline = RecordingPipeline(latest_trade_date=date(2024, 5, 31))
+    result = asyncio.run(pipeline.run(date(2024, 6, 1)))
+    assert pipeline.calls == ["calendar"]
+    assert result["status"] == "skipped"
+    assert _statuses(result) == ["success", "skipped", "skipped", "skipped"]
+
+def test_failed_stage_stops_downstream():
+    pipeline = RecordingPipeline(failing_stage="daily_sync")
+    result = asyncio.run(pipeline.run(TRADE_DATE))
+    assert pipeline.calls == ["calendar", "daily_sync"]
+    assert result["status"] == "failed"
+    assert _statuses(result) == ["success", "failed", "skipped", "skipped"]
+    assert pipeline.stats()["stages"]["daily_sync"]["failures"] == 1
+
+def test_lost_leadership_aborts():
+    pipeline = RecordingPipeline(leader_until="daily_sync")
+    result = asyncio.run(pipeline.run(TRADE_DATE))
+    assert pipeline.calls == ["calendar", "daily_sync"]
+    assert result["status"] == "aborted"
+    assert _statuses(result) == ["success", "success", "aborted", "skipped"]
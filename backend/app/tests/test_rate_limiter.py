@@ -0,0 +1,44 @@
+import asyncio
+import json
+import pytest
+from app.config.rate_limit import rate_limit_settings
+from app.core import rate_limiter as rate_limiter_module
+from app.core.rate_limiter import (
+    ANONYMOUS_ROLE, UPSTREAM_COST_CLASS, RateLimitCostTooLarge, acquire_upstream_budget, rate_limit_exceeded_handler, rate_limiter,
+)
+
+@pytest.fixture
+def script_calls(monkeypatch):
+    """用总是放行的脚本代替 Redis，记录每次计数的参数"""
+    calls = []
+
+    async def script(keys, args):
+        calls.append(args)
+        return [1, 0, 0]
+
+    monkeypatch.setattr(rate_limit_settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(rate_limiter, "_script", script)
+    return calls
+
+def _acquire(cost: int) -> None:
+    async def scenario():
+        rate_limiter_module._current_identity.set(("ip:127.0.0.1", ANONYMOUS_ROLE))
+        await acquire_upstream_budget(cost)
+
+    asyncio.run(scenario())
+
+def test_upstream_cost_at_limit_is_counted(script_calls):
+    limit = rate_limiter.limit_for(ANONYMOUS_ROLE, UPSTREAM_COST_CLASS)
+    _acquire(limit)
+    assert [args[2] for args in script_calls] == [limit]
+
+def test_upstream_cost_over_limit_is_rejected_as_bad_request(script_calls):
+    # 超过每个窗口额度的批量补齐重试也无法通过，不计数，直接返回 400 而不是 429
+    limit = rate_limiter.limit_for(ANONYMOUS_ROLE, UPSTREAM_COST_CLASS)
+    with pytest.raises(RateLimitCostTooLarge) as exc_info:
+        _acquire(limit + 1)
+    assert script_calls == []
+    response = asyncio.run(rate_limit_exceeded_handler(None, exc_info.value))
+    assert response.status_code == 400
+    assert "retry-after" not in response.headers
+    assert json.loads(response.body)["statusInfo"]["detail"]["limit"] == limit
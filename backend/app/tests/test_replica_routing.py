@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, insert, select, update
+from app.core import database
+from app.core.database import RoutingSession, read_from_replica, _read_replication_lag
+
+metadata = MetaData()
+# 主库与副本各写入一行不同的来源标记，查询结果即可说明语句在哪个库上执行
+marker = Table("marker", metadata, Column("id", Integer, primary_key=True), Column("source", String(16)))
+
+@pytest.fixture
+def primary(monkeypatch):
+    """用两个内存 SQLite 库模拟主库与副本，返回主库引擎，副本默认可用"""
+    engines = {}
+    for source in ("primary", "replica"):
+        engine = create_engine("sqlite://")
+        metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(insert(marker).values(id=1, source=source))
+        engines[source] = engine
+    monkeypatch.setattr(database, "replica_engine", SimpleNamespace(sync_engine=engines["replica"]))
+    monkeypatch.setattr(database.replica_monitor, "_available", True)
+    return engines["primary"]
+
+def _source(session: RoutingSession, replica: bool = True) -> str:
+    stmt = select(marker.c.source).where(marker.c.id == 1)
+    return session.execute(read_from_replica(stmt) if replica else stmt).scalar_one()
+
+def test_marked_reads_go_to_replica(primary):
+    with RoutingSession(bind=primary) as session:
+        assert _source(session) == "replica"
+        assert _source(session, replica=False) == "primary"
+
+def test_reads_fall_back_to_primary_when_replica_lags(primary, monkeypatch):
+    monkeypatch.setattr(database.replica_monitor, "_available", False)
+    with RoutingSession(bind=primary) as session:
+        assert _source(session) == "primary"
+
+def test_reads_stay_on_primary_after_write(primary):
+    with RoutingSession(bind=primary) as session:
+        assert _source(session) == "replica"
+        session.execute(insert(marker).values(id=2, source="primary"))
+        session.commit()
+        assert _source(session) == "primary"
+        assert session.execute(read_from_replica(select(marker.c.id).where(marker.c.id == 2))).scalar_one() == 2
+
+def test_update_statement_pins_session_to_primary(primary):
+    with RoutingSession(bind=primary) as session:
+        session.execute(update(marker).where(marker.c.id == 1).values(source="primary"))
+        assert _source(session) == "primary"
+
+def test_replication_lag_parsing():
+    class FakeConnection:
+        def __init__(self, row):
+            self._row = row
+
+        def exec_driver_sql(self, sql):
+            return SimpleNamespace(mappings=lambda: SimpleNamespace(first=lambda: self._row))
+
+    assert _read_replication_lag(FakeConnection({"Seconds_Behind_Source": 3})) == 3.0
+    assert _read_replication_lag(FakeConnection({"Seconds_Behind_Master": 0})) == 0.0
+    # 复制线程未运行
+    assert _read_replication_lag(FakeConnection({"Seconds_Behind_Source": None})) is None
+    # 不是副本
+    assert _read_replication_lag(FakeConnection(None)) is None
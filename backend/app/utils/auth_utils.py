@@ -1,34 +1,42 @@
 from fastapi import Depends
-from app.core.token_utils import oauth2_scheme,decode_access_token
+from app.core.token_utils import oauth2_scheme, decode_access_token_cached
+from app.core.token_revocation import token_revocation_list
 from loguru import logger
 from typing import Optional
 
 
+async def verify_access_token(token: str) -> dict:
+    """
+    验证 token 并返回其声明：签名验证结果按 token 缓存到过期，
+    再对照本地的吊销列表快照检查是否已登出或所属用户已被封禁。
+    验证失败或已吊销时抛出 ValueError。
+    """
+    claims = decode_access_token_cached(token)
+    if await token_revocation_list.is_revoked(claims):
+        raise ValueError("Token已被吊销")
+    return claims
+
 async def get_current_username(token: str = Depends(oauth2_scheme)) -> Optional[str]:
     """
-    解析 token，返回 username。 
-    如果 token 无效或解析失败，直接抛出 HTTPException 异常。
+    解析 token，返回 username。
+    如果 token 无效、已吊销或解析失败，返回 None。
     """
     try:
-        # 解码 token，获取 payload 数据
-        payload = decode_access_token(token)
+        payload = await verify_access_token(token)
         # 从 payload 中获取用户名
         username = payload.get("sub")
         return username  # 如果解析成功，返回用户名
     except Exception as e:
         logger.error(f"Token 解析失败: {e}")
         return None
-    
+
 async def is_user_authenticated(token: str = Depends(oauth2_scheme)) -> bool:
     """
     解析 token，成功返回 True，失败返回 False
     """
     try:
-        # 解码 token，获取 payload 数据
-        payload = decode_access_token(token)
-        # 从 payload 中获取用户名
-        username = payload.get("sub")
+        await verify_access_token(token)
         return True  # 如果解析成功，返回True
     except Exception as e:
         logger.error(f"Token 解析失败: {e}")
-        return False
\ No newline at end of file
+        return False
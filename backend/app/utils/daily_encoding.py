@@ -0,0 +1,283 @@
+import gzip
+import importlib.util
+import json
+import struct
+import numpy as np
+from typing import Dict, List, Optional, Union
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from app.schemas.api_response import APIResponse
+from app.schemas.daily_bars import DailyBars, DailyBarsBatch, DAILY_BAR_FIELDS, DAILY_BAR_DTYPES, DAILY_BAR_SCALES
+from app.utils.response_utils import success_response
+
+# Arrow 输出为可选功能；pyarrow 导入耗时较长，启动时只检查是否已安装，第一次输出 Arrow 格式时才导入
+ARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+try:
+    import brotli
+except ImportError:  # brotli 压缩为可选功能
+    brotli = None
+
+# 支持的日线数据格式及其媒体类型，row 为原有的逐行 JSON 格式
+ROW_MEDIA_TYPE = "application/json"
+COLUMNAR_MEDIA_TYPE = "application/vnd.ashare.daily.columnar+json"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+BINARY_MEDIA_TYPE = "application/vnd.ashare.daily.binary"
+MEDIA_TYPE_FORMATS = {
+    ROW_MEDIA_TYPE: "row",
+    COLUMNAR_MEDIA_TYPE: "columnar",
+    ARROW_MEDIA_TYPE: "arrow",
+    BINARY_MEDIA_TYPE: "binary",
+}
+FORMAT_MEDIA_TYPES = {fmt: media_type for media_type, fmt in MEDIA_TYPE_FORMATS.items()}
+
+# 日线字段及其在二进制格式中的类型，日期为自 1970-01-01 起的天数
+DAILY_FIELDS = DAILY_BAR_FIELDS
+BINARY_FIELD_DTYPES = {field: "<f8" for field in DAILY_FIELDS}
+BINARY_FIELD_DTYPES.update({"date": "<i4", "vol": "<i8"})
+
+# 二进制帧头：魔数、版本号、股票代码长度、行数
+BINARY_MAGIC = b"ASDB"
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<4sBBI")
+
+# 小于该字节数的响应不压缩
+MIN_COMPRESS_SIZE = 1024
+
+def negotiate_daily_format(accept: Optional[str]) -> str:
+    """
+    根据 Accept 请求头选择日线数据格式，按 q 值从高到低取第一个支持的格式，均不支持时使用 row
+    :param accept: Accept 请求头
+    :return: row / columnar / arrow / binary
+    """
+    for media_type in _parse_quality_header(accept):
+        fmt = MEDIA_TYPE_FORMATS.get(media_type)
+        if fmt == "arrow" and not ARROW_AVAILABLE:
+            continue
+        if fmt:
+            return fmt
+    return "row"
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    根据 Accept-Encoding 请求头选择压缩方式，优先 brotli（已安装时），其次 gzip
+    :param accept_encoding: Accept-Encoding 请求头
+    :return: br / gzip / None
+    """
+    encodings = _parse_quality_header(accept_encoding)
+    if brotli is not None and "br" in encodings:
+        return "br"
+    if "gzip" in encodings:
+        return "gzip"
+    return None
+
+def _parse_quality_header(value: Optional[str]) -> List[str]:
+    """解析带 q 值的请求头，返回按 q 值降序排列且 q 不为 0 的取值"""
+    if not value:
+        return []
+    weighted = []
+    for position, part in enumerate(value.split(",")):
+        token, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if token and quality > 0:
+            weighted.append((-quality, position, token.lower()))
+    return [token for _, _, token in sorted(weighted)]
+
+def compress(body: bytes, encoding: Optional[str]) -> bytes:
+    """按指定方式压缩响应体"""
+    if encoding == "br":
+        return brotli.compress(body, quality=4)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=5)
+    return body
+
+def encode_columnar(bars: Optional[DailyBars]) -> Optional[dict]:
+    """
+    将日线数据编码为列式 JSON 结构（每个字段一个数组，价格为数字而非字符串）
+    """
+    if bars is None or not len(bars):
+        return None
+    return {
+        "stock_code": bars.stock_code,
+        "data_count": len(bars),
+        "start_date": bars.start_date.isoformat(),
+        "end_date": bars.end_date.isoformat(),
+        "adjust": bars.adjust,
+        "columns": {
+            "date": np.datetime_as_string(bars.date).tolist(),
+            **{field: getattr(bars, field).tolist() for field in DAILY_FIELDS[1:]},
+        },
+    }
+
+def encode_json_rows(bars: DailyBars) -> List[str]:
+    """
+    将日线数据逐行编码为紧凑 JSON 字符串（日期与数值按数据库精度输出为字符串，与逐行响应的格式一致），
+    用于 NDJSON 等流式输出
+    """
+    if not len(bars):
+        return []
+    template = ",".join(
+        [f'{{"stock_code":{json.dumps(bars.stock_code)}', '"date":"%s"']
+        + [f'"{field}":"%.{DAILY_BAR_SCALES[field]}f"' if field in DAILY_BAR_SCALES else f'"{field}":%d' for field in DAILY_FIELDS[1:]]
+    ) + "}"
+    values = [np.datetime_as_string(bars.date).tolist()] + [getattr(bars, field).tolist() for field in DAILY_FIELDS[1:]]
+    return [template % row for row in zip(*values)]
+
+def encode_arrow(bars_list: List[DailyBars], errors: Optional[Dict[str, str]] = None) -> bytes:
+    """
+    将多只股票的日线数据编码为一个 Arrow IPC 流，附加 stock_code 列，错误信息放在 schema 元数据中
+    """
+    if not ARROW_AVAILABLE:
+        raise RuntimeError("未安装 pyarrow，无法输出 Arrow 格式")
+    import pyarrow as pa
+    arrays = {"stock_code": pa.array(
+        np.concatenate([np.full(len(bars), bars.stock_code, dtype=object) for bars in bars_list]) if bars_list else [],
+        type=pa.string()
+    )}
+    for field in DAILY_FIELDS:
+        columns = [getattr(bars, field) for bars in bars_list]
+        arrays[field] = pa.array(np.concatenate(columns) if columns else np.empty(0, dtype=DAILY_BAR_DTYPES[field]))
+    adjust = bars_list[0].adjust if bars_list else "none"
+    table = pa.table(arrays).replace_schema_metadata({"errors": json.dumps(errors or {}), "adjust": adjust})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def encode_binary(bars_list: List[DailyBars]) -> bytes:
+    """
+    将多只股票的日线数据编码为紧凑二进制格式，每只股票一帧：
+    帧头（魔数 ASDB、版本、股票代码长度、行数）+ 股票代码 + 按 DAILY_FIELDS 顺序排列的小端列数组
+    """
+    frames = []
+    for bars in bars_list:
+        code = bars.stock_code.encode()
+        frames.append(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, len(code), len(bars)))
+        frames.append(code)
+        frames.extend(
+            getattr(bars, field).astype(BINARY_FIELD_DTYPES[field], copy=False).tobytes()
+            for field in DAILY_FIELDS
+        )
+    return b"".join(frames)
+
+def decode_binary(payload: bytes) -> Dict[str, DailyBars]:
+    """
+    解析 encode_binary 生成的二进制数据
+    :return: 股票代码到 DailyBars 的映射
+    """
+    result, offset = {}, 0
+    while offset < len(payload):
+        magic, version, code_length, row_count = BINARY_HEADER.unpack_from(payload, offset)
+        if magic != BINARY_MAGIC or version != BINARY_VERSION:
+            raise ValueError("无法识别的日线二进制数据")
+        offset += BINARY_HEADER.size
+        code = payload[offset:offset + code_length].decode()
+        offset += code_length
+        columns = {}
+        for field in DAILY_FIELDS:
+            dtype = np.dtype(BINARY_FIELD_DTYPES[field])
+            columns[field] = np.frombuffer(payload, dtype=dtype, count=row_count, offset=offset)
+            offset += dtype.itemsize * row_count
+        columns["date"] = columns["date"].astype("datetime64[D]")
+        result[code] = DailyBars.from_columns(code, columns)
+    return result
+
+def encode_daily(
+    data: Union[DailyBars, DailyBarsBatch, None],
+    fmt: str,
+    message: str
+) -> tuple[bytes, Dict[str, str]]:
+    """
+    按指定格式编码单只或批量日线数据
+    :return: 响应体与附加的响应头
+    """
+    if isinstance(data, DailyBarsBatch):
+        bars_list, errors = [bars for bars in data.bars.values() if bars is not None], data.errors
+    else:
+        bars_list, errors = ([data] if data is not None and len(data) else []), {}
+    if fmt == "row":
+        response_data = data.to_response() if data is not None else None
+        body = json.dumps(jsonable_encoder(success_response(data=response_data, message=message)), ensure_ascii=False).encode()
+        return body, {}
+    if fmt == "columnar":
+        if isinstance(data, DailyBarsBatch):
+            payload = {"data": {code: encode_columnar(bars) for code, bars in data.bars.items()}, "errors": errors}
+        else:
+            payload = encode_columnar(data)
+        body = json.dumps(success_response(data=payload, message=message).model_dump(), ensure_ascii=False).encode()
+        return body, {}
+    headers = {"X-Stock-Errors": json.dumps(errors)} if errors else {}
+    if bars_list:
+        headers["X-Daily-Adjust"] = bars_list[0].adjust
+    if fmt == "arrow":
+        return encode_arrow(bars_list, errors), headers
+    return encode_binary(bars_list), headers
+
+def daily_response(
+    request: Request,
+    data: Union[DailyBars, DailyBarsBatch, None],
+    message: str
+) -> Union[APIResponse, Response]:
+    """
+    根据 Accept / Accept-Encoding 请求头返回日线数据。
+    未请求其他格式或压缩时返回原有的 APIResponse，保持默认行为不变。
+    """
+    fmt = negotiate_daily_format(request.headers.get("accept"))
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    if fmt == "row" and encoding is None:
+        return success_response(data=data.to_response() if data is not None else None, message=message)
+    body, headers = encode_daily(data, fmt, message)
+    headers["Vary"] = "Accept, Accept-Encoding"
+    if encoding is not None and len(body) >= MIN_COMPRESS_SIZE:
+        body = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=FORMAT_MEDIA_TYPES[fmt], headers=headers)
+
+if __name__ == "__main__":
+    # 基准测试：python -m app.utils.daily_encoding [行数]
+    # 输出各格式的响应体大小与服务端编码耗时（含压缩）
+    import sys
+    import time
+    from loguru import logger
+
+    logger.remove()
+    logger.add(lambda message: print(message, end=""), level="INFO", format="{message}")
+    ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    ROUNDS = 20
+
+    def make_bars(rows: int) -> DailyBars:
+        rng = np.random.default_rng(0)
+        closes = np.round(10 + np.cumsum(rng.normal(0, 0.1, rows)).clip(-9, None), 2)
+        return DailyBars.from_columns("000001", {
+            "date": np.datetime64("2000-01-04") + np.arange(rows),
+            "open": closes - 0.05, "high": closes + 0.12, "low": closes - 0.11, "close": closes,
+            "change": np.full(rows, 0.03), "pct_chg": np.full(rows, 0.3),
+            "vol": rng.integers(1e5, 1e7, rows), "amount": np.round(rng.uniform(1e6, 1e9, rows), 2),
+            "qfq_factor": np.ones(rows), "hfq_factor": np.full(rows, 3.2154),
+        })
+
+    bars = make_bars(ROWS)
+    decoded = decode_binary(encode_binary([bars]))["000001"]
+    assert len(decoded) == ROWS and decoded.start_date == bars.start_date
+    assert np.array_equal(decoded.close, bars.close)
+    assert json.loads(encode_json_rows(bars)[0])["close"] == str(bars.to_response().daily[0].close)
+
+    formats = ["row", "columnar", "binary"] + (["arrow"] if ARROW_AVAILABLE else [])
+    encodings = [None, "gzip"] + (["br"] if brotli is not None else [])
+    logger.info(f"行数: {ROWS}，每项取 {ROUNDS} 次编码的中位数")
+    logger.info(f"{'格式':<10}{'压缩':<8}{'大小(KB)':>12}{'编码耗时(ms)':>16}")
+    for fmt in formats:
+        for encoding in encodings:
+            costs = []
+            for _ in range(ROUNDS):
+                start_time = time.perf_counter()
+                body, _ = encode_daily(bars, fmt, "成功获取股票日线数据")
+                body = compress(body, encoding)
+                costs.append(time.perf_counter() - start_time)
+            logger.info(f"{fmt:<10}{encoding or '-':<8}{len(body) / 1024:>12.1f}{np.median(costs) * 1000:>16.2f}")
@@ -0,0 +1,152 @@
+import numpy as np
+from app.schemas.daily_bars import DailyBars, DAILY_BAR_FIELDS
+
+# 支持的降采样方法
+DOWNSAMPLE_METHODS = ("lttb", "ohlc")
+
+class DownsampleError(Exception):
+    """降采样异常"""
+    pass
+
+def _bucket_starts(length: int, buckets: int) -> np.ndarray:
+    """把 [0, length) 均匀划分为 buckets 个非空区间，返回各区间的起始位置"""
+    return np.floor(np.linspace(0, length, buckets + 1)[:-1]).astype(np.int64)
+
+def _triangle_areas(x: np.ndarray, y: np.ndarray, ax: np.ndarray, ay: np.ndarray, cx: np.ndarray, cy: np.ndarray) -> np.ndarray:
+    """点 (x, y) 与锚点 (ax, ay)、(cx, cy) 构成的三角形面积的两倍"""
+    return np.abs((ax - cx) * (y - ay) - (ax - x) * (cy - ay))
+
+def lttb_indices(y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets 降采样，返回保留点的升序位置，首尾两点总是保留，横坐标为位置序号
+
+    经典 LTTB 以上一个桶已选中的点作为锚点，桶之间串行依赖。这里把各桶补齐为等宽的二维矩阵，
+    先以上一个桶的均值为锚点一次性选出全部桶的点，之后只对锚点（上一个桶的选点）发生变化的桶重新选点，
+    直到没有桶需要重算。第 k 轮之后前 k 个桶的选点必然确定，因此一定收敛，且结果与逐桶循环的实现完全相同；
+    实际数据通常两三轮内收敛，且从第三轮起只需重算少数几个桶
+    """
+    length = len(y)
+    if max_points < 3:
+        raise DownsampleError(f"LTTB 至少需要保留 3 个点，当前为 {max_points}")
+    if length <= max_points:
+        return np.arange(length)
+    y = np.asarray(y, dtype=np.float64)
+    # 去掉首尾两点后划分 max_points - 2 个桶，各桶长度至多相差 1
+    starts = 1 + _bucket_starts(length - 2, max_points - 2)
+    ends = np.r_[starts[1:], length - 1]
+    buckets = len(starts)
+    # 较短的桶用本桶最后一个点补齐，重复点的面积与原点相同，argmax 取第一个，不会选中补齐的列
+    positions = np.minimum(starts[:, None] + np.arange(int((ends - starts).max())), ends[:, None] - 1)
+    bucket_x, bucket_y = positions.astype(np.float64), y[positions]
+
+    mean_x = (starts + ends - 1) / 2
+    mean_y = np.add.reduceat(y[1:-1], starts - 1) / (ends - starts)
+    # 每个桶的后一个锚点为下一个桶的均值，最后一个桶为末尾的点
+    cx, cy = np.r_[mean_x[1:], length - 1], np.r_[mean_y[1:], y[-1]]
+
+    def choose(rows, ax: np.ndarray, ay: np.ndarray) -> np.ndarray:
+        """对 rows 指定的桶，以 (ax, ay) 为前一个锚点选出三角形面积最大的点"""
+        areas = _triangle_areas(bucket_x[rows], bucket_y[rows], ax[:, None], ay[:, None], cx[rows, None], cy[rows, None])
+        return positions[rows][np.arange(len(ax)), np.argmax(areas, axis=1)]
+
+    selected = choose(slice(None), np.r_[0.0, mean_x[:-1]], np.r_[y[0], mean_y[:-1]])
+    rows = np.arange(1, buckets)
+    # 第一个桶的锚点就是首个点，第一轮已确定；其余桶的锚点需替换为上一个桶的实际选点
+    while len(rows):
+        anchors = selected[rows - 1]
+        choice = choose(rows, anchors.astype(np.float64), y[anchors])
+        changed = rows[choice != selected[rows]]
+        selected[rows] = choice
+        rows = changed[changed + 1 < buckets] + 1
+    return np.r_[0, selected, length - 1]
+
+def lttb_downsample(daily_bars: DailyBars, max_points: int) -> DailyBars:
+    """按收盘价做 LTTB 降采样，保留的K线各字段保持原值"""
+    if len(daily_bars) <= max_points:
+        return daily_bars
+    return daily_bars.take(lttb_indices(daily_bars.close, max_points))
+
+def ohlc_downsample(daily_bars: DailyBars, max_points: int) -> DailyBars:
+    """
+    把日线按数量均匀分为 max_points 个桶并聚合：开盘取首、收盘取尾、最高最低取极值，
+    成交量、成交额与涨跌额求和，涨跌幅由日涨跌幅复合，日期与复权因子取桶内最后一根
+    """
+    length = len(daily_bars)
+    if max_points < 1:
+        raise DownsampleError(f"降采样后至少需要保留 1 根K线，当前为 {max_points}")
+    if length <= max_points:
+        return daily_bars
+    starts = _bucket_starts(length, max_points)
+    ends = np.r_[starts[1:], length] - 1
+    growth = np.multiply.reduceat(1 + daily_bars.pct_chg / 100, starts)
+    columns = {
+        "date": daily_bars.date[ends],
+        "open": daily_bars.open[starts],
+        "high": np.maximum.reduceat(daily_bars.high, starts),
+        "low": np.minimum.reduceat(daily_bars.low, starts),
+        "close": daily_bars.close[ends],
+        "change": np.add.reduceat(daily_bars.change, starts),
+        "pct_chg": np.round((growth - 1) * 100, 2),
+        "vol": np.add.reduceat(daily_bars.vol, starts),
+        "amount": np.add.reduceat(daily_bars.amount, starts),
+        "qfq_factor": daily_bars.qfq_factor[ends],
+        "hfq_factor": daily_bars.hfq_factor[ends],
+    }
+    return DailyBars(daily_bars.stock_code, adjust=daily_bars.adjust, **{name: columns[name] for name in DAILY_BAR_FIELDS})
+
+def downsample_daily_bars(daily_bars: DailyBars, max_points: int, method: str = "lttb") -> DailyBars:
+    """
+    按指定方法把日线降采样到不超过 max_points 根
+    :param method: lttb 或 ohlc
+    """
+    if method == "lttb":
+        return lttb_downsample(daily_bars, max_points)
+    if method == "ohlc":
+        return ohlc_downsample(daily_bars, max_points)
+    raise DownsampleError(f"不支持的降采样方法: {method}")
+
+if __name__ == "__main__":
+    # 基准测试：python -m app.utils.downsample_utils
+    # 7,000 根日线降采样到 1,000 根的耗时，并与逐桶循环的经典 LTTB 对比选点结果
+    import time
+    import timeit
+    from loguru import logger
+
+    BAR_COUNT, MAX_POINTS, REPEAT = 7_000, 1_000, 200
+    rng = np.random.default_rng(0)
+    closes = np.round(10 * np.exp(np.cumsum(rng.normal(0, 0.02, BAR_COUNT))), 2)
+    bars = DailyBars.from_columns("000001", {
+        "date": np.arange(BAR_COUNT).astype("datetime64[D]"), "open": closes, "high": closes * 1.01, "low": closes * 0.99,
+        "close": closes, "change": np.zeros(BAR_COUNT), "pct_chg": np.zeros(BAR_COUNT), "vol": np.ones(BAR_COUNT, dtype=np.int64),
+        "amount": closes, "qfq_factor": np.ones(BAR_COUNT), "hfq_factor": np.ones(BAR_COUNT),
+    })
+
+    def classic_lttb(y: np.ndarray, max_points: int) -> np.ndarray:
+        """逐桶循环的经典 LTTB，仅用于对比"""
+        length = len(y)
+        starts = np.r_[1 + _bucket_starts(length - 2, max_points - 2), length - 1]
+        selected, anchor = [0], 0
+        for bucket in range(max_points - 2):
+            lo, hi = starts[bucket], starts[bucket + 1]
+            if bucket + 2 < len(starts):
+                next_lo, next_hi = starts[bucket + 1], starts[bucket + 2]
+                cx, cy = (next_lo + next_hi - 1) / 2, y[next_lo:next_hi].mean()
+            else:
+                cx, cy = length - 1, y[-1]
+            xs = np.arange(lo, hi, dtype=np.float64)
+            anchor = lo + int(np.argmax(_triangle_areas(xs, y[lo:hi], anchor, y[anchor], cx, cy)))
+            selected.append(anchor)
+        return np.r_[selected, length - 1]
+
+    for method in DOWNSAMPLE_METHODS:
+        # 取多轮中的最小值，排除调度抖动
+        cost = min(timeit.repeat(lambda: downsample_daily_bars(bars, MAX_POINTS, method), number=REPEAT, repeat=5)) / REPEAT
+        sampled = downsample_daily_bars(bars, MAX_POINTS, method)
+        assert len(sampled) == MAX_POINTS and sampled.date[-1] == bars.date[-1]
+        logger.info(f"{method}: {BAR_COUNT} 根降采样到 {len(sampled)} 根，耗时 {cost * 1e3:.3f} ms")
+
+    started = time.perf_counter()
+    expected = classic_lttb(closes, MAX_POINTS)
+    classic_cost = time.perf_counter() - started
+    agreement = np.mean(lttb_indices(closes, MAX_POINTS) == expected)
+    logger.info(f"逐桶循环的经典 LTTB 耗时 {classic_cost * 1e3:.3f} ms，向量化实现的选点与其一致的比例 {agreement:.1%}")
@@ -0,0 +1,68 @@
+import hashlib
+import json
+from typing import Any, Optional, Union
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.schemas.api_response import APIResponse
+from app.core.cache_utlis import get_resource_version
+
+def make_etag(*parts: Any) -> str:
+    """
+    由资源版本与规范化后的请求参数计算强 ETag。
+    参数按 JSON（键排序）序列化，同一资源的同一表示得到相同的 ETag，版本或参数变化时 ETag 随之变化
+    """
+    raw = json.dumps(jsonable_encoder(parts), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return f'"{hashlib.sha256(raw.encode()).hexdigest()[:32]}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    判断 If-None-Match 请求头是否匹配 ETag，按 RFC 9110 对 If-None-Match 使用弱比较（忽略 W/ 前缀）
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+def not_modified_response(etag: str, cache_control: str, vary: Optional[str] = None) -> Response:
+    """返回不含响应体的 304 响应，携带与 200 响应相同的缓存相关头"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if vary:
+        headers["Vary"] = vary
+    return Response(status_code=304, headers=headers)
+
+async def not_modified_by_cached_version(
+    if_none_match: Optional[str],
+    kind: str,
+    key: str,
+    etag_parts: tuple,
+    cache_control: str,
+    vary: Optional[str] = None
+) -> Optional[Response]:
+    """
+    条件请求的快速路径：用 Redis 中镜像的资源版本计算 ETag，与 If-None-Match 匹配时返回 304，
+    否则返回 None，由调用方从数据库读取版本并构造响应。整个过程不访问数据库
+    :param kind: 资源类型
+    :param key: 资源标识
+    :param etag_parts: 计算 ETag 的其他部分（路径、规范化后的参数等）
+    """
+    if not if_none_match:
+        return None
+    version = await get_resource_version(kind, key)
+    if version is None:
+        return None
+    etag = make_etag(*etag_parts, version)
+    return not_modified_response(etag, cache_control, vary) if etag_matches(if_none_match, etag) else None
+
+def with_cache_headers(response: Union[APIResponse, Response], etag: str, cache_control: str, vary: Optional[str] = None) -> Response:
+    """为响应加上 ETag 与 Cache-Control，APIResponse 先序列化为 JSONResponse"""
+    if isinstance(response, APIResponse):
+        response = JSONResponse(content=jsonable_encoder(response))
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    if vary:
+        response.headers["Vary"] = vary
+    return response
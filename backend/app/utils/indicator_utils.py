@@ -0,0 +1,248 @@
+import re
+import numpy as np
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Dict, Tuple
+
+# 默认维护滚动状态的指标
+DEFAULT_INDICATORS = ("ma5", "ma10", "ma20", "ma60", "ema12", "ema26", "macd", "rsi14", "boll20")
+
+@dataclass(frozen=True)
+class IndicatorSpec:
+    """
+    指标定义：类型与参数，name 为规范化后的名称，如 ma20、macd_12_26_9、boll_20_2
+    """
+    kind: str
+    params: Tuple[float, ...]
+
+    @property
+    def name(self) -> str:
+        if self.kind in ("ma", "ema", "rsi"):
+            return f"{self.kind}{int(self.params[0])}"
+        return "_".join([self.kind, *(f"{param:g}" for param in self.params)])
+
+    @property
+    def outputs(self) -> Tuple[str, ...]:
+        """指标输出的列名"""
+        return INDICATOR_OUTPUTS[self.kind]
+
+    @property
+    def price_linear(self) -> bool:
+        """指标值是否与价格成正比（RSI 与价格尺度无关），用于在前复权与后复权之间换算"""
+        return self.kind != "rsi"
+
+INDICATOR_OUTPUTS = {
+    "ma": ("value",),
+    "ema": ("value",),
+    "rsi": ("value",),
+    "macd": ("dif", "dea", "hist"),
+    "boll": ("mid", "upper", "lower"),
+}
+# 参数缺省值，如 macd 等价于 macd_12_26_9，boll20 等价于 boll_20_2
+INDICATOR_DEFAULTS = {
+    "macd": (12, 26, 9),
+    "boll": (20, 2),
+    "rsi": (14,),
+}
+_INDICATOR_PATTERN = re.compile(r"^(ma|ema|rsi|macd|boll)_?(\d+(?:\.\d+)?(?:_\d+(?:\.\d+)?)*)?$")
+
+class IndicatorError(Exception):
+    """指标名称或参数不合法"""
+    pass
+
+def parse_indicator(name: str) -> IndicatorSpec:
+    """
+    解析指标名称，如 ma20、ema12、rsi14、macd、macd_12_26_9、boll20、boll_20_2
+    """
+    match = _INDICATOR_PATTERN.match(name.strip().lower())
+    if not match:
+        raise IndicatorError(f"不支持的指标: {name}")
+    kind, raw_params = match.groups()
+    params = tuple(float(param) for param in raw_params.split("_")) if raw_params else ()
+    defaults = INDICATOR_DEFAULTS.get(kind, ())
+    params = params + tuple(defaults[len(params):])
+    expected = {"ma": 1, "ema": 1, "rsi": 1, "macd": 3, "boll": 2}[kind]
+    if len(params) != expected or any(param <= 0 for param in params):
+        raise IndicatorError(f"指标 {name} 的参数不合法")
+    if kind == "macd" and params[0] >= params[1]:
+        raise IndicatorError(f"指标 {name} 的快线周期必须小于慢线周期")
+    integer_params = params if kind != "boll" else params[:1]
+    if any(param != int(param) for param in integer_params):
+        raise IndicatorError(f"指标 {name} 的周期必须为整数")
+    return IndicatorSpec(kind, params)
+
+# ---------------------------------------------------------------------------
+# 全序列向量化计算：返回 (各输出列, 计算到最后一根 K 线时的滚动状态)
+# ---------------------------------------------------------------------------
+
+def _ema_series(values: np.ndarray, span: float) -> np.ndarray:
+    """以首个值为种子的 EMA（与 pandas ewm(adjust=False) 一致）"""
+    import pandas as pd
+    return pd.Series(values).ewm(span=span, adjust=False).mean().to_numpy()
+
+def _compute_ma(close: np.ndarray, period: float) -> Tuple[Dict[str, np.ndarray], dict]:
+    period = int(period)
+    value = np.full(len(close), np.nan)
+    if len(close) >= period:
+        cumsum = np.cumsum(np.insert(close, 0, 0.0))
+        value[period - 1:] = (cumsum[period:] - cumsum[:-period]) / period
+    window = close[-period:].tolist()
+    return {"value": value}, {"window": window, "sum": float(np.sum(window))}
+
+def _compute_ema(close: np.ndarray, period: float) -> Tuple[Dict[str, np.ndarray], dict]:
+    value = _ema_series(close, period)
+    return {"value": value}, {"ema": float(value[-1])}
+
+def _compute_macd(close: np.ndarray, fast: float, slow: float, signal: float) -> Tuple[Dict[str, np.ndarray], dict]:
+    ema_fast = _ema_series(close, fast)
+    ema_slow = _ema_series(close, slow)
+    dif = ema_fast - ema_slow
+    dea = _ema_series(dif, signal)
+    outputs = {"dif": dif, "dea": dea, "hist": 2 * (dif - dea)}
+    return outputs, {"ema_fast": float(ema_fast[-1]), "ema_slow": float(ema_slow[-1]), "dea": float(dea[-1])}
+
+def _compute_rsi(close: np.ndarray, period: float) -> Tuple[Dict[str, np.ndarray], dict]:
+    import pandas as pd
+    # Wilder 平滑：平均涨幅与平均跌幅为 alpha=1/period 的 EMA
+    delta = np.diff(close, prepend=close[0])
+    gain = pd.Series(np.clip(delta, 0, None)).ewm(alpha=1 / period, adjust=False).mean().to_numpy()
+    loss = pd.Series(np.clip(-delta, 0, None)).ewm(alpha=1 / period, adjust=False).mean().to_numpy()
+    value = _rsi_value(gain, loss)
+    value[:int(period)] = np.nan
+    state = {"prev_close": float(close[-1]), "avg_gain": float(gain[-1]), "avg_loss": float(loss[-1]), "count": len(close)}
+    return {"value": value}, state
+
+def _rsi_value(gain, loss):
+    total = gain + loss
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total > 0, 100 * gain / np.where(total > 0, total, 1), 50.0)
+
+def _compute_boll(close: np.ndarray, period: float, width: float) -> Tuple[Dict[str, np.ndarray], dict]:
+    period = int(period)
+    mid = np.full(len(close), np.nan)
+    std = np.full(len(close), np.nan)
+    if len(close) >= period:
+        windows = np.lib.stride_tricks.sliding_window_view(close, period)
+        mid[period - 1:] = windows.mean(axis=1)
+        std[period - 1:] = windows.std(axis=1)
+    window = close[-period:].tolist()
+    state = {"window": window, "sum": float(np.sum(window)), "sum_sq": float(np.sum(np.square(window)))}
+    return {"mid": mid, "upper": mid + width * std, "lower": mid - width * std}, state
+
+# ---------------------------------------------------------------------------
+# 增量更新：根据上一根 K 线的滚动状态与新的收盘价，以 O(1) 计算新值与新状态
+# ---------------------------------------------------------------------------
+
+def _ema_step(previous: float, value: float, span: float) -> float:
+    alpha = 2 / (span + 1)
+    return previous + alpha * (value - previous)
+
+def _update_ma(state: dict, close: float, period: float) -> Tuple[Dict[str, float], dict]:
+    period = int(period)
+    window = deque(state["window"], maxlen=period)
+    total = state["sum"] + close - (window[0] if len(window) == period else 0.0)
+    window.append(close)
+    value = total / period if len(window) == period else float("nan")
+    return {"value": value}, {"window": list(window), "sum": total}
+
+def _update_ema(state: dict, close: float, period: float) -> Tuple[Dict[str, float], dict]:
+    ema = _ema_step(state["ema"], close, period)
+    return {"value": ema}, {"ema": ema}
+
+def _update_macd(state: dict, close: float, fast: float, slow: float, signal: float) -> Tuple[Dict[str, float], dict]:
+    ema_fast = _ema_step(state["ema_fast"], close, fast)
+    ema_slow = _ema_step(state["ema_slow"], close, slow)
+    dif = ema_fast - ema_slow
+    dea = _ema_step(state["dea"], dif, signal)
+    return {"dif": dif, "dea": dea, "hist": 2 * (dif - dea)}, {"ema_fast": ema_fast, "ema_slow": ema_slow, "dea": dea}
+
+def _update_rsi(state: dict, close: float, period: float) -> Tuple[Dict[str, float], dict]:
+    delta = close - state["prev_close"]
+    alpha = 1 / period
+    avg_gain = state["avg_gain"] + alpha * (max(delta, 0.0) - state["avg_gain"])
+    avg_loss = state["avg_loss"] + alpha * (max(-delta, 0.0) - state["avg_loss"])
+    count = state["count"] + 1
+    value = float(_rsi_value(avg_gain, avg_loss)) if count > period else float("nan")
+    return {"value": value}, {"prev_close": close, "avg_gain": avg_gain, "avg_loss": avg_loss, "count": count}
+
+def _update_boll(state: dict, close: float, period: float, width: float) -> Tuple[Dict[str, float], dict]:
+    period = int(period)
+    window = deque(state["window"], maxlen=period)
+    removed = window[0] if len(window) == period else 0.0
+    total = state["sum"] + close - removed
+    total_sq = state["sum_sq"] + close * close - removed * removed
+    window.append(close)
+    if len(window) < period:
+        nan = float("nan")
+        outputs = {"mid": nan, "upper": nan, "lower": nan}
+    else:
+        mid = total / period
+        std = max(total_sq / period - mid * mid, 0.0) ** 0.5
+        outputs = {"mid": mid, "upper": mid + width * std, "lower": mid - width * std}
+    return outputs, {"window": list(window), "sum": total, "sum_sq": total_sq}
+
+_ENGINES: Dict[str, Tuple[Callable, Callable]] = {
+    "ma": (_compute_ma, _update_ma),
+    "ema": (_compute_ema, _update_ema),
+    "macd": (_compute_macd, _update_macd),
+    "rsi": (_compute_rsi, _update_rsi),
+    "boll": (_compute_boll, _update_boll),
+}
+
+def compute_indicator(spec: IndicatorSpec, close: np.ndarray) -> Tuple[Dict[str, np.ndarray], dict]:
+    """
+    在完整收盘价序列上向量化计算指标
+    :param spec: 指标定义
+    :param close: 按日期升序的收盘价
+    :return: (各输出列，与 close 等长，预热期为 NaN；最后一根 K 线之后的滚动状态)
+    """
+    close = np.asarray(close, dtype=np.float64)
+    if not len(close):
+        return {output: np.empty(0) for output in spec.outputs}, {}
+    compute, _ = _ENGINES[spec.kind]
+    return compute(close, *spec.params)
+
+def update_indicator(spec: IndicatorSpec, state: dict, close: float) -> Tuple[Dict[str, float], dict]:
+    """
+    用一根新 K 线的收盘价增量更新指标，耗时与历史长度无关
+    :param spec: 指标定义
+    :param state: compute_indicator 或上一次 update_indicator 返回的状态
+    :param close: 新 K 线的收盘价
+    :return: (新 K 线的各输出值, 新状态)
+    """
+    _, update = _ENGINES[spec.kind]
+    return update(state, float(close), *spec.params)
+
+if __name__ == "__main__":
+    # 基准测试：python -m app.utils.indicator_utils
+    # 对比每日新增一根 K 线时，增量更新与全量重算全部默认指标的耗时，并校验两者结果一致
+    import time
+    from loguru import logger
+
+    BAR_COUNT = 7_500  # 约 30 年的交易日
+    NEW_BARS = 250
+    rng = np.random.default_rng(0)
+    closes = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, BAR_COUNT + NEW_BARS)))
+    specs = [parse_indicator(name) for name in DEFAULT_INDICATORS]
+
+    history = closes[:BAR_COUNT]
+    states = {spec.name: compute_indicator(spec, history)[1] for spec in specs}
+
+    started = time.perf_counter()
+    for index in range(BAR_COUNT, BAR_COUNT + NEW_BARS):
+        latest = {}
+        for spec in specs:
+            latest[spec.name], states[spec.name] = update_indicator(spec, states[spec.name], closes[index])
+    incremental_cost = (time.perf_counter() - started) / NEW_BARS
+
+    started = time.perf_counter()
+    for index in range(BAR_COUNT, BAR_COUNT + NEW_BARS):
+        full = {spec.name: compute_indicator(spec, closes[:index + 1])[0] for spec in specs}
+    full_cost = (time.perf_counter() - started) / NEW_BARS
+
+    for spec in specs:
+        for output in spec.outputs:
+            assert np.isclose(latest[spec.name][output], full[spec.name][output][-1], rtol=1e-9), f"{spec.name}.{output} 增量结果与全量结果不一致"
+    logger.info(f"{len(specs)} 个指标、{BAR_COUNT} 根历史 K 线，每新增一根 K 线："
+                f"增量更新 {incremental_cost * 1e6:.1f} µs，全量重算 {full_cost * 1e3:.2f} ms，"
+                f"约 {full_cost / incremental_cost:.0f} 倍")
@@ -1,9 +1,30 @@
+from typing import Optional, Tuple
 from passlib.context import CryptContext
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.config.password import password_settings
+from app.core.password_executor import run_password_hash
+
+# 最小、最大与默认轮数都取配置的工作因子，轮数不同的旧哈希会被 needs_update / verify_and_update 判定为需要更新
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=password_settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=password_settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=password_settings.BCRYPT_ROUNDS,
+)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+async def hash_password(password: str) -> str:
+    """在密码哈希线程池中计算密码哈希"""
+    return await run_password_hash(pwd_context.hash, password)
 
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    在密码哈希线程池中校验密码
+    :return: (是否正确, 新哈希)。密码正确且原哈希的工作因子与当前配置不同时返回按当前配置重新计算的哈希，否则为 None
+    """
+    return await run_password_hash(pwd_context.verify_and_update, plain_password, hashed_password)
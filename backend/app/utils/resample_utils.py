@@ -0,0 +1,153 @@
+import numpy as np
+from typing import Tuple
+from app.schemas.daily_bars import DailyBars
+from app.schemas.period_bars import PeriodBars
+
+# 支持的K线周期
+BAR_PERIODS = ("week", "month", "quarter")
+
+class ResampleError(Exception):
+    """周期K线聚合异常"""
+    pass
+
+def period_keys(dates: np.ndarray, period: str) -> np.ndarray:
+    """
+    计算每个日期所属周期的整数编号，同一自然周（周一至周日）、自然月或自然季度的日期编号相同，
+    且编号随日期单调不减
+    :param dates: datetime64[D] 数组
+    :param period: week / month / quarter
+    """
+    if period == "week":
+        # 1970-01-01 为周四，加 3 天后按 7 整除即得以周一为起点的周编号
+        return (dates.astype(np.int64) + 3) // 7
+    months = dates.astype("datetime64[M]").astype(np.int64)
+    if period == "month":
+        return months
+    if period == "quarter":
+        return months // 3
+    raise ResampleError(f"不支持的K线周期: {period}")
+
+def calendar_period_ends(trade_dates: np.ndarray, period: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    由交易日历计算每个周期的最后一个交易日
+    :param trade_dates: 升序的交易日 datetime64[D] 数组
+    :return: (周期编号, 该周期最后一个交易日)，均按周期升序
+    """
+    if not len(trade_dates):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype="datetime64[D]")
+    keys = period_keys(trade_dates, period)
+    last_index = np.flatnonzero(np.r_[keys[1:] != keys[:-1], True])
+    return keys[last_index], trade_dates[last_index]
+
+def resample_daily_bars(daily_bars: DailyBars, period: str, trade_dates: np.ndarray) -> PeriodBars:
+    """
+    把日线聚合为周期K线，全部计算均为向量化操作：
+    按周期编号找出每段的起止位置后，开盘取首、收盘取尾，最高、最低、成交量与成交额用 reduceat 分段归约，
+    涨跌幅由日涨跌幅复合得到（不受除权影响），周期结束日期按交易日历对齐到该周期最后一个交易日，
+    日历中没有的周期使用最后一根日线的日期
+
+    :param daily_bars: 按日期升序的日线数据，可以是复权后的数据
+    :param period: week / month / quarter
+    :param trade_dates: 升序的交易日 datetime64[D] 数组
+    """
+    if not len(daily_bars):
+        return PeriodBars.empty(daily_bars.stock_code, period, daily_bars.adjust)
+    keys = period_keys(daily_bars.date, period)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)] - 1
+    period_key = keys[starts]
+
+    calendar_keys, calendar_ends = calendar_period_ends(trade_dates, period)
+    position = np.minimum(np.searchsorted(calendar_keys, period_key), max(len(calendar_keys) - 1, 0))
+    if len(calendar_keys):
+        found = calendar_keys[position] == period_key
+        period_end = np.where(found, calendar_ends[position], daily_bars.date[ends])
+    else:
+        period_end = daily_bars.date[ends]
+
+    growth = np.multiply.reduceat(1 + daily_bars.pct_chg / 100, starts)
+    return PeriodBars(
+        stock_code=daily_bars.stock_code,
+        period=period,
+        adjust=daily_bars.adjust,
+        date=period_end,
+        first_date=daily_bars.date[starts],
+        last_date=daily_bars.date[ends],
+        open=daily_bars.open[starts],
+        high=np.maximum.reduceat(daily_bars.high, starts),
+        low=np.minimum.reduceat(daily_bars.low, starts),
+        close=daily_bars.close[ends],
+        pct_chg=np.round((growth - 1) * 100, 2),
+        vol=np.add.reduceat(daily_bars.vol, starts),
+        amount=np.add.reduceat(daily_bars.amount, starts),
+        trade_days=ends - starts + 1,
+        qfq_scale=float(daily_bars.qfq_factor[-1] / daily_bars.hfq_factor[-1]),
+    )
+
+def update_open_period(period_bars: PeriodBars, daily_bars: DailyBars, trade_dates: np.ndarray) -> PeriodBars:
+    """
+    新日线入库后更新周期K线：已结束的周期保持不变，只从最后一根周期K线的第一根日线起重新聚合，
+    即重算当前尚未结束的周期，并追加新日线所跨入的后续周期
+
+    :param period_bars: 已有的周期K线
+    :param daily_bars: 与 period_bars 复权方式相同、至少覆盖最后一个周期起始日之后的日线数据
+    :param trade_dates: 升序的交易日 datetime64[D] 数组
+    """
+    if not len(period_bars):
+        return resample_daily_bars(daily_bars, period_bars.period, trade_dates)
+    if daily_bars.adjust != period_bars.adjust:
+        raise ResampleError(f"日线复权方式 {daily_bars.adjust} 与周期K线复权方式 {period_bars.adjust} 不一致")
+    tail = daily_bars.slice_dates(period_bars.first_date[-1].item(), None)
+    if not len(tail) or tail.date[0] != period_bars.first_date[-1]:
+        raise ResampleError(f"日线数据没有覆盖股票 {period_bars.stock_code} 最后一个周期的起始日 {period_bars.first_date[-1]}")
+    return PeriodBars.concat(period_bars[:-1], resample_daily_bars(tail, period_bars.period, trade_dates))
+
+if __name__ == "__main__":
+    # 基准测试：python -m app.utils.resample_utils
+    # 对比 NumPy 分段归约与 pandas groupby 聚合整段历史的耗时，以及每日新增一根日线时只更新当前周期的耗时，并校验结果一致
+    import time
+    import pandas as pd
+    from loguru import logger
+
+    BAR_COUNT = 7_500  # 约 30 年的交易日
+    rng = np.random.default_rng(0)
+    calendar = np.arange(np.datetime64("1995-01-02"), np.datetime64("2026-12-31"), dtype="datetime64[D]")
+    # 去掉周末，并随机去掉少量节假日
+    calendar = calendar[(calendar.astype(np.int64) + 3) % 7 < 5]
+    calendar = np.sort(rng.choice(calendar, size=len(calendar) - 300, replace=False))
+    dates = calendar[:BAR_COUNT]
+    closes = np.round(10 * np.exp(np.cumsum(rng.normal(0, 0.02, BAR_COUNT))), 2)
+    pct_chg = np.r_[0.0, np.round((closes[1:] / closes[:-1] - 1) * 100, 2)]
+    bars = DailyBars.from_columns("000001", {
+        "date": dates, "open": closes * 0.995, "high": closes * 1.01, "low": closes * 0.99, "close": closes,
+        "change": np.r_[0.0, np.diff(closes)], "pct_chg": pct_chg, "vol": rng.integers(1_000, 1_000_000, BAR_COUNT),
+        "amount": closes * 1e5, "qfq_factor": np.full(BAR_COUNT, 0.5), "hfq_factor": np.full(BAR_COUNT, 2.0),
+    })
+
+    for period in BAR_PERIODS:
+        started = time.perf_counter()
+        resampled = resample_daily_bars(bars, period, calendar)
+        numpy_cost = time.perf_counter() - started
+
+        started = time.perf_counter()
+        frame = pd.DataFrame(bars.columns())
+        grouped = frame.groupby(period_keys(bars.date, period), sort=True).agg(
+            open=("open", "first"), high=("high", "max"), low=("low", "min"), close=("close", "last"),
+            vol=("vol", "sum"), amount=("amount", "sum"),
+        )
+        pandas_cost = time.perf_counter() - started
+        for name in grouped.columns:
+            assert np.allclose(grouped[name].to_numpy(), getattr(resampled, name)), f"{period}.{name} 与 pandas 结果不一致"
+
+        # 逐日追加日线，只更新当前周期，与整段重算结果一致
+        history = resample_daily_bars(bars[:BAR_COUNT - 250], period, calendar)
+        started = time.perf_counter()
+        for end in range(BAR_COUNT - 249, BAR_COUNT + 1):
+            history = update_open_period(history, bars[:end], calendar)
+        update_cost = (time.perf_counter() - started) / 250
+        for name in resampled.columns():
+            assert np.array_equal(getattr(history, name), getattr(resampled, name)), f"{period}.{name} 增量结果与整段结果不一致"
+        assert np.all(np.isin(resampled.date[:-1], calendar)), f"{period} 周期结束日期没有对齐到交易日"
+
+        logger.info(f"{period}: {BAR_COUNT} 根日线聚合为 {len(resampled)} 根，NumPy {numpy_cost * 1e3:.2f} ms，"
+                    f"pandas groupby {pandas_cost * 1e3:.2f} ms，新增一根日线只更新当前周期 {update_cost * 1e6:.0f} µs")
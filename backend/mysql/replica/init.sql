@@ -0,0 +1,10 @@
+-- 副本首次初始化时执行：允许应用账号查询复制状态，并从主库的 GTID 起点开始复制
+GRANT REPLICATION CLIENT ON *.* TO 'testuser'@'%';
+CHANGE REPLICATION SOURCE TO
+    SOURCE_HOST = 'db',
+    SOURCE_PORT = 3306,
+    SOURCE_USER = 'root',
+    SOURCE_PASSWORD = 'rootpassword',
+    SOURCE_AUTO_POSITION = 1,
+    GET_SOURCE_PUBLIC_KEY = 1;
+START REPLICA;